@@ -0,0 +1,60 @@
+import asyncio
+from typing import Optional
+
+from SemanticDocumentParser.caching.keys import fingerprint, hash_text
+from SemanticDocumentParser.caching.store import SQLiteCacheStore, DEFAULT_MAX_SIZE_BYTES
+
+# Bump whenever captions produced before a change should no longer be served
+CAPTION_CACHE_VERSION: int = 1
+
+
+class CaptionCache:
+    """
+    Persistent cache of image captions keyed by the image hash, the model & the caption prompt.
+
+    Logos, slide-master backgrounds & footer icons repeat across every document, so each is only captioned once.
+
+    """
+
+    NAMESPACE: str = "caption"
+
+    def __init__(self, store: SQLiteCacheStore):
+        self.store: SQLiteCacheStore = store
+
+    @classmethod
+    def from_path(cls, path: str, max_size_bytes: int = DEFAULT_MAX_SIZE_BYTES) -> "CaptionCache":
+        return cls(SQLiteCacheStore(path, max_size_bytes=max_size_bytes))
+
+    @classmethod
+    def key(cls, image_hash: str, model_name: str, prompt: str) -> str:
+        return fingerprint(CAPTION_CACHE_VERSION, image_hash, model_name, hash_text(prompt))
+
+    def get(self, image_hash: str, model_name: str, prompt: str) -> Optional[str]:
+        """
+        Look up a previous caption
+
+        :param image_hash: The image's content hash
+        :param model_name: The captioning model
+        :param prompt: The captioning prompt
+        :return: The caption, or None on a miss
+
+        """
+
+        value: Optional[bytes] = self.store.get(self.NAMESPACE, self.key(image_hash, model_name, prompt))
+        return value.decode("utf-8") if value is not None else None
+
+    async def aget(self, image_hash: str, model_name: str, prompt: str) -> Optional[str]:
+        """The SQLite read of get, in a thread so a locked database doesn't block the event loop"""
+
+        return await asyncio.to_thread(self.get, image_hash, model_name, prompt)
+
+    def set(self, image_hash: str, model_name: str, prompt: str, caption: str) -> None:
+        self.store.set(self.NAMESPACE, self.key(image_hash, model_name, prompt), caption.encode("utf-8"))
+
+    async def aset(self, image_hash: str, model_name: str, prompt: str, caption: str) -> None:
+        """The SQLite write of set, in a thread so a locked database doesn't block the event loop"""
+
+        await asyncio.to_thread(self.set, image_hash, model_name, prompt, caption)
+
+
+__all__ = ["CaptionCache", "CAPTION_CACHE_VERSION"]
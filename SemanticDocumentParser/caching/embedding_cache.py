@@ -0,0 +1,328 @@
+import asyncio
+import collections
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from typing import List, Optional, Dict, TypedDict, OrderedDict
+
+import numpy as np
+
+from SemanticDocumentParser.caching.keys import hash_text
+
+
+class EmbeddingCacheStats(TypedDict):
+    hits: int
+    misses: int
+    memory_hits: int
+    mmap_hits: int
+
+
+class MmapEmbeddingStore:
+    """
+    Fixed-capacity embedding store shared between processes.
+
+    Vectors live in a memory-mapped float32 matrix (<path>.f32) so every worker reads the same pages, and the
+    key -> row index lives in SQLite (<path>.sqlite3). Rows are handed out as a ring buffer: once the store is
+    full the oldest row is overwritten.
+
+    Each row is tagged with a hash of its key (<path>.tags), cleared while the row is rewritten. A reader still
+    holding the index of a row that has since been reused sees another tag & treats it as a miss.
+
+    The matrix has the dimensions of the first vector stored; vectors of other dimensions (another model) are not
+    stored.
+
+    """
+
+    TAG_BYTES: int = 16
+
+    def __init__(self, path: str, capacity: int = 100_000):
+        """
+        Open (or create) the store
+
+        :param path: Path prefix of the matrix & index files
+        :param capacity: The number of vectors the matrix can hold
+
+        """
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.capacity: int = capacity
+        self._matrix_path: str = path + ".f32"
+        self._tags_path: str = path + ".tags"
+        self._matrix: Optional[np.memmap] = None
+        self._tags: Optional[np.memmap] = None
+        self._lock: threading.Lock = threading.Lock()
+        self._connection: sqlite3.Connection = sqlite3.connect(
+            path + ".sqlite3", timeout=30, check_same_thread=False, isolation_level=None
+        )
+
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS rows (key TEXT PRIMARY KEY, row INTEGER NOT NULL UNIQUE)")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    @classmethod
+    def _tag(cls, key: str) -> np.ndarray:
+        return np.frombuffer(hashlib.sha256(key.encode("utf-8")).digest()[:cls.TAG_BYTES], dtype=np.uint8)
+
+    def _open_matrix(self, dimensions: Optional[int] = None) -> Optional[np.memmap]:
+        """
+        Map the matrix & row tags, creating them if this is the first write. Caller must hold the lock (& the
+        write transaction, when creating).
+
+        :param dimensions: The vector dimensions, only needed to create the matrix
+        :return: The matrix, or None if nothing was ever written
+
+        """
+
+        if self._matrix is not None:
+            return self._matrix
+
+        row = self._connection.execute("SELECT value FROM meta WHERE name = 'dimensions'").fetchone()
+
+        if row is None and dimensions is None:
+            return None
+
+        # A store written before rows were tagged gets blank tags on its next write, i.e. starts out empty
+        if not os.path.exists(self._tags_path):
+            if dimensions is None:
+                return None
+
+            np.memmap(self._tags_path, dtype=np.uint8, mode="w+", shape=(self.capacity, self.TAG_BYTES)).flush()
+
+        if row is not None:
+            self._matrix = np.memmap(self._matrix_path, dtype=np.float32, mode="r+", shape=(self.capacity, row[0]))
+        else:
+            self._matrix = np.memmap(self._matrix_path, dtype=np.float32, mode="w+", shape=(self.capacity, dimensions))
+            self._connection.execute("INSERT INTO meta (name, value) VALUES ('dimensions', ?)", (dimensions,))
+
+        self._tags = np.memmap(self._tags_path, dtype=np.uint8, mode="r+", shape=(self.capacity, self.TAG_BYTES))
+        return self._matrix
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """
+        Read the vectors stored under the given keys
+
+        :param keys: The keys
+        :return: The vectors that were found, by key
+
+        """
+
+        with self._lock:
+            matrix: Optional[np.memmap] = self._open_matrix()
+
+            if matrix is None or not keys:
+                return {}
+
+            found: Dict[str, List[float]] = {}
+
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                key_batch: List[str] = keys[start:start + 500]
+                rows = self._connection.execute(
+                    f"SELECT key, row FROM rows WHERE key IN ({','.join('?' * len(key_batch))})", key_batch
+                ).fetchall()
+
+                for key, row in rows:
+                    tag: np.ndarray = self._tag(key)
+
+                    # Checked on both sides of the copy, so a row being rewritten meanwhile is never returned
+                    if not np.array_equal(self._tags[row], tag):
+                        continue
+
+                    vector: List[float] = matrix[row].tolist()
+
+                    if np.array_equal(self._tags[row], tag):
+                        found[key] = vector
+
+            return found
+
+    def set_many(self, vectors: Dict[str, List[float]]) -> None:
+        """
+        Store vectors, overwriting the oldest rows once the store is full
+
+        :param vectors: The vectors, by key
+        :return: None
+
+        """
+
+        if not vectors:
+            return
+
+        with self._lock:
+            # IMMEDIATE takes the write lock up-front so two processes never hand out the same rows
+            self._connection.execute("BEGIN IMMEDIATE")
+
+            try:
+                matrix: np.memmap = self._open_matrix(len(next(iter(vectors.values()))))
+                fitting: Dict[str, List[float]] = {
+                    key: vector for key, vector in vectors.items() if len(vector) == matrix.shape[1]
+                }
+
+                if len(fitting) < len(vectors):
+                    logging.warning(
+                        f"Not storing {len(vectors) - len(fitting)} embedding(s) in the shared embedding cache: it holds "
+                        f"{matrix.shape[1]}-dimensional vectors. Give each embedding model its own store."
+                    )
+
+                row = self._connection.execute("SELECT value FROM meta WHERE name = 'next_row'").fetchone()
+                next_row: int = row[0] if row else 0
+
+                for key, vector in fitting.items():
+                    row_idx: int = next_row % self.capacity
+                    next_row += 1
+
+                    self._connection.execute("DELETE FROM rows WHERE row = ? OR key = ?", (row_idx, key))
+                    self._connection.execute("INSERT INTO rows (key, row) VALUES (?, ?)", (key, row_idx))
+
+                    # Readers may still map the row's previous key to it until the commit
+                    self._tags[row_idx] = 0
+                    matrix[row_idx] = np.asarray(vector, dtype=np.float32)
+                    self._tags[row_idx] = self._tag(key)
+
+                matrix.flush()
+                self._tags.flush()
+                self._connection.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('next_row', ?)", (next_row,))
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+            self._matrix = None
+            self._tags = None
+
+
+class EmbeddingCache:
+    """
+    Read-through cache of text embeddings keyed by the embedding model & a hash of the text.
+
+    Checks an in-memory LRU first, then (optionally) a memory-mapped store shared between worker processes.
+
+    """
+
+    def __init__(
+            self,
+            max_memory_entries: int = 10_000,
+            mmap_store: Optional[MmapEmbeddingStore] = None
+    ):
+        """
+        Create the cache
+
+        :param max_memory_entries: The size of the in-memory LRU tier
+        :param mmap_store: The optional shared, on-disk tier
+
+        """
+
+        self.max_memory_entries: int = max_memory_entries
+        self.mmap_store: Optional[MmapEmbeddingStore] = mmap_store
+        self._memory: OrderedDict[str, List[float]] = collections.OrderedDict()
+        self._lock: threading.Lock = threading.Lock()
+        self._stats: EmbeddingCacheStats = EmbeddingCacheStats(hits=0, misses=0, memory_hits=0, mmap_hits=0)
+
+    @classmethod
+    def key(cls, model_name: str, text: str) -> str:
+        return hash_text(model_name + "\x00" + text)
+
+    @property
+    def stats(self) -> EmbeddingCacheStats:
+        with self._lock:
+            return EmbeddingCacheStats(**self._stats)
+
+    def _remember(self, key: str, embedding: List[float]) -> None:
+        """Add to the in-memory tier. Caller must hold the lock."""
+
+        self._memory[key] = embedding
+        self._memory.move_to_end(key)
+
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, model_name: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Look up the embeddings of texts
+
+        :param model_name: The embedding model name
+        :param texts: The texts
+        :return: The embedding for each text, or None where it is not cached
+
+        """
+
+        keys: List[str] = [self.key(model_name, text) for text in texts]
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        missing: List[int] = []
+
+        with self._lock:
+            for idx, key in enumerate(keys):
+                embedding = self._memory.get(key)
+
+                if embedding is None:
+                    missing.append(idx)
+                    continue
+
+                self._memory.move_to_end(key)
+                embeddings[idx] = embedding
+                self._stats['memory_hits'] += 1
+
+        if missing and self.mmap_store is not None:
+            found: Dict[str, List[float]] = self.mmap_store.get_many([keys[idx] for idx in missing])
+
+            with self._lock:
+                for idx in missing:
+                    if keys[idx] in found:
+                        embeddings[idx] = found[keys[idx]]
+                        self._remember(keys[idx], embeddings[idx])
+                        self._stats['mmap_hits'] += 1
+
+        with self._lock:
+            hits: int = sum(embedding is not None for embedding in embeddings)
+            self._stats['hits'] += hits
+            self._stats['misses'] += len(texts) - hits
+
+        return embeddings
+
+    async def aget_many(self, model_name: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """get_many, in a thread when the mmap tier is on, as its SQLite lock can block for up to 30 s"""
+
+        if self.mmap_store is None:
+            return self.get_many(model_name, texts)
+
+        return await asyncio.to_thread(self.get_many, model_name, texts)
+
+    def set_many(self, model_name: str, texts: List[str], embeddings: List[List[float]]) -> None:
+        """
+        Store the embeddings of texts in every tier
+
+        :param model_name: The embedding model name
+        :param texts: The texts
+        :param embeddings: Their embeddings
+        :return: None
+
+        """
+
+        vectors: Dict[str, List[float]] = {
+            self.key(model_name, text): embedding for text, embedding in zip(texts, embeddings)
+        }
+
+        with self._lock:
+            for key, embedding in vectors.items():
+                self._remember(key, embedding)
+
+        if self.mmap_store is not None:
+            self.mmap_store.set_many(vectors)
+
+    async def aset_many(self, model_name: str, texts: List[str], embeddings: List[List[float]]) -> None:
+        """set_many, in a thread when the mmap tier is on, as its write transaction & flush can block"""
+
+        if self.mmap_store is None:
+            self.set_many(model_name, texts, embeddings)
+        else:
+            await asyncio.to_thread(self.set_many, model_name, texts, embeddings)
+
+
+__all__ = ["EmbeddingCache", "EmbeddingCacheStats", "MmapEmbeddingStore"]
@@ -0,0 +1,34 @@
+import hashlib
+import json
+from typing import Any
+
+
+def hash_bytes(data: bytes) -> str:
+    """
+    Content hash used to address cached entries
+
+    :param data: The data to hash
+    :return: The hex digest
+
+    """
+
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_text(text: str) -> str:
+    return hash_bytes(text.encode("utf-8"))
+
+
+def fingerprint(*parts: Any) -> str:
+    """
+    Stable hash of a set of (JSON-serializable) settings. Anything not serializable is hashed by its str().
+
+    :param parts: The settings to fingerprint
+    :return: The hex digest
+
+    """
+
+    return hash_text(json.dumps(parts, sort_keys=True, default=str))
+
+
+__all__ = ["hash_bytes", "hash_text", "fingerprint"]
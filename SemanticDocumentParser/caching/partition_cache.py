@@ -0,0 +1,111 @@
+import asyncio
+import json
+import os
+import zlib
+from typing import List, Optional
+
+from unstructured.__version__ import __version__ as unstructured_version
+from unstructured.documents.elements import Element, assign_and_map_hash_ids
+from unstructured.staging.base import elements_to_dicts, elements_from_dicts
+
+from SemanticDocumentParser.caching.keys import hash_bytes, fingerprint
+from SemanticDocumentParser.caching.store import SQLiteCacheStore, DEFAULT_MAX_SIZE_BYTES
+
+# Bump whenever the partitioners change in a way that affects their output
+PARTITION_CACHE_VERSION: int = 1
+
+
+class PartitionCache:
+    """
+    Cache of the element list produced by unstructured partitioning.
+
+    Partitioning is the most expensive CPU stage & does not depend on any downstream setting, so caching it
+    separately lets the downstream stages be re-tuned without partitioning the corpus again.
+
+    """
+
+    NAMESPACE: str = "partition"
+
+    def __init__(self, store: SQLiteCacheStore):
+        self.store: SQLiteCacheStore = store
+
+    @classmethod
+    def from_path(cls, path: str, max_size_bytes: int = DEFAULT_MAX_SIZE_BYTES) -> "PartitionCache":
+        return cls(SQLiteCacheStore(path, max_size_bytes=max_size_bytes))
+
+    @classmethod
+    def key(cls, document_bytes: bytes, document_extension: str, partition_kwargs: dict) -> str:
+        """
+        Build the cache key for a document
+
+        :param document_bytes: The raw document
+        :param document_extension: The document's file extension (used to detect the file type)
+        :param partition_kwargs: The partition kwargs (languages, xml_keep_tags, strategy, ...) minus the file itself
+        :return: The cache key
+
+        """
+
+        return fingerprint(
+            PARTITION_CACHE_VERSION,
+            unstructured_version,
+            hash_bytes(document_bytes),
+            document_extension.lower(),
+            partition_kwargs
+        )
+
+    def get(self, key: str, document_filename: str, unique_element_ids: bool = False) -> Optional[List[Element]]:
+        """
+        Rebuild the elements of a previous partition, as a fresh partition of this document would return them
+
+        :param key: The cache key
+        :param document_filename: The name of the document being parsed now (the cached one may differ)
+        :param unique_element_ids: Whether the partition used UUIDs instead of hash IDs
+        :return: The elements, or None on a miss
+
+        """
+
+        value: Optional[bytes] = self.store.get(self.NAMESPACE, key)
+
+        if value is None:
+            return None
+
+        elements: List[Element] = elements_from_dicts(json.loads(zlib.decompress(value)))
+        file_directory, filename = os.path.split(document_filename)
+
+        # Stamped the way unstructured applies metadata_filename. Attached files keep their own.
+        for element in elements:
+            if not element.metadata.attached_to_filename:
+                element.metadata.filename = filename or None
+                element.metadata.file_directory = file_directory or None
+
+        # Hash IDs (& the parent IDs pointing at them) are derived from the filename
+        if not unique_element_ids:
+            elements = assign_and_map_hash_ids(elements)
+
+        return elements
+
+    async def aget(self, key: str, document_filename: str, unique_element_ids: bool = False) -> Optional[List[Element]]:
+        """The SQLite read & rebuild of get, in a thread so large entries don't block the event loop"""
+
+        return await asyncio.to_thread(self.get, key, document_filename, unique_element_ids)
+
+    def set(self, key: str, elements: List[Element]) -> None:
+        """
+        Store the elements of a partition
+
+        :param key: The cache key
+        :param elements: The partitioned elements
+        :return: None
+
+        """
+
+        value: bytes = zlib.compress(json.dumps(elements_to_dicts(elements)).encode("utf-8"))
+        self.store.set(self.NAMESPACE, key, value)
+
+    async def aset(self, key: str, elements: List[Element]) -> None:
+        """The serialization & SQLite write of set, in a thread so large entries don't block the event loop"""
+
+        await asyncio.to_thread(self.set, key, elements)
+
+
+__all__ = ["PartitionCache", "PARTITION_CACHE_VERSION"]
@@ -0,0 +1,95 @@
+import asyncio
+import json
+import zlib
+from typing import List, Optional, Tuple
+
+from SemanticDocumentParser.caching.keys import hash_bytes, fingerprint
+from SemanticDocumentParser.caching.store import SQLiteCacheStore, DEFAULT_MAX_SIZE_BYTES
+
+# Bump whenever the output format changes so stale entries are never served
+RESULT_CACHE_VERSION: int = 1
+
+
+class ResultCache:
+    """
+    Content-addressed cache of the final aparse output (chunk dicts & stats).
+
+    Entries are keyed by the document bytes, its name & a fingerprint of the parser config, so an unchanged document
+    parsed with an unchanged config is never parsed twice. The name is part of the key because the element IDs (which
+    also appear in image captions) are hashed from it.
+
+    """
+
+    NAMESPACE: str = "result"
+
+    def __init__(self, store: SQLiteCacheStore):
+        self.store: SQLiteCacheStore = store
+
+    @classmethod
+    def from_path(cls, path: str, max_size_bytes: int = DEFAULT_MAX_SIZE_BYTES) -> "ResultCache":
+        return cls(SQLiteCacheStore(path, max_size_bytes=max_size_bytes))
+
+    @classmethod
+    def key(cls, document_bytes: bytes, document_extension: str, config_fingerprint: str, document_name: str = "") -> str:
+        """
+        Build the cache key for a document
+
+        :param document_bytes: The raw document
+        :param document_extension: The document's file extension
+        :param config_fingerprint: The fingerprint of the parser config
+        :param document_name: The document's file name (without directory), which the element IDs are derived from
+        :return: The cache key
+
+        """
+
+        return fingerprint(
+            RESULT_CACHE_VERSION,
+            hash_bytes(document_bytes),
+            document_extension.lower(),
+            config_fingerprint,
+            document_name
+        )
+
+    def get(self, key: str) -> Optional[Tuple[List[dict], dict]]:
+        """
+        Look up a previous result
+
+        :param key: The cache key
+        :return: The (elements, stats) tuple, or None on a miss
+
+        """
+
+        value: Optional[bytes] = self.store.get(self.NAMESPACE, key)
+
+        if value is None:
+            return None
+
+        entry: dict = json.loads(zlib.decompress(value))
+        return entry['elements'], entry['stats']
+
+    async def aget(self, key: str) -> Optional[Tuple[List[dict], dict]]:
+        """The SQLite read & decompression of get, in a thread so multi-MB entries don't block the event loop"""
+
+        return await asyncio.to_thread(self.get, key)
+
+    def set(self, key: str, elements: List[dict], stats: dict) -> None:
+        """
+        Store a result
+
+        :param key: The cache key
+        :param elements: The final chunk dicts
+        :param stats: The stats of the run that produced them
+        :return: None
+
+        """
+
+        value: bytes = zlib.compress(json.dumps({'elements': elements, 'stats': stats}).encode("utf-8"))
+        self.store.set(self.NAMESPACE, key, value)
+
+    async def aset(self, key: str, elements: List[dict], stats: dict) -> None:
+        """The serialization & SQLite write of set, in a thread so multi-MB entries don't block the event loop"""
+
+        await asyncio.to_thread(self.set, key, elements, stats)
+
+
+__all__ = ["ResultCache", "RESULT_CACHE_VERSION"]
@@ -0,0 +1,134 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+# 1 GiB
+DEFAULT_MAX_SIZE_BYTES: int = 1024 ** 3
+
+
+class SQLiteCacheStore:
+    """
+    A small key-value store on top of SQLite with size-based LRU eviction.
+
+    Safe to share between threads, and between processes pointing at the same file (WAL mode).
+    Keys are namespaced so one file can back several caches.
+
+    """
+
+    def __init__(self, path: str, max_size_bytes: int = DEFAULT_MAX_SIZE_BYTES):
+        """
+        Open (or create) the store
+
+        :param path: Path to the SQLite file
+        :param max_size_bytes: Evict least-recently-used entries once the stored values exceed this
+
+        """
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.path: str = path
+        self.max_size_bytes: int = max_size_bytes
+        self._lock: threading.Lock = threading.Lock()
+        self._connection: sqlite3.Connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL"
+                ")"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        """
+        Read an entry, marking it as recently used
+
+        :param namespace: The cache namespace
+        :param key: The entry key
+        :return: The value, or None on a miss
+
+        """
+
+        full_key: str = f"{namespace}:{key}"
+
+        with self._lock, self._connection:
+            row = self._connection.execute("SELECT value FROM entries WHERE key = ?", (full_key,)).fetchone()
+
+            if row is None:
+                return None
+
+            self._connection.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), full_key))
+
+        return row[0]
+
+    def set(self, namespace: str, key: str, value: bytes) -> None:
+        """
+        Write an entry, then evict the least-recently-used entries if the store is over its size limit
+
+        :param namespace: The cache namespace
+        :param key: The entry key
+        :param value: The value
+        :return: None
+
+        """
+
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (f"{namespace}:{key}", value, len(value), time.time())
+            )
+
+            self._evict()
+
+    def delete(self, namespace: str, key: str) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM entries WHERE key = ?", (f"{namespace}:{key}",))
+
+    def clear(self) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM entries")
+
+    @property
+    def size_bytes(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def _evict(self) -> None:
+        """
+        Drop the least-recently-used entries until the store fits. Caller must hold the lock & transaction.
+
+        :return: None
+
+        """
+
+        total_size: int = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        excess: int = total_size - self.max_size_bytes
+
+        if excess <= 0:
+            return
+
+        evicted_keys = []
+
+        for key, size in self._connection.execute("SELECT key, size FROM entries ORDER BY last_access ASC").fetchall():
+            evicted_keys.append((key,))
+            excess -= size
+
+            if excess <= 0:
+                break
+
+        self._connection.executemany("DELETE FROM entries WHERE key = ?", evicted_keys)
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+__all__ = ["SQLiteCacheStore", "DEFAULT_MAX_SIZE_BYTES"]
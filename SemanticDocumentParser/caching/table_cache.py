@@ -0,0 +1,147 @@
+import asyncio
+import re
+from typing import Optional, Dict, Callable, Awaitable
+
+from SemanticDocumentParser.caching.keys import fingerprint, hash_text
+from SemanticDocumentParser.caching.store import SQLiteCacheStore, DEFAULT_MAX_SIZE_BYTES
+
+# Bump whenever table replies produced before a change should no longer be served
+TABLE_CACHE_VERSION: int = 2
+
+_TAG_PATTERN: re.Pattern = re.compile(r"<\s*(/?)\s*([a-zA-Z0-9]+)([^>]*?)(/?)\s*>")
+_CONTENT_ATTRIBUTE_PATTERN: re.Pattern = re.compile(
+    r"(?<![\w-])(colspan|rowspan|href|src|alt)\s*=\s*(?:\"([^\"]*)\"|'([^']*)'|([^\s\"'>]+))", re.IGNORECASE
+)
+_INTER_TAG_WHITESPACE_PATTERN: re.Pattern = re.compile(r">\s+<")
+_WHITESPACE_PATTERN: re.Pattern = re.compile(r"\s+")
+
+
+def _normalize_tag(match: re.Match) -> str:
+    # Cell spans, link targets & images change what the table says (and end up in the reply); the rest is presentation
+    attributes: str = "".join(
+        f' {name.lower()}="{double_quoted or single_quoted or unquoted}"'
+        for name, double_quoted, single_quoted, unquoted in _CONTENT_ATTRIBUTE_PATTERN.findall(match[3])
+    )
+
+    return f"<{match[1]}{match[2].lower()}{attributes}{match[4]}>"
+
+
+def normalize_table_html(table_html: str) -> str:
+    """
+    Reduce table HTML to its structure & content, so copies of a table that only differ in presentational attributes
+    (ids, styles, classes) or whitespace share a cache entry. Cell spans, link hrefs & image src/alt are kept.
+
+    :param table_html: The table HTML
+    :return: The normalized HTML
+
+    """
+
+    table_html = _TAG_PATTERN.sub(_normalize_tag, table_html)
+    table_html = _INTER_TAG_WHITESPACE_PATTERN.sub("><", table_html)
+    return _WHITESPACE_PATTERN.sub(" ", table_html).strip()
+
+
+class TableCache:
+    """
+    Persistent cache of the LLM replies for tables, keyed by the normalized table HTML, the model & the prompt.
+
+    Schedules, grading schemes & office-hours tables repeat across every section's copy of a course outline, so each
+    is only sent to the LLM once, even when its copies are parsed at the same time.
+
+    """
+
+    NAMESPACE: str = "table"
+
+    def __init__(self, store: SQLiteCacheStore):
+        self.store: SQLiteCacheStore = store
+
+        # The lookups & requests running for each key, shared by every concurrent caller
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    @classmethod
+    def from_path(cls, path: str, max_size_bytes: int = DEFAULT_MAX_SIZE_BYTES) -> "TableCache":
+        return cls(SQLiteCacheStore(path, max_size_bytes=max_size_bytes))
+
+    @classmethod
+    def key(cls, table_html: str, model_name: str, prompt: str) -> str:
+        return fingerprint(TABLE_CACHE_VERSION, hash_text(normalize_table_html(table_html)), model_name, hash_text(prompt))
+
+    def get(self, table_html: str, model_name: str, prompt: str) -> Optional[str]:
+        """
+        Look up a previous reply
+
+        :param table_html: The table HTML sent to the LLM
+        :param model_name: The model
+        :param prompt: The system prompt the table was sent with
+        :return: The reply, or None on a miss
+
+        """
+
+        value: Optional[bytes] = self.store.get(self.NAMESPACE, self.key(table_html, model_name, prompt))
+        return value.decode("utf-8") if value is not None else None
+
+    async def aget(self, table_html: str, model_name: str, prompt: str) -> Optional[str]:
+        """The SQLite read of get, in a thread so a locked database doesn't block the event loop"""
+
+        return await asyncio.to_thread(self.get, table_html, model_name, prompt)
+
+    def set(self, table_html: str, model_name: str, prompt: str, reply: str) -> None:
+        self.store.set(self.NAMESPACE, self.key(table_html, model_name, prompt), reply.encode("utf-8"))
+
+    async def aset(self, table_html: str, model_name: str, prompt: str, reply: str) -> None:
+        """The SQLite write of set, in a thread so a locked database doesn't block the event loop"""
+
+        await asyncio.to_thread(self.set, table_html, model_name, prompt, reply)
+
+    async def aget_or_request(
+            self,
+            table_html: str,
+            model_name: str,
+            prompt: str,
+            request: Callable[[], Awaitable[Optional[str]]],
+            cacheable: Callable[[Optional[str]], bool]
+    ) -> Optional[str]:
+        """
+        Serve a previous reply, or request it & store it if it's usable. Concurrent calls for the same key (copies of a
+        table in one document, or in documents parsed side by side) share one lookup & request.
+
+        :param table_html: The table HTML sent to the LLM
+        :param model_name: The model
+        :param prompt: The system prompt the table is sent with
+        :param request: Sends the table to the LLM, returning the reply
+        :param cacheable: Whether a reply is well-formed, & so worth serving again
+        :return: The reply
+
+        """
+
+        key: str = self.key(table_html, model_name, prompt)
+        in_flight: Optional[asyncio.Future] = self._in_flight.get(key)
+
+        if in_flight is None:
+            in_flight = asyncio.ensure_future(self._aget_or_request(key, request, cacheable))
+            self._in_flight[key] = in_flight
+            in_flight.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+        # Shielded, so a caller being cancelled doesn't cancel the request for the others
+        return await asyncio.shield(in_flight)
+
+    async def _aget_or_request(
+            self,
+            key: str,
+            request: Callable[[], Awaitable[Optional[str]]],
+            cacheable: Callable[[Optional[str]], bool]
+    ) -> Optional[str]:
+        value: Optional[bytes] = await asyncio.to_thread(self.store.get, self.NAMESPACE, key)
+
+        if value is not None:
+            return value.decode("utf-8")
+
+        reply: Optional[str] = await request()
+
+        if cacheable(reply):
+            await asyncio.to_thread(self.store.set, self.NAMESPACE, key, reply.encode("utf-8"))
+
+        return reply
+
+
+__all__ = ["TableCache", "TABLE_CACHE_VERSION", "normalize_table_html"]
@@ -0,0 +1,183 @@
+from typing import Optional, Any, List, Union
+
+from unstructured.documents.elements import CheckBox, Element, Text
+
+
+class ChunkWindow:
+    """
+    A chunk's window as a [start, end) range over the document's stripped texts. The text is only joined when read,
+    so the neighbouring texts aren't duplicated into every chunk, and the window holds no reference back to the
+    chunks (which would make each chunk part of a reference cycle).
+
+    """
+
+    __slots__ = ("texts", "offset", "start", "end")
+
+    def __init__(self, texts: List[str], start: int, end: int, offset: int = 0):
+        # The stripped texts the range indexes, shared by every window built from them
+        self.texts: List[str] = texts
+
+        # The position in the document of texts[0]
+        self.offset: int = offset
+
+        # The window's [start, end) position in the document's chunk list
+        self.start: int = start
+        self.end: int = end
+
+    def __str__(self) -> str:
+        return " ".join(self.texts[self.start - self.offset:self.end - self.offset])
+
+    def __repr__(self) -> str:
+        return f"ChunkWindow(start={self.start}, end={self.end})"
+
+
+class Chunk:
+    """
+    Compact output chunk worked on by the late stages (image captioning, windowing & small-node removal) in place of
+    element.to_dict() copies. The window is kept apart from the metadata, so neither is copied until the chunk is
+    serialized with to_dict().
+
+    Fields can also be read & written with dict syntax (chunk['text']), so stages accept either form.
+
+    """
+
+    __slots__ = ("type", "element_id", "text", "metadata", "window", "extra")
+
+    # The fields reachable with dict syntax, in serialization order
+    FIELDS = ("type", "element_id", "text", "metadata")
+
+    def __init__(
+            self,
+            type: Optional[str],
+            element_id: str,
+            text: str,
+            metadata: dict,
+            window: Optional[Union[str, ChunkWindow]] = None,
+            extra: Optional[dict] = None
+    ):
+        self.type: Optional[str] = type
+        self.element_id: str = element_id
+        self.text: str = text
+        self.metadata: dict = metadata
+        self.window: Optional[Union[str, ChunkWindow]] = window
+
+        # Element-specific keys (embeddings, checked), rarely present
+        self.extra: Optional[dict] = extra
+
+    @classmethod
+    def from_dict(cls, element_data: dict) -> "Chunk":
+        element_data = dict(element_data)
+        metadata: dict = element_data.pop('metadata', {})
+        window: Optional[str] = metadata.get('window')
+
+        if window is not None:
+            metadata = {key: value for key, value in metadata.items() if key != 'window'}
+
+        return cls(
+            type=element_data.pop('type', None),
+            element_id=element_data.pop('element_id', None),
+            text=element_data.pop('text', ""),
+            metadata=metadata,
+            window=window,
+            extra=element_data or None
+        )
+
+    @classmethod
+    def from_element(cls, element: Element) -> "Chunk":
+        """
+        Build the chunk straight from the element's fields, matching from_dict(element.to_dict()) without the
+        intermediate dict
+
+        :param element: The element to convert
+        :return: The chunk
+
+        """
+
+        metadata: dict = element.metadata.to_dict()
+        window: Optional[str] = metadata.pop('window', None)
+        extra: dict = {}
+
+        if isinstance(element, Text):
+            element_type: Optional[str] = element.category
+
+            if element.embeddings:
+                extra['embeddings'] = element.embeddings
+        elif isinstance(element, CheckBox):
+            element_type = "CheckBox"
+            extra['checked'] = element.checked
+        else:
+            element_type = None
+
+        return cls(
+            type=element_type,
+            element_id=element.id,
+            text=element.text,
+            metadata=metadata,
+            window=window,
+            extra=extra or None
+        )
+
+    @property
+    def window_text(self) -> Optional[str]:
+        return None if self.window is None else str(self.window)
+
+    def to_dict(self, window_references: bool = False) -> dict:
+        """
+        Serialize the chunk, in the same form as element.to_dict() (with the window under metadata)
+
+        :param window_references: Store a referenced window as its [start, end) range ('window_range') instead of its text
+        :return: The chunk as a dict
+
+        """
+
+        if self.window is None:
+            metadata: dict = self.metadata
+        elif window_references and isinstance(self.window, ChunkWindow):
+            metadata = {**self.metadata, 'window_range': [self.window.start, self.window.end]}
+        else:
+            metadata = {**self.metadata, 'window': str(self.window)}
+
+        element_data: dict = {
+            'type': self.type,
+            'element_id': self.element_id,
+            'text': self.text,
+            'metadata': metadata
+        }
+
+        if self.extra:
+            element_data.update(self.extra)
+
+        return element_data
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.FIELDS:
+            return getattr(self, key)
+
+        if self.extra and key in self.extra:
+            return self.extra[key]
+
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in self.FIELDS:
+            setattr(self, key, value)
+        else:
+            self.extra = {**(self.extra or {}), key: value}
+
+    def __contains__(self, key: str) -> bool:
+        if key in self.FIELDS:
+            return getattr(self, key) is not None
+
+        return bool(self.extra) and key in self.extra
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __repr__(self) -> str:
+        return f"Chunk(type={self.type!r}, element_id={self.element_id!r}, text={self.text[:40]!r})"
+
+
+__all__ = ["Chunk", "ChunkWindow"]
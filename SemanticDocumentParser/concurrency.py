@@ -0,0 +1,33 @@
+import asyncio
+import contextlib
+from typing import Dict, AsyncContextManager, Optional
+
+
+class StageLimiter:
+    """
+    Caps the number of documents that may be inside a given pipeline stage at once.
+
+    Stages are keyed by the same names passed to on_step_finished (e.g. 'Paragraph Parsing'). A stage without a
+    limit is unbounded. One limiter is shared by every document in a batch so the caps apply across documents.
+
+    """
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None):
+        self.limits: Dict[str, int] = dict(limits or {})
+        self._semaphores: Dict[str, asyncio.Semaphore] = {
+            stage_name: asyncio.Semaphore(limit) for stage_name, limit in self.limits.items()
+        }
+
+    def stage(self, stage_name: str) -> AsyncContextManager:
+        """
+        Enter a stage, waiting for a free slot if it is capped
+
+        :param stage_name: The name of the stage
+        :return: An async context manager held for the duration of the stage
+
+        """
+
+        return self._semaphores.get(stage_name) or contextlib.nullcontext()
+
+
+__all__ = ["StageLimiter"]
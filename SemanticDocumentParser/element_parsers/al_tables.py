@@ -3,128 +3,96 @@ Copied from Donald Ipperciel's Al Syllabus implementation
 
 """
 
-from typing import List, Tuple
+from typing import List, Tuple, Optional, Iterable, Iterator
 
-import pandas as pd
-from bs4 import BeautifulSoup
 from unstructured.documents.elements import Element, Table, NarrativeText, Title
 
+from SemanticDocumentParser.element_parsers.section_index import SectionIndex
 from SemanticDocumentParser.element_parsers.semantic_splitter import PARSER_GENERATED_SIGNATURE
+from SemanticDocumentParser.element_parsers.table_html import read_table_rows
 
+# A table as rows of cell texts. Rows can be ragged.
+TableData = List[List[str]]
 
-def read_tables_bs4mp(html_text: str) -> List[pd.DataFrame]:
+
+def read_table_data(html_text: str) -> List[TableData]:
     """
-    Parse the HTML tables with BeautifulSoup
+    Parse the HTML tables in a single pass
 
     :param html_text: The HTML text
-    :return: Pandas DFs representing tables
+    :return: Rows of cell texts representing tables
 
     CREDIT: DONALD IPPERCIEL, YORK U PROFESSOR
 
     """
 
-    # Parse the HTML with BeautifulSoup
-    html_text = html_text.replace("th", "td")
-    soup = BeautifulSoup(html_text, 'html.parser')
-
-    # Find all tables
-    tables = soup.find_all('table')
-
-    data_frames = []
-    for table in tables:
-        # Find all rows
-        rows = table.find_all('tr')
-
-        table_data = []
-        for row in rows:
-            cols = row.find_all('td')
-
-            # Extract text and links
-            cols_text = [col.get_text() for col in cols]
-            cols_links = [col.find('a')['href'] if col.find('a') and 'href' in col.find('a').attrs else '' for col in cols]
-
+    return [
+        [
             # Combine text and links
-            cols_with_links = [f'[{text}] ({link})' if link else text for text, link in zip(cols_text, cols_links)]
-
-            table_data.append(cols_with_links)
-
-        # Convert table data to DataFrame
-        data_frames.append(pd.DataFrame(table_data))
+            [f'[{cell["text"]}] ({cell["href"]})' if cell["href"] else cell["text"] for cell in row]
+            for row in table_rows
+        ]
+        for table_rows in read_table_rows(html_text)
+    ]
 
-    return data_frames
 
-
-def read_tables(html_text: str, element: Element, previous_25_elements: List[Element]) -> Tuple[List[pd.DataFrame], List[str]]:
+def read_tables(html_text: str, previous_25_elements: List[Element]) -> Tuple[List[TableData], List[str]]:
     """
     Extract tables from HTML along with their respective titles.
 
     CREDIT: DONALD IPPERCIEL, YORK U PROFESSOR
     """
-    # Parse the HTML content with BeautifulSoup to grab all the tables
-    doc_tables_df = read_tables_bs4mp(html_text)
-
-    # Use BeautifulSoup to find all table elements and their preceding headers
-    soup = BeautifulSoup(html_text, 'html.parser')
+    doc_tables = read_table_data(html_text)
 
-    # Find all table elements and their preceding headings
-    tables = soup.find_all('table')
-    table_titles = []
+    # "previous elements" is a list of the previous 25 elements. The first element is the farthest, the last is the closest.
+    # to find the heading, iterate from the CLOSEST element to the FARTHEST element.
+    # Find the first heading in the previous elements. If no heading is founded, use "Untitled Table" as the title.
+    heading = None
 
-    for _ in tables:
+    for prev_element in reversed(previous_25_elements):
+        if isinstance(prev_element, Title):
+            heading = prev_element.text
+            break
 
-        # "previous elements" is a list of the previous 25 elements. The first element is the farthest, the last is the closest.
-        # to find the heading, iterate from the CLOSEST element to the FARTHEST element.
-        # Find the first heading in the previous elements. If no heading is founded, use "Untitled Table" as the title.
-        heading = None
+    # Every table in the element gets the heading, or a placeholder if none found
+    table_titles = [heading if heading else "Untitled Table"] * len(doc_tables)
 
-        for prev_element in reversed(previous_25_elements):
-            if isinstance(prev_element, Title):
-                heading = prev_element.text
-                break
+    # Return the extracted tables and their titles
+    return doc_tables, table_titles
 
-        # Append the heading or a placeholder if none found
-        table_titles.append(heading if heading else "Untitled Table")
 
-    # Return the extracted tables and their titles
-    return doc_tables_df, table_titles
+def _cell(row: List[str], column: int) -> Optional[str]:
+    return row[column] if column < len(row) else None
 
 
-def render_tables_add_to_nodes_text(table_titles, doc_table_df) -> List[str]:
+def render_tables_add_to_nodes_text(table_titles: List[str], doc_tables: List[TableData]) -> List[str]:
     nodes_text: List[str] = []
 
     for idx, title in enumerate(table_titles):
 
-        temp_df: pd.DataFrame = (doc_table_df[idx])
+        table: TableData = doc_tables[idx]
+        parts: List[str] = ["*", title, "*\n "]
 
-        temp_text = "*" + title + "*\n "
-        nb_rows = len(temp_df)
-        nb_columns = len(temp_df.columns)
+        header: List[str] = table[0] if table else []
+        nb_columns = max((len(row) for row in table), default=0)
 
-        for j in range(1, nb_rows):
+        for row in table[1:]:
 
-            if temp_df.iloc[0, 0] and temp_df.iloc[j, 0]:
-                temp_text += (
-                        "The following " + temp_df.iloc[0, 0].strip() + ": " +
-                        temp_df.iloc[j, 0].strip() + " has "
-                )
+            if _cell(header, 0) and _cell(row, 0):
+                parts += ["The following ", header[0].strip(), ": ", row[0].strip(), " has "]
 
             for k in range(1, nb_columns - 1):
 
                 # Can't be null
-                if not temp_df.iloc[0, k] or not temp_df.iloc[j, k] or not temp_df.iloc[0, k + 1] or not temp_df.iloc[j, k + 1]:
+                if not _cell(header, k) or not _cell(row, k) or not _cell(header, k + 1) or not _cell(row, k + 1):
                     continue
 
-                temp_text += (
-                        "the following " + temp_df.iloc[0, k].strip() + ": " +
-                        str(temp_df.iloc[j, k]).strip() + " has "
-                )
+                parts += [
+                    "the following ", header[k].strip(), ": ", row[k].strip(), " has ",
+                    "the following ", header[k + 1].strip(), ": ", row[k + 1].strip(), ", "
+                ]
 
-                temp_text += (
-                        "the following " + temp_df.iloc[0, k + 1].strip() + ": "
-                        + str(temp_df.iloc[j, k + 1]).strip() + ", "
-                )
-
-        nodes_text.append(temp_text)
+        nodes_text.append("".join(parts))
 
     return nodes_text
 
@@ -146,31 +114,57 @@ def parse_nodes_text_into_yeehaw_bonafide_elements(nodes_text: List[str], elemen
     return nodes
 
 
-def al_table_parser(elements: List[Element]) -> List[Element]:
+def iter_al_table_parser(
+        elements: Iterable[Element],
+        section_index: Optional[SectionIndex] = None
+) -> Iterator[Element]:
     """
-    Utilizes a slightly modified version of Donald Ipperciel's table parser from the Al Syllabus project.
+    Streaming al_table_parser. Each table is followed by its rendering as it is pulled.
 
-    [NOTE: This does NOT consume the tables. So the table elements REMAIN and must later be filtered out.]
+    :param elements: The elements of a document, in order
+    :param section_index: The section index of these elements. Without one, the last Title is tracked as we go.
+    :return: The elements, each table followed by its rendering
 
     """
 
-    nodes: List[Element] = []
+    last_title: Optional[Title] = None
+    last_title_position: int = 0
 
-    for idx, element in enumerate(elements):
-
-        # Make sure we add the element back (not consume it)
-        nodes.append(element)
+    for position, element in enumerate(elements):
 
         # No further processing unless it's a table
         if not isinstance(element, Table):
+            if isinstance(element, Title):
+                last_title, last_title_position = element, position
+
+            # Make sure we add the element back (not consume it)
+            yield element
             continue
 
-        doc_tables_df, table_titles = read_tables(
-            element.metadata.text_as_html,
-            element,
-            previous_25_elements=elements[idx - 25:idx] if idx > 25 else elements[:idx]
-        )
-        rendered_tables = render_tables_add_to_nodes_text(table_titles, doc_tables_df)
-        nodes.extend(parse_nodes_text_into_yeehaw_bonafide_elements(rendered_tables, element))
+        # The heading is the closest Title among the previous 25 elements
+        if section_index is not None and element in section_index:
+            heading: Optional[Title] = section_index.nearest_title(element, max_distance=25)
+        else:
+            heading = last_title if position - last_title_position <= 25 else None
 
-    return nodes
+        doc_tables = read_table_data(element.metadata.text_as_html)
+        table_titles = [heading.text if heading is not None and heading.text else "Untitled Table"] * len(doc_tables)
+        rendered_tables = render_tables_add_to_nodes_text(table_titles, doc_tables)
+
+        yield element
+        yield from parse_nodes_text_into_yeehaw_bonafide_elements(rendered_tables, element)
+
+
+def al_table_parser(elements: List[Element], section_index: Optional[SectionIndex] = None) -> List[Element]:
+    """
+    Utilizes a slightly modified version of Donald Ipperciel's table parser from the Al Syllabus project.
+
+    [NOTE: This does NOT consume the tables. So the table elements REMAIN and must later be filtered out.]
+
+    :param elements: All elements of a document
+    :param section_index: The section index of these elements, if already built
+    :return: The elements, each table followed by its rendering
+
+    """
+
+    return list(iter_al_table_parser(elements, section_index))
@@ -1,8 +1,12 @@
+import asyncio
 import base64
+import binascii
+import contextlib
+import hashlib
 import io
 import logging
 import traceback
-from typing import List
+from typing import List, Optional, Dict, Tuple
 
 import httpx
 import puremagic
@@ -10,11 +14,14 @@ from llama_index.core.base.llms.types import CompletionResponse
 from llama_index.core.schema import ImageDocument
 from llama_index.multi_modal_llms.openai import OpenAIMultiModal
 
+from SemanticDocumentParser.caching.caption_cache import CaptionCache
+from SemanticDocumentParser.llm_scheduler import LLMScheduler
 
-async def get_base64(metadata: dict) -> dict | None:
+
+async def get_image(metadata: dict, client: Optional[httpx.AsyncClient] = None) -> dict | None:
     try:
 
-        async with httpx.AsyncClient() as client:
+        async with contextlib.nullcontext(client) if client else httpx.AsyncClient() as client:
 
             # Download the image from the URL
             if 'image_url' not in metadata:
@@ -40,116 +47,436 @@ async def get_base64(metadata: dict) -> dict | None:
             if 'image' not in magic_value.mime_type or magic_value.confidence < 0.7:
                 return None
 
-            # Return b64
+            # Return the raw bytes
             return {
-                'image_base64': base64.b64encode(image_bytes).decode('utf-8'),
+                'image_bytes': image_bytes,
                 'image_mime_type': magic_value.mime_type,
             }
 
     except:
-        logging.warning("Failed to download an image for a file. This can most likely be ignored.", traceback.format_exc())
+        logging.warning("Failed to download an image for a file. This can most likely be ignored.\n" + traceback.format_exc())
         return None
 
 
-async def image_captioner(elements: List[dict], llm: OpenAIMultiModal) -> List[dict]:
-    """
-    Caption images using the LLM.
+async def get_base64(metadata: dict, client: Optional[httpx.AsyncClient] = None) -> dict | None:
+    image: Optional[dict] = await get_image(metadata, client)
+
+    if image is None:
+        return None
+
+    return {
+        'image_base64': base64.b64encode(image['image_bytes']).decode('utf-8'),
+        'image_mime_type': image['image_mime_type'],
+    }
+
 
+CAPTION_PROMPT: str = (
+    "You are an agent part of a RAG pipeline. You will be given a single image. Your job is to describe everything in the image. "
+    "If the image contains math formulae, you should write out those formulae in plain text. Whatever text you reply with will be used "
+    "directly as a text element in a vector database as part of a RAG pipeline, so optimize your description for RAG. Avoid using phrases like "
+    "'This is a picture of' or 'This image shows'. Instead, describe the image directly. "
+    "Focus entirely on what is depicted, using simple, direct language optimized for retrieval."
+)
+
+SUPPORTED_MIME_TYPES: List[str] = ['image/jpeg', 'image/png', 'image/gif', 'image/bmp', 'image/tiff', 'image/webp']
+
+
+def _is_image_element(element: dict) -> bool:
+    return element['type'] == 'Image' and 'metadata' in element
+
+
+def _load_images(elements: List[dict]) -> Dict[int, bytes]:
     """
+    Decode the embedded base64 image data to raw bytes, removing it from the metadata so only one copy is held.
 
-    # 3-series models do not support image input
-    if 'gpt-3' in llm.metadata.model_name:
-        return elements
+    :param elements: The element dicts
+    :return: The image bytes, keyed by id() of the element
+
+    """
 
-    # Filter out SVG images and other unsupported elements first
-    filtered_elements = []
+    images: Dict[int, bytes] = {}
 
     for element in elements:
-        # Keep non-image elements as-is
-        if element['type'] != 'Image' or 'metadata' not in element:
-            filtered_elements.append(element)
+        if not _is_image_element(element) or 'image_base64' not in element['metadata']:
             continue
 
-        # Handle images with URLs (download and detect MIME type)
-        if 'image_url' in element['metadata']:
-            download_result = await get_base64(element['metadata'])
+        try:
+            # Popped straight into the decode, so the base64 string is freed as soon as it has been read
+            images[id(element)] = base64.b64decode(element['metadata'].pop('image_base64') or b'')
+        except (binascii.Error, ValueError, TypeError):
+            logging.warning(f"Image element {element.get('element_id', 'unknown')} has invalid base64 data")
+
+    return images
+
+
+async def _download_images(elements: List[dict], images: Dict[int, bytes], max_concurrent_downloads: int) -> None:
+    """
+    Download every URL-referenced image concurrently. In-place modification of images & the element metadata.
+
+    :param elements: The element dicts
+    :param images: The image bytes, keyed by id() of the element
+    :param max_concurrent_downloads: The maximum number of downloads at once
+    :return: None
+
+    """
+
+    url_elements: List[dict] = [
+        element for element in elements
+        if _is_image_element(element) and 'image_url' in element['metadata']
+    ]
+
+    if not url_elements:
+        return
+
+    semaphore: asyncio.Semaphore = asyncio.Semaphore(max_concurrent_downloads)
+
+    # One client (& connection pool) for every download of the document
+    async with httpx.AsyncClient() as client:
+
+        async def download(element: dict) -> None:
+            async with semaphore:
+                download_result = await get_image(element['metadata'], client)
+
             if download_result:
-                element['metadata'] = {**element['metadata'], **download_result}
+                images[id(element)] = download_result['image_bytes']
+                element['metadata']['image_mime_type'] = download_result['image_mime_type']
 
-            # If download failed, remove the element completely (no alt text preservation)
-            if 'image_base64' not in element['metadata']:
-                logging.warning(f"Failed to download image {element.get('element_id', 'unknown')}, removing from processing")
-                continue
+        await asyncio.gather(*[download(element) for element in url_elements])
 
-        # Skip if no image data is available
-        if 'image_base64' not in element['metadata']:
-            logging.warning(f"Image element {element.get('element_id', 'unknown')} has no image data, removing from processing")
-            continue
 
-        # Get and validate base64 data
-        base64_data = element['metadata']['image_base64']
-        if not base64_data or (isinstance(base64_data, str) and not base64_data.strip()):
-            logging.warning(f"Image element {element.get('element_id', 'unknown')} has empty/invalid base64 data, removing from processing")
-            continue
+def _is_captionable(element: dict, image_bytes: Optional[bytes]) -> bool:
+    """
+    Validate an image element's data & mime type. Normalizes the mime type in-place.
 
-        # Use the detected MIME type if available, otherwise fallback to jpeg
-        mime_type = element['metadata'].get('image_mime_type', 'image/jpeg')
+    :param element: The image element dict
+    :param image_bytes: The image's data, if any
+    :return: Whether the image can be sent to the vision model
 
-        # Normalize and validate mime type
-        if isinstance(mime_type, str):
-            mime_type = mime_type.lower().strip()
+    """
 
-        # Skip images with missing, None, or invalid mime type
-        if not mime_type or mime_type is None or 'image_mime_type' not in element['metadata']:
-            logging.warning(f"Image element {element.get('element_id', 'unknown')} has missing/invalid mime type, removing from processing")
-            continue
+    # If download failed, remove the element completely (no alt text preservation)
+    if 'image_url' in element['metadata'] and image_bytes is None:
+        logging.warning(f"Failed to download image {element.get('element_id', 'unknown')}, removing from processing")
+        return False
 
-        # Validate mime type format (must start with 'image/')
-        if not mime_type.startswith('image/'):
-            logging.warning(f"Image element {element.get('element_id', 'unknown')} has invalid mime type format '{mime_type}', removing from processing")
-            continue
+    # Skip if no image data is available
+    if image_bytes is None:
+        logging.warning(f"Image element {element.get('element_id', 'unknown')} has no image data, removing from processing")
+        return False
 
-        # Skip SVG files as they're not supported by vision models
-        if mime_type == 'image/svg+xml':
-            logging.warning(f"Removing SVG image {element.get('element_id', 'unknown')} - not supported by vision models")
-            continue
+    # Validate the data
+    if not image_bytes:
+        logging.warning(f"Image element {element.get('element_id', 'unknown')} has empty/invalid base64 data, removing from processing")
+        return False
+
+    # Use the detected MIME type if available, otherwise fallback to jpeg
+    mime_type = element['metadata'].get('image_mime_type', 'image/jpeg')
+
+    # Normalize and validate mime type
+    if isinstance(mime_type, str):
+        mime_type = mime_type.lower().strip()
+
+    # Skip images with missing, None, or invalid mime type
+    if not mime_type or mime_type is None or 'image_mime_type' not in element['metadata']:
+        logging.warning(f"Image element {element.get('element_id', 'unknown')} has missing/invalid mime type, removing from processing")
+        return False
+
+    # Validate mime type format (must start with 'image/')
+    if not mime_type.startswith('image/'):
+        logging.warning(f"Image element {element.get('element_id', 'unknown')} has invalid mime type format '{mime_type}', removing from processing")
+        return False
+
+    # Skip SVG files as they're not supported by vision models
+    if mime_type == 'image/svg+xml':
+        logging.warning(f"Removing SVG image {element.get('element_id', 'unknown')} - not supported by vision models")
+        return False
+
+    # Update the normalized mime type back to metadata
+    element['metadata']['image_mime_type'] = mime_type
+    return True
+
+
+def image_hash(image_bytes: bytes, perceptual: bool = False) -> str:
+    """
+    Hash an image by content.
+
+    The exact hash only matches identical bytes. The perceptual hash (dHash) also matches copies that were
+    re-encoded or resized, and falls back to the exact hash if the image can't be decoded. The dHash only sees
+    gradients, so every flat image would share one; a coarse mean colour & the aspect ratio are added to it.
+
+    :param image_bytes: The image data
+    :param perceptual: Whether to use the perceptual hash
+    :return: The hash
+
+    """
+
+    if perceptual:
+        try:
+            from PIL import Image
+
+            image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
 
-        # Update the normalized mime type back to metadata
-        element['metadata']['image_mime_type'] = mime_type
+            # Compare each pixel of a 9x8 grayscale thumbnail with its right-hand neighbour
+            pixels = image.convert("L").resize((9, 8)).tobytes()
+            bits = [pixels[row * 9 + col] > pixels[row * 9 + col + 1] for row in range(8) for col in range(8)]
 
-        # Keep supported image elements
-        filtered_elements.append(element)
+            # The mean colour at 16 levels per channel & the aspect ratio to one decimal survive resizing
+            mean_colour = image.resize((1, 1), Image.Resampling.BOX).getpixel((0, 0))
+            colour: str = "".join(f"{channel >> 4:x}" for channel in mean_colour)
+            aspect_ratio: float = round(image.width / image.height, 1)
+
+            return f"dhash:{sum(bit << idx for idx, bit in enumerate(bits)):016x}:{colour}:{aspect_ratio}"
+        except Exception:
+            logging.warning("Failed to perceptually hash an image, falling back to the exact hash")
+
+    return "sha256:" + hashlib.sha256(image_bytes).hexdigest()
+
+
+def preprocess_image(
+        image_bytes: bytes,
+        mime_type: str,
+        max_dimension: Optional[int] = 2048,
+        image_format: Optional[str] = None,
+        quality: int = 85
+) -> Tuple[bytes, str]:
+    """
+    Downscale an image to fit within max_dimension & optionally recompress it. Vision models downscale large
+    images anyway, so the full-resolution data only costs memory & upload time.
+
+    Images that already fit & are already in the target format are returned untouched, as are images that can't
+    be decoded.
+
+    :param image_bytes: The image data
+    :param mime_type: The image mime type
+    :param max_dimension: The maximum width & height, or None to never downscale
+    :param image_format: The format to recompress to (e.g. 'JPEG', 'WEBP', 'PNG'), or None to keep the format
+    :param quality: The quality for lossy formats
+    :return: The (possibly new) image data & mime type
+
+    """
+
+    try:
+        from PIL import Image
+
+        image = Image.open(io.BytesIO(image_bytes))
+        too_large: bool = max_dimension is not None and max(image.size) > max_dimension
+        target_format: str = (image_format or image.format or 'PNG').upper()
+
+        if not too_large and target_format == image.format:
+            return image_bytes, mime_type
+
+        if too_large:
+            image.thumbnail((max_dimension, max_dimension))
+
+        # JPEG has no alpha channel or palette
+        if target_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        stream = io.BytesIO()
+        image.save(stream, format=target_format, quality=quality)
+        return stream.getvalue(), Image.MIME.get(target_format, mime_type)
+    except Exception:
+        logging.warning("Failed to preprocess an image, sending it as-is\n" + traceback.format_exc())
+        return image_bytes, mime_type
+
+
+async def _request_caption(
+        image_bytes: bytes,
+        mime_type: str,
+        llm: OpenAIMultiModal,
+        scheduler: LLMScheduler
+) -> str:
+    """
+    Ask the LLM to caption an image
+
+    :param image_bytes: The (preprocessed) image data
+    :param mime_type: The image mime type
+    :param llm: The multimodal LLM used to caption
+    :param scheduler: The scheduler the LLM request goes through
+    :return: The caption
+
+    """
+
+    # Ensure we have a supported image format
+    if mime_type not in SUPPORTED_MIME_TYPES:
+        logging.warning(f"Image format {mime_type} may not be supported, using jpeg fallback")
+        mime_type = 'image/jpeg'
+
+    # Only encode at the moment of the request
+    image_document = ImageDocument(
+        image=base64.b64encode(image_bytes).decode('utf-8'),
+        image_mimetype=mime_type
+    )
+
+    response: CompletionResponse = await scheduler.acomplete(
+        llm,
+        prompt=CAPTION_PROMPT,
+        image_documents=[image_document],
+    )
+
+    return response.text
+
+
+def _apply_caption(element: dict, caption: str) -> None:
+    """
+    Replace the image element's text with its caption. In-place modification of the element.
+
+    :param element: The image element dict
+    :param caption: The caption
+    :return: None
+
+    """
+
+    element['metadata']['auto_caption'] = element['text']
+    element['text'] = f"[IMAGE {element['element_id']} DESCRIPTION START]{caption}[IMAGE {element['element_id']} DESCRIPTION END]"
+
+
+async def image_captioner(
+        elements: List[dict],
+        llm: OpenAIMultiModal,
+        scheduler: Optional[LLMScheduler] = None,
+        max_concurrent_downloads: int = 8,
+        max_concurrent_captions: int = 4,
+        caption_cache: Optional[CaptionCache] = None,
+        perceptual_hash: bool = False,
+        drop_duplicate_images: bool = False,
+        max_image_dimension: Optional[int] = 2048,
+        image_format: Optional[str] = None,
+        image_quality: int = 85,
+        keep_image_base64: bool = True
+) -> List[dict]:
+    """
+    Caption images using the LLM.
+
+    Downloads & captions run concurrently up to their limits. The output order is the input order, and an image
+    that fails to caption is left uncaptioned without affecting the others.
+
+    Images are de-duplicated by content hash: each unique image is captioned once per document (or never, if its
+    caption is already in the caption cache), and its copies get the same caption or are dropped.
+
+    Image data is held as raw bytes, downscaled/recompressed before captioning, and only base64-encoded for the
+    request itself (and for the output, if keep_image_base64).
+
+    :param elements: The element dicts
+    :param llm: The multimodal LLM used to caption
+    :param scheduler: The scheduler LLM requests go through. Defaults to one without limits.
+    :param max_concurrent_downloads: The maximum number of image downloads at once
+    :param max_concurrent_captions: The maximum number of caption requests at once
+    :param caption_cache: Persistent cache of captions across documents
+    :param perceptual_hash: De-duplicate within the document with a perceptual hash instead of exact bytes (the
+        caption cache is still keyed by the exact bytes)
+    :param drop_duplicate_images: Drop the repeat copies of an image instead of giving them the same caption
+    :param max_image_dimension: Downscale images so neither side exceeds this, or None to never downscale
+    :param image_format: Recompress images to this format (e.g. 'JPEG', 'WEBP'), or None to keep their format
+    :param image_quality: The quality for lossy formats
+    :param keep_image_base64: Whether to put the (preprocessed) image data back in the output metadata. Images whose
+        caption is cached are then still preprocessed, so the output matches a cold run.
+    :return: The element dicts, with images captioned & unusable images removed
+
+    """
+
+    scheduler = scheduler or LLMScheduler()
+
+    # 3-series models do not support image input
+    if 'gpt-3' in llm.metadata.model_name:
+        return elements
+
+    images: Dict[int, bytes] = _load_images(elements)
+    await _download_images(elements, images, max_concurrent_downloads)
+
+    # Filter out SVG images and other unsupported elements first, keeping non-image elements as-is
+    filtered_elements: List[dict] = [
+        element for element in elements
+        if not _is_image_element(element) or _is_captionable(element, images.get(id(element)))
+    ]
+
+    # Group the copies of each unique image, in order of first appearance
+    image_groups: Dict[str, List[dict]] = {}
 
-    # Now process the filtered elements for captioning
     for element in filtered_elements:
-        if element['type'] != 'Image' or 'metadata' not in element:
-            continue
+        if _is_image_element(element):
+            image_groups.setdefault(image_hash(images[id(element)], perceptual_hash), []).append(element)
 
-        mime_type = element['metadata'].get('image_mime_type', 'image/jpeg')
+    if drop_duplicate_images:
+        duplicate_ids = {id(element) for group in image_groups.values() for element in group[1:]}
+        filtered_elements = [element for element in filtered_elements if id(element) not in duplicate_ids]
 
-        # Ensure we have a supported image format
-        supported_formats = ['image/jpeg', 'image/png', 'image/gif', 'image/bmp', 'image/tiff', 'image/webp']
-        if mime_type not in supported_formats:
-            logging.warning(f"Image format {mime_type} may not be supported, using jpeg fallback")
-            mime_type = 'image/jpeg'
+        for duplicate_id in duplicate_ids:
+            del images[duplicate_id]
 
-        image_document = ImageDocument(
-            image=element['metadata']['image_base64'],
-            image_mimetype=mime_type
-        )
+        image_groups = {key: group[:1] for key, group in image_groups.items()}
+
+    # Now caption each unique image
+    model_name: str = llm.metadata.model_name
+    semaphore: asyncio.Semaphore = asyncio.Semaphore(max_concurrent_captions)
+
+    async def caption(key: str, group: List[dict]) -> None:
+        # Only exact copies share their preprocessed data, images grouped by the dHash each keep their own
+        exact_groups: Dict[str, List[dict]] = {}
+
+        for element in group:
+            exact_groups.setdefault(image_hash(images[id(element)]) if perceptual_hash else key, []).append(element)
 
-        response: CompletionResponse = await llm.acomplete(
-            prompt=(
-                "You are an agent part of a RAG pipeline. You will be given a single image. Your job is to describe everything in the image. "
-                "If the image contains math formulae, you should write out those formulae in plain text. Whatever text you reply with will be used "
-                "directly as a text element in a vector database as part of a RAG pipeline, so optimize your description for RAG. Avoid using phrases like "
-                "'This is a picture of' or 'This image shows'. Instead, describe the image directly. "
-                "Focus entirely on what is depicted, using simple, direct language optimized for retrieval."
-            ),
-            image_documents=[image_document],
+        # The dHash only de-duplicates within the document; across documents, captions are only shared by exact copies
+        cache_key: str = next(iter(exact_groups))
+        caption_text: Optional[str] = (
+            await caption_cache.aget(cache_key, model_name, CAPTION_PROMPT) if caption_cache else None
         )
 
-        element['metadata']['auto_caption'] = element['text']
-        element['text'] = f"[IMAGE {element['element_id']} DESCRIPTION START]{response.text}[IMAGE {element['element_id']} DESCRIPTION END]"
+        # Preprocessing holds a full-resolution decode, so it counts towards the caption limit too
+        async with semaphore:
+            request_image: Optional[Tuple[bytes, str]] = None
+
+            for copies in exact_groups.values():
+                image_data: bytes = images.pop(id(copies[0]))
+
+                # Without the data in the output, only the image sent to the model (on a cache miss) is preprocessed
+                if not keep_image_base64 and (caption_text is not None or request_image is not None):
+                    for element in copies:
+                        images.pop(id(element), None)
+
+                    continue
+
+                # Resizing is CPU-bound, keep it off the event loop
+                image_bytes, mime_type = await asyncio.to_thread(
+                    preprocess_image,
+                    image_data,
+                    copies[0]['metadata']['image_mime_type'],
+                    max_image_dimension,
+                    image_format,
+                    image_quality
+                )
+
+                # The preprocessed data is only kept if it goes back into the output
+                for element in copies:
+                    images.pop(id(element), None)
+                    element['metadata']['image_mime_type'] = mime_type
+
+                    if keep_image_base64:
+                        images[id(element)] = image_bytes
+
+                # The first copy of the group is the one captioned
+                request_image = request_image or (image_bytes, mime_type)
+                del image_data, image_bytes
+
+            if caption_text is None:
+                try:
+                    caption_text = await _request_caption(*request_image, llm, scheduler)
+                except Exception:
+                    logging.warning(f"Failed to caption image {group[0].get('element_id', 'unknown')}, leaving it uncaptioned\n{traceback.format_exc()}")
+                    return
+
+                if caption_cache:
+                    await caption_cache.aset(cache_key, model_name, CAPTION_PROMPT, caption_text)
+
+        for element in group:
+            _apply_caption(element, caption_text)
+
+    await asyncio.gather(*[caption(key, group) for key, group in image_groups.items()])
+
+    if keep_image_base64:
+        for element in filtered_elements:
+            if _is_image_element(element):
+                element['metadata']['image_base64'] = base64.b64encode(images[id(element)]).decode('utf-8')
 
     return filtered_elements
@@ -1,8 +1,10 @@
 from typing import Generator
-from typing import List, Optional
+from typing import List, Optional, Iterable, Iterator
 
 from unstructured.documents.elements import Element, ListItem, NarrativeText, Title, PageBreak
 
+from SemanticDocumentParser.element_parsers.section_index import SectionIndex
+
 
 def _list_group_parser(elements: List[ListItem], header_node: Optional[NarrativeText]) -> List[Element]:
     """
@@ -62,7 +64,7 @@ def _list_group_parser(elements: List[ListItem], header_node: Optional[Narrative
     return nodes
 
 
-def _iterate_without_page_breaks(elements: List[Element]) -> Generator[Element, None, None]:
+def _iterate_without_page_breaks(elements: Iterable[Element]) -> Generator[Element, None, None]:
     """
     Remove page breaks using a cheeky generator method. Necessary for list parser across multiple pages.
 
@@ -77,52 +79,69 @@ def _iterate_without_page_breaks(elements: List[Element]) -> Generator[Element,
         yield element
 
 
-def list_parser(elements: List[Element]) -> List[Element]:
+def iter_list_parser(elements: Iterable[Element], section_index: Optional[SectionIndex] = None) -> Iterator[Element]:
     """
-    Each item in a list is its own semantic unit of information.
-
-    Lists should be represented in their TOTAL form, but also with individual items.
+    Streaming list_parser. Holds back at most one NarrativeText (a possible list intro) & the open list group.
 
-    :param elements: All elements of a document
+    :param elements: All elements of a document, in order
+    :param section_index: The section index of the partitioned elements, used for list headers when given
     :return: Elements with lists nodes enhanced properly and converted to NarrativeText
 
     """
 
-    nodes: List[Element] = []
     last_title: Optional[Title] = None
-    last_node: Optional[Element] = None
+    held_node: Optional[NarrativeText] = None
     list_group: List[ListItem] = []
     header_node: Optional[Title] = None
 
     for element in _iterate_without_page_breaks(elements):
 
-        if isinstance(element, Title):
-            # flush any open list
-            if list_group:
-                nodes.extend(_list_group_parser(list_group, header_node))
-                list_group = []
-                header_node = None
-            nodes.append(element)
-            last_title = element
-        elif isinstance(element, ListItem):
+        if isinstance(element, ListItem):
             if not list_group:
                 # start new list group: use last seen Title as header
-                header_node = last_title
+                header_node = section_index.nearest_title(element) if section_index and element in section_index else last_title
                 # drop narrative intro if it exists
-                if isinstance(last_node, NarrativeText) and last_node != header_node and nodes:
-                    nodes.pop()
+                held_node = None
             list_group.append(element)
-        else:
-            # non-list element: flush list if open
-            if list_group:
-                nodes.extend(_list_group_parser(list_group, header_node))
-                list_group = []
-                header_node = None
-            nodes.append(element)
+            continue
+
+        # non-list element: flush list if open
+        if list_group:
+            yield from _list_group_parser(list_group, header_node)
+            list_group = []
+            header_node = None
+
+        if held_node is not None:
+            yield held_node
+            held_node = None
+
+        if isinstance(element, Title):
+            last_title = element
 
-        last_node = element
+        # A NarrativeText can't be emitted until we know it doesn't introduce a list
+        if isinstance(element, NarrativeText):
+            held_node = element
+        else:
+            yield element
 
     # flush at end
+    if held_node is not None:
+        yield held_node
+
     if list_group:
-        nodes.extend(_list_group_parser(list_group, header_node))
-    return nodes
+        yield from _list_group_parser(list_group, header_node)
+
+
+def list_parser(elements: List[Element], section_index: Optional[SectionIndex] = None) -> List[Element]:
+    """
+    Each item in a list is its own semantic unit of information.
+
+    Lists should be represented in their TOTAL form, but also with individual items.
+
+    :param elements: All elements of a document
+    :param section_index: The section index of the partitioned elements, used for list headers when given
+    :return: Elements with lists nodes enhanced properly and converted to NarrativeText
+
+    """
+
+    return list(iter_list_parser(elements, section_index))
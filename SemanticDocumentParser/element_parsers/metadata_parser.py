@@ -1,12 +1,15 @@
 import re
-from typing import List
+from typing import List, Iterable, Iterator, Tuple, Dict
 
 from unstructured.documents.elements import Element
 
+_HREF_PATTERN = re.compile(r'<a[^>]*href="([^"]*)"[^>]*>([^<]*)</a>')
+
 
 def _parse_element_urls(element: Element) -> None:
     """
     Replace the URL in-text into the element using Markdown hyperlink syntax. In-place modification of element.
+    The text is rebuilt once from its segments, in order of the link spans. Links overlapping an earlier one are skipped.
 
     Known Limitation: Unstructured does not parse the hyperlinks within Table elements.
 
@@ -14,18 +17,25 @@ def _parse_element_urls(element: Element) -> None:
     :return: None
     """
 
-    change_delta: int = 0
+    text: str = element.text
+    segments: List[str] = []
+    cursor: int = 0
 
-    for link in element.metadata.links:
+    for link in sorted(element.metadata.links, key=lambda link: link['start_index']):
         # Deconstruct dict
-        start_index: int = link['start_index'] + change_delta
+        start_index: int = link['start_index']
         link_text: str = link['text']
-        end_index: int = start_index + len(link_text)
+
+        if start_index < cursor:
+            continue
 
         # Create Markdown link
-        markdown_link = f"[{link_text}]({link['url']})"
-        change_delta += len(markdown_link) - len(link_text)
-        element.text = element.text[:start_index] + markdown_link + element.text[end_index:]
+        segments.append(text[cursor:start_index])
+        segments.append(f"[{link_text}]({link['url']})")
+        cursor = start_index + len(link_text)
+
+    segments.append(text[cursor:])
+    element.text = "".join(segments)
 
     # Clean up unused metadata
     element.metadata.link_texts = None
@@ -33,33 +43,75 @@ def _parse_element_urls(element: Element) -> None:
     element.metadata.link_urls = None
 
 
+def _substitute_link_texts(text: str, links: Iterable[Tuple[str, str]]) -> str:
+    """
+    Replace every occurrence of each link text with its Markdown link, in a single pass over the text.
+    Longer link texts win over the shorter ones they contain, and inserted links are never rescanned.
+
+    :param text: The text
+    :param links: (link text, URL) pairs. A repeated link text keeps its first URL.
+    :return: The text with the links substituted
+
+    """
+
+    link_urls: Dict[str, str] = {}
+
+    for link_text, url in links:
+        if link_text:
+            link_urls.setdefault(link_text, url)
+
+    if not link_urls:
+        return text
+
+    pattern = re.compile("|".join(re.escape(link_text) for link_text in sorted(link_urls, key=len, reverse=True)))
+    return pattern.sub(lambda match: f"[{match.group(0)}]({link_urls[match.group(0)]})", text)
+
+
 def _manual_link_detection(element: Element) -> None:
     """
     Manually detect and replace common link patterns that unstructured might miss.
     This handles cases where unstructured stores link info in link_texts/link_urls instead of links array.
     """
-    text = element.text
-    
+
     # Check if we have link texts and URLs in metadata
     if (hasattr(element.metadata, 'link_texts') and element.metadata.link_texts and
-        hasattr(element.metadata, 'link_urls') and element.metadata.link_urls):
-        
+            hasattr(element.metadata, 'link_urls') and element.metadata.link_urls):
+
         # Match each link text with its corresponding URL
-        for i, link_text in enumerate(element.metadata.link_texts):
-            if i < len(element.metadata.link_urls):
-                url = element.metadata.link_urls[i]
-                markdown_link = f"[{link_text}]({url})"
-                text = text.replace(link_text, markdown_link)
-    
+        element.text = _substitute_link_texts(element.text, zip(element.metadata.link_texts, element.metadata.link_urls))
+
     # Also check for HTML in text_as_html metadata
     elif hasattr(element.metadata, 'text_as_html') and element.metadata.text_as_html:
-        html = element.metadata.text_as_html
-        href_matches = re.findall(r'<a[^>]*href="([^"]*)"[^>]*>([^<]*)</a>', html)
-        for url, link_text in href_matches:
-            markdown_link = f"[{link_text}]({url})"
-            text = text.replace(link_text, markdown_link)
-    
-    element.text = text
+        href_matches = _HREF_PATTERN.findall(element.metadata.text_as_html)
+        element.text = _substitute_link_texts(element.text, ((link_text, url) for url, link_text in href_matches))
+
+
+def _parse_element_metadata(element: Element) -> None:
+    """
+    Substitute the element's hyperlinks & remove its unnecessary metadata. In-place modification of element.
+
+    :param element: The element to parse
+    :return: None
+
+    """
+
+    # Check if links are detected in the standard format
+    if hasattr(element.metadata, 'links') and element.metadata.links:
+        _parse_element_urls(element)
+    else:
+        # Try manual link detection for cases unstructured stores differently
+        _manual_link_detection(element)
+
+    # Other stuff we don't care about
+    element.metadata.filetype = None
+    element.metadata.languages = None
+    element.metadata.page_number = None
+
+    # Clean up link metadata after processing
+    if hasattr(element.metadata, 'link_texts'):
+        element.metadata.link_texts = None
+    if hasattr(element.metadata, 'link_urls'):
+        element.metadata.link_urls = None
 
 
 def metadata_parser(elements: List[Element]) -> None:
@@ -73,23 +125,21 @@ def metadata_parser(elements: List[Element]) -> None:
     """
 
     for element in elements:
-        # Check if links are detected in the standard format
-        if hasattr(element.metadata, 'links') and element.metadata.links:
-            _parse_element_urls(element)
-        else:
-            # Try manual link detection for cases unstructured stores differently
-            _manual_link_detection(element)
-
-        # Other stuff we don't care about
-        element.metadata.filetype = None
-        element.metadata.languages = None
-        element.metadata.page_number = None
-        
-        # Clean up link metadata after processing
-        if hasattr(element.metadata, 'link_texts'):
-            element.metadata.link_texts = None
-        if hasattr(element.metadata, 'link_urls'):
-            element.metadata.link_urls = None
-
-
-__all__ = ["metadata_parser"]
+        _parse_element_metadata(element)
+
+
+def iter_metadata_parser(elements: Iterable[Element]) -> Iterator[Element]:
+    """
+    Streaming metadata_parser. Each element is parsed (in-place) as it is pulled.
+
+    :param elements: The elements
+    :return: The parsed elements
+
+    """
+
+    for element in elements:
+        _parse_element_metadata(element)
+        yield element
+
+
+__all__ = ["metadata_parser", "iter_metadata_parser"]
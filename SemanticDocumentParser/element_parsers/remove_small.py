@@ -1,15 +1,18 @@
-from typing import List
+from typing import List, Union
+
+from SemanticDocumentParser.chunk import Chunk
 
 
 def remove_small(
-        dict_elements: List[dict],
+        dict_elements: List[Union[dict, Chunk]],
         min_length: int = 10
-) -> List[dict]:
-    good_elements: List[dict] = []
+) -> List[Union[dict, Chunk]]:
+    good_elements: List[Union[dict, Chunk]] = []
 
     for element in dict_elements:
 
-        if len(element['text']) >= min_length:
+        # Windowed texts are already stripped, so this does not copy them
+        if len(element['text'].strip()) >= min_length:
             good_elements.append(element)
 
     return good_elements
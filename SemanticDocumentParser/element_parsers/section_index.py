@@ -0,0 +1,80 @@
+from typing import List, TypedDict, Optional, Dict
+
+from unstructured.documents.elements import Element, Title
+
+
+class SectionContext(TypedDict):
+    """Where an element sits in the document's section structure"""
+
+    position: int
+    title: Optional[Title]
+    title_position: Optional[int]
+
+
+class SectionIndex:
+    """
+    Section context of every element, built in a single pass right after partitioning so stages can look it up in O(1)
+    instead of re-scanning their neighbours.
+
+    Elements are keyed by identity, so stages can keep looking up the original elements after they rebuild the list.
+    Elements created by a stage are not indexed.
+
+    """
+
+    def __init__(self, elements: List[Element]):
+        # Holding the elements keeps their ids from being reused while the index is alive
+        self._elements: List[Element] = list(elements)
+        self._contexts: Dict[int, SectionContext] = {}
+
+        title: Optional[Title] = None
+        title_position: Optional[int] = None
+
+        for position, element in enumerate(self._elements):
+            self._contexts[id(element)] = SectionContext(
+                position=position,
+                title=title,
+                title_position=title_position
+            )
+
+            if isinstance(element, Title):
+                title, title_position = element, position
+
+    def __contains__(self, element: Element) -> bool:
+        return id(element) in self._contexts
+
+    def __len__(self) -> int:
+        return len(self._contexts)
+
+    def get(self, element: Element) -> Optional[SectionContext]:
+        """
+        Look up an element's context
+
+        :param element: The element
+        :return: Its context, or None if it was not indexed
+
+        """
+
+        return self._contexts.get(id(element))
+
+    def nearest_title(self, element: Element, max_distance: Optional[int] = None) -> Optional[Title]:
+        """
+        The closest Title before the element
+
+        :param element: The element
+        :param max_distance: Only look this many elements back
+        :return: The Title, or None if there is none (in range)
+
+        """
+
+        context: Optional[SectionContext] = self.get(element)
+
+        if context is None or context['title'] is None:
+            return None
+
+        if max_distance is not None and context['position'] - context['title_position'] > max_distance:
+            return None
+
+        return context['title']
+
+
+__all__ = ["SectionIndex", "SectionContext"]
@@ -1,7 +1,4 @@
-import asyncio
-import itertools
-from asyncio import Task
-from typing import List, TypedDict, Optional, Tuple
+from typing import List, TypedDict, Optional, Iterator, Iterable
 
 from llama_index.core.schema import Document, BaseNode
 from unstructured.documents.elements import Element, Title, NarrativeText
@@ -51,31 +48,43 @@ def _create_element_groups(elements: List[Element]) -> List[ElementGroup]:
     return element_groups if element_groups else [ElementGroup(title_node=None, nodes=elements)]
 
 
-async def _semantic_split_node(
+def iter_element_groups(elements: Iterable[Element]) -> Iterator[List[Element]]:
+    """
+    Streaming version of _create_element_groups. Each group is yielded (title first) once the next Title is reached.
+
+    :param elements: The elements, in order
+    :return: The element lists of the groups
+
+    """
+
+    current_group: List[Element] = []
+
+    for element in elements:
+        if isinstance(element, Title) and current_group:
+            yield current_group
+            current_group = []
+
+        current_group.append(element)
+
+    if current_group:
+        yield current_group
+
+
+def _split_node_to_elements(
         title_node: Optional[Title],
         node: NarrativeText,
-        node_parser: AsyncSemanticSplitterNodeParser
+        llama_nodes: List[BaseNode]
 ) -> List[NarrativeText]:
     """
-    Run semantic splitting on each text node to subdivide bulky paragraphs into semantic units
+    Turn the semantic splits of a text node back into NarrativeText elements
 
     :param title_node: The Title the node falls under
-    :param node: The node to parse
-    :param node_parser: The node parser to use
+    :param node: The node that was split
+    :param llama_nodes: The Llama-Index nodes produced by splitting it
     :return: The unstructured NarrativeText elements
 
     """
 
-    # Note: Uses a Llama-Index Document type
-    document: Document = Document(
-        text=node.text
-    )
-
-    # Note: Produces Llama-Index nodes
-    llama_nodes: List[BaseNode] = await node_parser.abuild_semantic_nodes_from_documents(
-        documents=[document]
-    )
-
     elements: List[NarrativeText] = []
     header_level: str = ("#" * (title_node.metadata.category_depth or 2)) if title_node and hasattr(title_node.metadata, 'category_depth') else "##"
     title_text: str = (header_level + " " + title_node.text) if title_node else ""
@@ -96,46 +105,10 @@ async def _semantic_split_node(
 PARSER_GENERATED_SIGNATURE = "PARSER_GENERATED"
 
 
-async def _semantic_split_element_group(
-        group: ElementGroup,
-        node_parser: AsyncSemanticSplitterNodeParser
-):
-    """
-    Process an element group. Semantically split paragraphs into further nodes.
+def _is_split_candidate(node: Element) -> bool:
+    """Only source NarrativeText gets split. Other node types are their own semantic units & are passed on."""
 
-    :param group: The element group to process
-    :return: The 1D processed node split
-
-    """
-
-    # First represent the entire group itself, in case that provides more complete meaning
-    nodes: List[Element] = []
-    # preserve the heading Title at the start of this group
-    if group['title_node'] is not None:
-        nodes.append(group['title_node'])
-
-    parse_tasks: List[Task] = []
-
-    for node in group['nodes']:
-
-        # Other node types can be parsed as their own semantic units & just need to be passed on
-        if (not isinstance(node, NarrativeText)) or node.metadata.data_source == "GENERATED":
-            nodes.append(node)
-            continue
-
-        parse_tasks.append(
-            asyncio.create_task(
-                _semantic_split_node(
-                    group['title_node'],
-                    node,
-                    node_parser
-                )
-            )
-        )
-
-    parse_result: Tuple[List[Element]] = await asyncio.gather(*parse_tasks)
-    nodes.extend(list(itertools.chain.from_iterable(parse_result)))
-    return nodes
+    return isinstance(node, NarrativeText) and node.metadata.data_source != "GENERATED"
 
 
 async def semantic_splitter(
@@ -153,6 +126,9 @@ async def semantic_splitter(
             ii. By running semantic splitting WITHIN these chunks
             iii. By returning a 1D array for each group that gets combined
 
+    The sentences of every NarrativeText in the document are embedded together in a few full-size batches,
+    then each node gets its own splits back.
+
     Edge Cases Handled:
         - Adjacent titles
 
@@ -164,16 +140,36 @@ async def semantic_splitter(
 
     # Split into groups between Title elements
     element_groups: List[ElementGroup] = _create_element_groups(elements)
-    parse_tasks: List[Task] = []
+
+    # Split every candidate node in the document in one go
+    documents: List[Document] = [
+        # Note: Uses a Llama-Index Document type
+        Document(text=node.text)
+        for group in element_groups for node in group['nodes'] if _is_split_candidate(node)
+    ]
+
+    # Note: Produces Llama-Index nodes
+    llama_nodes_iter: Iterator[List[BaseNode]] = iter(
+        await node_parser.abuild_semantic_nodes_per_document(documents=documents)
+    )
+
+    nodes: List[Element] = []
 
     for group in element_groups:
-        parse_tasks.append(
-            asyncio.create_task(
-                _semantic_split_element_group(
-                    group, node_parser
-                )
-            )
-        )
+        # preserve the heading Title at the start of this group
+        if group['title_node'] is not None:
+            nodes.append(group['title_node'])
 
-    parse_result: Tuple[List[Element]] = await asyncio.gather(*parse_tasks)
-    return list(itertools.chain.from_iterable(parse_result))
+        split_nodes: List[Element] = []
+
+        for node in group['nodes']:
+            if not _is_split_candidate(node):
+                nodes.append(node)
+                continue
+
+            split_nodes.extend(_split_node_to_elements(group['title_node'], node, next(llama_nodes_iter)))
+
+        # The split paragraphs follow the group's other nodes
+        nodes.extend(split_nodes)
+
+    return nodes
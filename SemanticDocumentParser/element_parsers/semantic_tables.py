@@ -4,12 +4,23 @@ import logging
 import textwrap
 import traceback
 from json import JSONDecodeError
-from typing import List, Awaitable, Optional, Union
+from typing import List, Awaitable, Optional, Union, Tuple, TypedDict, Callable
 
 from llama_index.core.base.llms.types import ChatResponse, ChatMessage
 from llama_index.core.llms import LLM
 from unstructured.documents.elements import Element, Table, NarrativeText, Title
 
+from SemanticDocumentParser.caching.table_cache import TableCache
+from SemanticDocumentParser.element_parsers.simple_tables import SimpleTableClassifier, classify_table_html, render_simple_table
+from SemanticDocumentParser.element_parsers.table_html import TableRows
+from SemanticDocumentParser.llm_scheduler import LLMScheduler
+
+
+class SemanticTablesStats(TypedDict):
+    llm_tables: int
+    bypassed_tables: int
+
+
 SemanticUnitsTemplate: ChatMessage = ChatMessage(
     role="system",
     additional_kwargs={},
@@ -48,6 +59,28 @@ SemanticSummaryTemplate: ChatMessage = ChatMessage(
     )
 )
 
+SemanticTableTemplate: ChatMessage = ChatMessage(
+    role="system",
+    additional_kwargs={},
+    content=textwrap.dedent(
+        """
+        You will be given a table. Reply with a single valid JSON object with exactly two keys, "summary" and "units".
+        Do NOT include HTML.
+        
+        "summary": The header cells may be in the first row, first column, both, or neither. 
+        First, describe the table. Then, determine the header cells, and use them to list the number of each item in the table.
+        
+        "units": The table converted into a list of natural language strings, one for each unit of information.
+        
+        Here is an example response to a table:
+        
+        {"summary": "Tutorials are offered at different times in different locations. There are 3 total tutorials, 2 different TAs, 3 times to meet, 3 rooms to meet, and 3 Zoom URLs.", "units": ["Tutorial 1 with TA Donald Ipperciel is scheduled for Thursday from 4:30 PM to 5:15 PM in room VH 1018. You can join the Zoom session at https://yorku.zoom.us/j/98541900339.", "Tutorial 2 with TA Susan Cawley is scheduled for Thursday from 4:30 PM to 5:15 PM in room HNE 105. You can join the Zoom session at https://yorku.zoom.us/j/98541900339.", "Tutorial 3 with TA Susan Cawley is scheduled for Thursday from 5:30 PM to 6:15 PM in room VH 2005. You can join the Zoom session at https://yorku.zoom.us/j/98541900339."]}
+        
+        Now you try:
+        """
+    )
+)
+
 
 def _parse_llm_json_response(response: ChatResponse) -> list[str]:
     """
@@ -75,10 +108,135 @@ def _parse_llm_json_response(response: ChatResponse) -> list[str]:
         return []
 
 
+def _parse_llm_json_object_response(response: ChatResponse) -> Tuple[str, list[str]]:
+    """
+    Parse the LLM's combined summary & units JSON response. We must make sure it replied exactly how it should.
+
+    :param response: The LLM response
+    :return: The summary & the units. Whichever part is missing or malformed comes back empty.
+
+    """
+
+    try:
+        reply: dict = json.loads(response.message.content)
+
+        if not isinstance(reply, dict):
+            raise JSONDecodeError("LLM returned invalid JSON object for Table", response.message.content, 0)
+    except JSONDecodeError:
+        logging.error(
+            "Failed to parse a table! Got invalid reply: "
+            + response.message.content + "\n"
+            + traceback.format_exc()
+        )
+        return "", []
+
+    summary: str = reply.get("summary") if isinstance(reply.get("summary"), str) else ""
+    units: list = reply.get("units") if isinstance(reply.get("units"), list) else []
+
+    # Happens if the table is empty, or the LLM gave back something other than strings
+    if not summary or not all(isinstance(unit, str) for unit in units):
+        logging.error("Failed to parse a table! Got incomplete reply: " + response.message.content)
+
+    return summary, [unit for unit in units if isinstance(unit, str)]
+
+
+def _is_units_reply(reply: Optional[str]) -> bool:
+    """
+    Check that a units reply is a JSON array of strings (empty for an empty table), so it can be served again
+
+    :param reply: The reply text
+    :return: Whether the reply is well-formed
+
+    """
+
+    try:
+        units = json.loads(reply)
+    except (TypeError, JSONDecodeError):
+        return False
+
+    return isinstance(units, list) and all(isinstance(unit, str) for unit in units)
+
+
+def _is_table_reply(reply: Optional[str]) -> bool:
+    """
+    Check that a single-call reply is a JSON object with a string summary & a list of string units, so it can be
+    served again
+
+    :param reply: The reply text
+    :return: Whether the reply is well-formed
+
+    """
+
+    try:
+        table_reply = json.loads(reply)
+    except (TypeError, JSONDecodeError):
+        return False
+
+    if not isinstance(table_reply, dict) or not isinstance(table_reply.get("summary"), str):
+        return False
+
+    units = table_reply.get("units")
+    return isinstance(units, list) and all(isinstance(unit, str) for unit in units)
+
+
+async def _achat_table(
+        template: ChatMessage,
+        element: Table,
+        llm: LLM,
+        scheduler: LLMScheduler,
+        table_cache: Optional[TableCache],
+        cacheable: Callable[[Optional[str]], bool]
+) -> ChatResponse:
+    """
+    Send the table to the LLM with the given prompt, or serve the reply from the table cache.
+    With a table cache, copies of the table being parsed at the same time share one request.
+
+    :param template: The system prompt
+    :param element: The table
+    :param llm: The LLM
+    :param scheduler: The scheduler the LLM request goes through
+    :param table_cache: The table cache, if any
+    :param cacheable: Whether a reply is well-formed, & so worth caching
+    :return: The LLM response
+
+    """
+
+    table_html: str = element.metadata.text_as_html
+
+    async def request() -> Optional[str]:
+        # Query the LLM using Llama-Index
+        response: ChatResponse = await scheduler.achat(
+            llm,
+            messages=(
+                [
+                    template,
+                    ChatMessage(
+                        role="user",
+                        content=table_html,
+                        additional_kwargs={}
+                    )
+                ]
+            )
+        )
+
+        return response.message.content
+
+    if table_cache is None:
+        reply: Optional[str] = await request()
+    else:
+        reply = await table_cache.aget_or_request(
+            table_html, llm.metadata.model_name, template.content, request, cacheable
+        )
+
+    return ChatResponse(message=ChatMessage(role="assistant", content=reply))
+
+
 async def _semantic_summarize_table(
         element: Table,
         previous_element: Optional[Union[NarrativeText, Title]],
-        llm: LLM
+        llm: LLM,
+        scheduler: LLMScheduler,
+        table_cache: Optional[TableCache] = None
 ) -> NarrativeText:
     """
     Given a Python table, semantically summarize the elements in the table using an LLM
@@ -86,22 +244,14 @@ async def _semantic_summarize_table(
     :param element: The table to summarize
     :param previous_element: The previous element in the table
     :param llm: The LLM used for the summary task
+    :param scheduler: The scheduler the LLM request goes through
+    :param table_cache: Serves replies for tables that were already summarized
     :return: The summary elements
 
     """
 
-    # Query the LLM using Llama-Index
-    response: ChatResponse = await llm.achat(
-        messages=(
-            [
-                SemanticSummaryTemplate,
-                ChatMessage(
-                    role="user",
-                    content=element.metadata.text_as_html,
-                    additional_kwargs={}
-                )
-            ]
-        )
+    response: ChatResponse = await _achat_table(
+        SemanticSummaryTemplate, element, llm, scheduler, table_cache, lambda reply: reply is not None
     )
 
     # Read the summary as JSON
@@ -117,31 +267,23 @@ async def _semantic_summarize_table(
 async def _semantic_parse_table(
         element: Table,
         previous_element: Optional[Union[NarrativeText, Title]],
-        llm: LLM
+        llm: LLM,
+        scheduler: LLMScheduler,
+        table_cache: Optional[TableCache] = None
 ) -> List[NarrativeText]:
     """
     Split a table into semantic units of information using GPT.
 
     :param element: The element to parse
     :param llm: The LLM used to parse the table
+    :param scheduler: The scheduler the LLM request goes through
+    :param table_cache: Serves replies for tables that were already parsed
     :return: The parsed table as elements
 
     """
 
-    # Query the LLM using Llama-Index
-    response: ChatResponse = (
-        await llm.achat(
-            messages=(
-                [
-                    SemanticUnitsTemplate,
-                    ChatMessage(
-                        role="user",
-                        content=element.metadata.text_as_html,
-                        additional_kwargs={}
-                    )
-                ]
-            )
-        )
+    response: ChatResponse = await _achat_table(
+        SemanticUnitsTemplate, element, llm, scheduler, table_cache, _is_units_reply
     )
 
     # Parse the items in the table
@@ -163,7 +305,9 @@ async def _semantic_parse_table(
 async def _semantic_ingest_table(
         element: Table,
         previous_element: Optional[Union[NarrativeText, Title]],
-        llm: LLM
+        llm: LLM,
+        scheduler: LLMScheduler,
+        table_cache: Optional[TableCache] = None
 ) -> List[NarrativeText]:
     """
     Parse the table & create a summary of it. Also include a raw copy of the table.
@@ -171,6 +315,8 @@ async def _semantic_ingest_table(
     :param element: The element to parse
     :param previous_element: The previous element before the table, if it was a Title or NarrativeText
     :param llm: The LLM used to parse the table
+    :param scheduler: The scheduler the LLM requests go through
+    :param table_cache: Serves replies for tables that were already seen
     :return: List of NarrativeText elements generated from the table
 
     """
@@ -178,8 +324,8 @@ async def _semantic_ingest_table(
     elements: List[NarrativeText] = []
 
     tasks: List[Awaitable] = [
-        _semantic_parse_table(element, previous_element, llm),
-        _semantic_summarize_table(element, previous_element, llm)
+        _semantic_parse_table(element, previous_element, llm, scheduler, table_cache),
+        _semantic_summarize_table(element, previous_element, llm, scheduler, table_cache)
     ]
 
     results = await asyncio.gather(*tasks)
@@ -189,7 +335,84 @@ async def _semantic_ingest_table(
     return elements
 
 
-async def semantic_tables(elements: List[Element], llm) -> List[Element]:
+async def _semantic_ingest_table_single_call(
+        element: Table,
+        previous_element: Optional[Union[NarrativeText, Title]],
+        llm: LLM,
+        scheduler: LLMScheduler,
+        table_cache: Optional[TableCache] = None
+) -> List[NarrativeText]:
+    """
+    Same output as _semantic_ingest_table, but asks for the units & the summary in one LLM request, so the table HTML is
+    only sent (and billed) once.
+
+    :param element: The element to parse
+    :param previous_element: The previous element before the table, if it was a Title or NarrativeText
+    :param llm: The LLM used to parse the table
+    :param scheduler: The scheduler the LLM request goes through
+    :param table_cache: Serves replies for tables that were already seen
+    :return: List of NarrativeText elements generated from the table
+
+    """
+
+    response: ChatResponse = await _achat_table(
+        SemanticTableTemplate, element, llm, scheduler, table_cache, _is_table_reply
+    )
+    summary, element_texts = _parse_llm_json_object_response(response)
+
+    elements: List[NarrativeText] = []
+    element_header: str = previous_element.text + "\n\n" if previous_element else ""
+
+    for idx, element_text in enumerate(element_texts):
+        elements.append(
+            NarrativeText(
+                text=element_header + f"List Item {idx + 1}: {element_text}",
+                metadata=element.metadata
+            )
+        )
+
+    if summary:
+        summary_header: str = previous_element.text + "\n" if previous_element else ""
+        elements.append(NarrativeText(text=summary_header + summary, metadata=element.metadata))
+
+    return elements
+
+
+async def _deterministic_ingest_table(
+        element: Table,
+        previous_element: Optional[Union[NarrativeText, Title]],
+        rows: TableRows
+) -> List[NarrativeText]:
+    """
+    Render a simple table without the LLM, in the same form as the LLM units
+
+    :param element: The element to parse
+    :param previous_element: The previous element before the table, if it was a Title or NarrativeText
+    :param rows: The table's rows of cells
+    :return: List of NarrativeText elements generated from the table
+
+    """
+
+    element_header: str = previous_element.text + "\n\n" if previous_element else ""
+
+    return [
+        NarrativeText(
+            text=element_header + f"List Item {idx + 1}: {element_text}",
+            metadata=element.metadata
+        )
+        for idx, element_text in enumerate(render_simple_table(rows))
+    ]
+
+
+async def semantic_tables(
+        elements: List[Element],
+        llm,
+        scheduler: Optional[LLMScheduler] = None,
+        table_cache: Optional[TableCache] = None,
+        single_call: bool = False,
+        simple_table_classifier: Optional[SimpleTableClassifier] = None,
+        stats: Optional[SemanticTablesStats] = None
+) -> List[Element]:
     """
     Semantically separate tables into natural language using an LLM
 
@@ -197,10 +420,18 @@ async def semantic_tables(elements: List[Element], llm) -> List[Element]:
 
     :param elements: The elements in the table
     :param llm: The LLM to use for comprehension of the table
+    :param scheduler: The scheduler LLM requests go through. Defaults to one without limits.
+    :param table_cache: Serves LLM replies for tables already seen, in this or earlier runs
+    :param single_call: Ask for the units & the summary of a table in one request instead of two
+    :param simple_table_classifier: Tables it deems simple are rendered without the LLM. None sends every table to the LLM.
+    :param stats: Incremented with the number of tables sent to the LLM & bypassing it
     :return: The list of elements parsed from the table
 
     """
 
+    scheduler = scheduler or LLMScheduler()
+    ingest_table = _semantic_ingest_table_single_call if single_call else _semantic_ingest_table
+
     tasks: List[Awaitable] = []
     nodes: List[Element] = []
 
@@ -218,10 +449,22 @@ async def semantic_tables(elements: List[Element], llm) -> List[Element]:
             if isinstance(elements[idx - 1], NarrativeText) or isinstance(elements[idx - 1], Title):
                 previous_element = elements[idx - 1]
 
+        simple_table_rows: Optional[TableRows] = (
+            classify_table_html(element.metadata.text_as_html, simple_table_classifier)
+            if simple_table_classifier is not None else None
+        )
+
+        if stats is not None:
+            stats['llm_tables' if simple_table_rows is None else 'bypassed_tables'] += 1
+
         # Add the task
+        if simple_table_rows is not None:
+            tasks.append(_deterministic_ingest_table(element, previous_element, simple_table_rows))
+            continue
+
         tasks.append(
-            _semantic_ingest_table(
-                element, previous_element, llm
+            ingest_table(
+                element, previous_element, llm, scheduler, table_cache
             )
         )
 
@@ -0,0 +1,129 @@
+from typing import List, Optional
+
+from SemanticDocumentParser.element_parsers.table_html import TableRows, TableCell, read_table_rows
+
+
+def _cell_text(cell: TableCell) -> str:
+    text: str = " ".join(cell['text'].split())
+    return f"{text} ({cell['href']})" if cell['href'] and text else text
+
+
+def _has_header_row(rows: TableRows) -> bool:
+    return bool(rows) and all(cell['is_header'] for cell in rows[0])
+
+
+class SimpleTableClassifier:
+    """
+    Decides from a table's shape whether it is simple enough (a key/value grid, a single-column layout table, or a small
+    table with a header row) to be rendered deterministically instead of by the LLM.
+
+    """
+
+    def __init__(
+            self,
+            max_rows: int = 25,
+            max_columns: int = 2,
+            max_empty_cell_ratio: float = 0.5,
+            allow_merged_cells: bool = False
+    ):
+        """
+        Create the classifier
+
+        :param max_rows: Tables with more rows go to the LLM
+        :param max_columns: Tables with more columns go to the LLM. Tables with over 2 columns also need a header row.
+        :param max_empty_cell_ratio: Tables with a larger share of empty cells go to the LLM
+        :param allow_merged_cells: Whether tables with colspan/rowspan cells can be simple
+
+        """
+
+        self.max_rows: int = max_rows
+        self.max_columns: int = max_columns
+        self.max_empty_cell_ratio: float = max_empty_cell_ratio
+        self.allow_merged_cells: bool = allow_merged_cells
+
+    def is_simple(self, rows: TableRows) -> bool:
+        """
+        Check if a table can skip the LLM
+
+        :param rows: The table's rows of cells
+        :return: Whether the table is simple
+
+        """
+
+        cells: List[TableCell] = [cell for row in rows for cell in row]
+
+        # Nothing to render, so let the LLM make what it can of the table
+        if not cells:
+            return False
+
+        if len(rows) > self.max_rows:
+            return False
+
+        if not self.allow_merged_cells and any(cell['colspan'] > 1 or cell['rowspan'] > 1 for cell in cells):
+            return False
+
+        # Ragged rows mean the layout carries meaning we can't render
+        column_counts = {sum(cell['colspan'] for cell in row) for row in rows if row}
+
+        if len(column_counts) != 1:
+            return False
+
+        column_count: int = column_counts.pop()
+
+        if column_count > self.max_columns or (column_count > 2 and not _has_header_row(rows)):
+            return False
+
+        empty_cells: int = sum(not cell['text'].strip() for cell in cells)
+        return empty_cells / len(cells) <= self.max_empty_cell_ratio
+
+    def settings(self) -> dict:
+        return dict(vars(self))
+
+
+def render_simple_table(rows: TableRows) -> List[str]:
+    """
+    Render a simple table as natural language units, one per row
+
+    :param rows: The table's rows of cells
+    :return: The units
+
+    """
+
+    units: List[str] = []
+    header: Optional[List[str]] = [_cell_text(cell) for cell in rows[0]] if _has_header_row(rows) else None
+
+    for row in (rows[1:] if header else rows):
+        texts: List[str] = [_cell_text(cell) for cell in row]
+
+        if header and len(header) == len(texts):
+            unit: str = ", ".join(f"{name}: {text}" if name else text for name, text in zip(header, texts) if text)
+        elif len(texts) == 2 and all(texts):
+            unit = f"{texts[0]}: {texts[1]}"
+        else:
+            unit = " ".join(text for text in texts if text)
+
+        if unit:
+            units.append(unit)
+
+    return units
+
+
+def classify_table_html(table_html: Optional[str], classifier: SimpleTableClassifier) -> Optional[TableRows]:
+    """
+    Parse & classify a Table element's HTML
+
+    :param table_html: The table HTML
+    :param classifier: The classifier
+    :return: The rows if the table is simple, otherwise None
+
+    """
+
+    tables: List[TableRows] = read_table_rows(table_html or "")
+
+    if len(tables) != 1 or not classifier.is_simple(tables[0]):
+        return None
+
+    return tables[0]
+
+
+__all__ = ["SimpleTableClassifier", "render_simple_table", "classify_table_html"]
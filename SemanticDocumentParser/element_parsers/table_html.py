@@ -0,0 +1,116 @@
+from html.parser import HTMLParser
+from typing import List, TypedDict, Optional, Tuple
+
+
+class TableCell(TypedDict):
+    """A single td/th cell"""
+
+    text: str
+    href: Optional[str]
+    is_header: bool
+    colspan: int
+    rowspan: int
+
+
+TableRows = List[List[TableCell]]
+
+
+def _span(attrs: List[Tuple[str, Optional[str]]], name: str) -> int:
+    try:
+        return max(1, int(dict(attrs).get(name) or 1))
+    except ValueError:
+        return 1
+
+
+class _TableHTMLParser(HTMLParser):
+    """
+    Single pass over the HTML collecting the cells of each top-level table.
+    Nested tables are flattened into the text of the cell containing them.
+
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tables: List[TableRows] = []
+        self._table_depth: int = 0
+        self._cell: Optional[TableCell] = None
+        self._cell_text: List[str] = []
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag == "table":
+            self._table_depth += 1
+
+            if self._table_depth == 1:
+                self.tables.append([])
+
+        elif tag == "a":
+            # The cell's first link is kept
+            if self._cell is not None and self._cell['href'] is None:
+                self._cell['href'] = dict(attrs).get("href")
+
+        elif tag == "br":
+            self._cell_text.append("\n")
+
+        elif self._table_depth != 1:
+            return
+
+        elif tag == "tr":
+            self._end_cell()
+            self.tables[-1].append([])
+
+        elif tag in ("td", "th"):
+            self._end_cell()
+
+            # Cells outside a <tr> (malformed HTML) open their own row
+            if not self.tables[-1]:
+                self.tables[-1].append([])
+
+            self._cell = TableCell(
+                text="",
+                href=None,
+                is_header=tag == "th",
+                colspan=_span(attrs, "colspan"),
+                rowspan=_span(attrs, "rowspan")
+            )
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "table":
+            if self._table_depth == 1:
+                self._end_cell()
+
+            self._table_depth = max(0, self._table_depth - 1)
+
+        elif self._table_depth == 1 and tag in ("td", "th", "tr"):
+            self._end_cell()
+
+    def handle_data(self, data: str) -> None:
+        if self._cell is not None:
+            self._cell_text.append(data)
+
+    def _end_cell(self) -> None:
+        if self._cell is None:
+            return
+
+        self._cell['text'] = "".join(self._cell_text)
+        self.tables[-1][-1].append(self._cell)
+        self._cell = None
+        self._cell_text = []
+
+
+def read_table_rows(html_text: str) -> List[TableRows]:
+    """
+    Extract the rows of cells of every table in the HTML
+
+    :param html_text: The HTML text
+    :return: For each table, its rows of cells
+
+    """
+
+    parser: _TableHTMLParser = _TableHTMLParser()
+    parser.feed(html_text or "")
+    parser.close()
+
+    return parser.tables
+
+
+__all__ = ["TableCell", "TableRows", "read_table_rows"]
@@ -1,41 +1,180 @@
-from typing import List
+from typing import List, Union, Tuple
+
+from SemanticDocumentParser.chunk import Chunk, ChunkWindow
 
 WINDOW_SIZE: int = 1
+ELEMENT_MAX_LENGTH_FOR_WINDOWING: int = 1000
 
 
-def window_parser(elements: List[dict]) -> List[dict]:
-    dict_elements: List[dict] = []
-    element_max_length_for_windowing = 1000
+def _strip_texts(elements: List[Union[dict, Chunk]]) -> List[int]:
+    """
+    Strip the text of each element in place
 
-    for idx, element_data in enumerate(elements):
-        window_text = element_data['text'] = element_data['text'].strip()
-        node_before: int = idx - WINDOW_SIZE
-        node_after: int = idx + WINDOW_SIZE
+    :param elements: The elements
+    :return: The length of each stripped text
+
+    """
+
+    text_lengths: List[int] = []
+
+    for element_data in elements:
+        element_data['text'] = element_data['text'].strip()
+        text_lengths.append(len(element_data['text']))
+
+    return text_lengths
 
-        # If not the first node, add the text of the node before
-        # Only create window if the element itself is not super large
-        if node_before >= 0 and len(window_text) <= element_max_length_for_windowing:
-            node_before_text: str = elements[node_before]['text'].strip()
 
-            # Only add if the node BEFORE is not too large
-            if len(node_before_text) <= element_max_length_for_windowing:
-                window_text = elements[node_before]['text'].strip() + " " + window_text
+def _window_bounds(text_lengths: List[int], idx: int, window_size: int) -> Tuple[int, int]:
+    """
+    Find the neighbours included in an element's window. Neighbours are added outwards from the element while the
+    element itself (and then the window) is not too large, stopping at the first neighbour that is too large.
 
-        # If not the last node, add the text of the node after
-        # Only create window if the element itself is not super large
-        if node_after < len(elements) and len(window_text) <= element_max_length_for_windowing:
+    :param text_lengths: The stripped text lengths of the elements
+    :param idx: The element's index
+    :param window_size: The maximum number of neighbours on each side
+    :return: The window's [start, end) range
 
-            node_after_text: str = elements[node_after]['text'].strip()
+    """
 
-            # Only add if the node AFTER is not too large
-            if len(node_after_text) <= element_max_length_for_windowing:
-                window_text = window_text + " " + elements[node_after]['text'].strip()
+    element_max_length_for_windowing = ELEMENT_MAX_LENGTH_FOR_WINDOWING
+    start, end = idx, idx + 1
+    window_length: int = text_lengths[idx]
 
+    # Add the nodes before, if the window is not super large & the node BEFORE is not too large
+    while (
+            start > max(0, idx - window_size)
+            and window_length <= element_max_length_for_windowing
+            and text_lengths[start - 1] <= element_max_length_for_windowing
+    ):
+        start -= 1
+        window_length += text_lengths[start] + 1
+
+    # Add the nodes after, if the window is not super large & the node AFTER is not too large
+    while (
+            end <= idx + window_size
+            and end < len(text_lengths)
+            and window_length <= element_max_length_for_windowing
+            and text_lengths[end] <= element_max_length_for_windowing
+    ):
+        window_length += text_lengths[end] + 1
+        end += 1
+
+    return start, end
+
+
+def _set_window(element_data: Union[dict, Chunk], texts: List[str], start: int, end: int, offset: int = 0) -> None:
+    # Chunks keep the range, so the text is only joined when it's read
+    if isinstance(element_data, Chunk):
+        element_data.window = ChunkWindow(texts, start, end, offset)
+    else:
         element_data['metadata'] = {
             **element_data['metadata'],
-            'window': window_text
+            'window': " ".join(texts[start - offset:end - offset])
         }
 
-        dict_elements.append(element_data)
+
+def window_parser(elements: List[Union[dict, Chunk]], window_size: int = WINDOW_SIZE) -> List[Union[dict, Chunk]]:
+    """
+    Attach to each element the text of the elements around it, in one pass over the (once-stripped) texts
+
+    :param elements: The elements, in document order
+    :param window_size: The maximum number of neighbours on each side
+    :return: The elements. Dicts get the window text under metadata, Chunks a ChunkWindow.
+
+    """
+
+    text_lengths: List[int] = _strip_texts(elements)
+    texts: List[str] = [element_data['text'] for element_data in elements]
+
+    for idx, element_data in enumerate(elements):
+        start, end = _window_bounds(text_lengths, idx, window_size)
+        _set_window(element_data, texts, start, end)
+
+    return list(elements)
+
+
+def expand_windows(dict_elements: List[dict]) -> List[dict]:
+    """
+    Replace the window ranges of elements serialized with window references by the window text. In-place.
+
+    :param dict_elements: Every serialized element of the document, in order
+    :return: The elements
+
+    """
+
+    for element_data in dict_elements:
+        window_range = element_data['metadata'].pop('window_range', None)
+
+        if window_range is not None:
+            start, end = window_range
+            element_data['metadata']['window'] = " ".join([neighbour['text'] for neighbour in dict_elements[start:end]])
 
     return dict_elements
+
+
+class WindowStream:
+    """
+    Incremental window_parser. Elements are pushed in document order & come back out once the element window_size
+    after them has arrived, so only 2 * window_size elements are ever held back.
+
+    """
+
+    def __init__(self, window_size: int = WINDOW_SIZE):
+        self.window_size: int = window_size
+
+        # The last window_size emitted elements, followed by the pending ones
+        self._buffer: List[Union[dict, Chunk]] = []
+        self._text_lengths: List[int] = []
+        self._emitted: int = 0
+
+        # The position in the document of the first buffered element
+        self._offset: int = 0
+
+    def push(self, elements: List[Union[dict, Chunk]]) -> List[Union[dict, Chunk]]:
+        """
+        Add elements to the stream
+
+        :param elements: The next elements of the document
+        :return: The elements whose window is now complete
+
+        """
+
+        self._buffer.extend(elements)
+        self._text_lengths.extend(_strip_texts(elements))
+        return self._drain(final=False)
+
+    def flush(self) -> List[Union[dict, Chunk]]:
+        """
+        End the stream
+
+        :return: The remaining elements
+
+        """
+
+        return self._drain(final=True)
+
+    def _drain(self, final: bool) -> List[Union[dict, Chunk]]:
+        dict_elements: List[Union[dict, Chunk]] = []
+
+        # A copy of the buffered texts, as the buffer is trimmed below
+        texts: List[str] = [element_data['text'] for element_data in self._buffer]
+
+        while self._emitted < len(self._buffer) and (final or self._emitted + self.window_size < len(self._buffer)):
+            element_data: Union[dict, Chunk] = self._buffer[self._emitted]
+            start, end = _window_bounds(self._text_lengths, self._emitted, self.window_size)
+
+            _set_window(element_data, texts, self._offset + start, self._offset + end, self._offset)
+            dict_elements.append(element_data)
+            self._emitted += 1
+
+        # Only the emitted elements that can still be a 'node before' are kept
+        stale: int = max(0, self._emitted - self.window_size)
+        del self._buffer[:stale]
+        del self._text_lengths[:stale]
+        self._emitted -= stale
+        self._offset += stale
+
+        return dict_elements
+
+
+__all__ = ["window_parser", "expand_windows", "WindowStream", "WINDOW_SIZE"]
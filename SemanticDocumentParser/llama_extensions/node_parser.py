@@ -1,12 +1,63 @@
-from typing import Sequence, List
+from typing import Sequence, List, Optional
 
+import numpy as np
+from llama_index.core.bridge.pydantic import Field
 from llama_index.core.node_parser import SemanticSplitterNodeParser
+from llama_index.core.node_parser.text.semantic_splitter import SentenceCombination
 from llama_index.core.node_parser.node_utils import build_nodes_from_splits
 from llama_index.core.schema import BaseNode, Document
 
+from SemanticDocumentParser.caching.embedding_cache import EmbeddingCache
+from SemanticDocumentParser.tracing import record_embedding_calls
+
 
 class AsyncSemanticSplitterNodeParser(SemanticSplitterNodeParser):
 
+    embedding_cache: Optional[EmbeddingCache] = Field(
+        default=None,
+        description="Read-through cache of sentence group embeddings",
+        exclude=True,
+    )
+
+    vectorized_breakpoints: bool = Field(
+        default=False,
+        description=(
+            "Hold the sentence group embeddings in one float32 matrix & compute the adjacent cosine distances and "
+            "breakpoint threshold with NumPy, instead of per-pair on Python float lists."
+        ),
+    )
+
+    async def _aembed_texts(self, texts: List[str], show_progress: bool = False) -> List[List[float]]:
+        """
+        Embed texts, only sending the ones missing from the embedding cache (if any) to the model.
+
+        """
+
+        if self.embedding_cache is None:
+            record_embedding_calls(texts, self.embed_model.embed_batch_size)
+            return await self.embed_model.aget_text_embedding_batch(texts, show_progress=show_progress)
+
+        model_name: str = self.embed_model.model_name
+        embeddings: List[Optional[List[float]]] = await self.embedding_cache.aget_many(model_name, texts)
+
+        # Boilerplate repeats within a document too, so only embed each missing text once
+        missing_texts: List[str] = list(dict.fromkeys(
+            text for text, embedding in zip(texts, embeddings) if embedding is None
+        ))
+
+        if missing_texts:
+            record_embedding_calls(missing_texts, self.embed_model.embed_batch_size)
+            missing_embeddings: List[List[float]] = await self.embed_model.aget_text_embedding_batch(
+                missing_texts,
+                show_progress=show_progress,
+            )
+
+            await self.embedding_cache.aset_many(model_name, missing_texts, missing_embeddings)
+            embedded: dict = dict(zip(missing_texts, missing_embeddings))
+            embeddings = [embedded[text] if embedding is None else embedding for text, embedding in zip(texts, embeddings)]
+
+        return embeddings
+
     async def abuild_semantic_nodes_from_documents(
             self,
             documents: Sequence[Document],
@@ -16,31 +67,140 @@ class AsyncSemanticSplitterNodeParser(SemanticSplitterNodeParser):
         <Same as regular but uses async embeddings call>
         """
 
-        all_nodes: List[BaseNode] = []
-        for doc in documents:
-            text = doc.text
-            text_splits = self.sentence_splitter(text)
+        nodes_per_document: List[List[BaseNode]] = await self.abuild_semantic_nodes_per_document(
+            documents,
+            show_progress=show_progress
+        )
 
-            sentences = self._build_sentence_groups(text_splits)
+        return [node for nodes in nodes_per_document for node in nodes]
 
-            combined_sentence_embeddings = await self.embed_model.aget_text_embedding_batch(
-                [s["combined_sentence"] for s in sentences],
-                show_progress=show_progress,
+    async def abuild_semantic_nodes_per_document(
+            self,
+            documents: Sequence[Document],
+            show_progress: bool = False,
+    ) -> List[List[BaseNode]]:
+        """
+        Build window nodes from documents, returning the nodes of each document separately.
+
+        The sentence groups of every document are embedded together, so the embedding model receives a few
+        full-size batches instead of one small request per document.
+
+        """
+
+        sentences_per_document = [
+            self._build_sentence_groups(self.sentence_splitter(doc.text)) for doc in documents
+        ]
+
+        combined_sentence_embeddings = await self._aembed_texts(
+            [s["combined_sentence"] for sentences in sentences_per_document for s in sentences],
+            show_progress=show_progress,
+        )
+
+        if self.vectorized_breakpoints:
+            # Only the matrix is kept, so the lists of floats are freed before the distances are computed
+            embeddings: np.ndarray = np.asarray(combined_sentence_embeddings, dtype=np.float32)
+            del combined_sentence_embeddings
+
+            chunks_per_document: List[List[str]] = self._build_node_chunks_per_document(
+                sentences_per_document, embeddings
             )
 
-            for i, embedding in enumerate(combined_sentence_embeddings):
-                sentences[i]["combined_sentence_embedding"] = embedding
+            # The chunks are all that's needed from here on, so free the matrix before building nodes
+            del embeddings
+
+            return [
+                build_nodes_from_splits(chunks, doc, id_func=self.id_func)
+                for doc, chunks in zip(documents, chunks_per_document)
+            ]
+
+        embeddings_iter = iter(combined_sentence_embeddings)
+        nodes_per_document: List[List[BaseNode]] = []
+
+        for doc, sentences in zip(documents, sentences_per_document):
+            for sentence in sentences:
+                sentence["combined_sentence_embedding"] = next(embeddings_iter)
 
             distances = self._calculate_distances_between_sentence_groups(sentences)
 
             chunks = self._build_node_chunks(sentences, distances)
 
-            nodes = build_nodes_from_splits(
-                chunks,
-                doc,
-                id_func=self.id_func,
+            nodes_per_document.append(
+                build_nodes_from_splits(
+                    chunks,
+                    doc,
+                    id_func=self.id_func,
+                )
             )
 
-            all_nodes.extend(nodes)
+        return nodes_per_document
+
+    def _build_node_chunks_per_document(
+            self,
+            sentences_per_document: List[List[SentenceCombination]],
+            embeddings: np.ndarray
+    ) -> List[List[str]]:
+        """
+        Vectorized equivalent of the distance & chunking steps, using cosine distance.
+
+        :param sentences_per_document: The sentence groups of each document
+        :param embeddings: The embeddings of every sentence group, in order, as one matrix
+        :return: The chunk texts of each document
+
+        """
+
+        chunks_per_document: List[List[str]] = []
+        start: int = 0
+
+        for sentences in sentences_per_document:
+            distances: np.ndarray = self._calculate_cosine_distances(embeddings[start:start + len(sentences)])
+            chunks_per_document.append(self._build_node_chunks_vectorized(sentences, distances))
+            start += len(sentences)
+
+        return chunks_per_document
+
+    @classmethod
+    def _calculate_cosine_distances(cls, embeddings: np.ndarray) -> np.ndarray:
+        """
+        Cosine distance between each pair of adjacent rows
+
+        :param embeddings: The (n, dim) embedding matrix
+        :return: The (n - 1,) distances
+
+        """
+
+        if len(embeddings) < 2:
+            return np.empty(0, dtype=np.float32)
+
+        norms: np.ndarray = np.linalg.norm(embeddings, axis=1)
+        products: np.ndarray = np.einsum("ij,ij->i", embeddings[:-1], embeddings[1:])
+        denominators: np.ndarray = norms[:-1] * norms[1:]
+
+        similarities: np.ndarray = np.divide(
+            products, denominators, out=np.zeros_like(products), where=denominators != 0
+        )
+
+        return 1 - similarities
+
+    def _build_node_chunks_vectorized(
+            self,
+            sentences: List[SentenceCombination],
+            distances: np.ndarray
+    ) -> List[str]:
+        """
+        Same chunking as _build_node_chunks, with the threshold & breakpoints found by NumPy
+
+        """
+
+        if len(distances) == 0:
+            # If, for some reason we didn't get any distances (i.e. very, very small documents) just
+            # treat the whole document as a single node
+            return [" ".join([s["sentence"] for s in sentences])]
+
+        breakpoint_distance_threshold = np.percentile(distances, self.breakpoint_percentile_threshold)
+        breakpoints: List[int] = (np.flatnonzero(distances > breakpoint_distance_threshold) + 1).tolist()
 
-        return all_nodes
+        return [
+            "".join([s["sentence"] for s in sentences[start:end]])
+            for start, end in zip([0] + breakpoints, breakpoints + [len(sentences)])
+            if start < end
+        ]
@@ -0,0 +1,289 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Optional, TypedDict, Callable, Awaitable, TypeVar, List, Sequence, Any
+
+from llama_index.core.base.llms.types import ChatMessage, ChatResponse, CompletionResponse
+from llama_index.core.schema import ImageDocument
+
+from SemanticDocumentParser.tracing import record_llm_call
+
+ScheduledResponse = TypeVar("ScheduledResponse")
+
+# Rough vision-token cost of one image, used for rate budgeting only
+IMAGE_TOKEN_ESTIMATE: int = 765
+
+# Rough allowance for the completion, used for rate budgeting only
+COMPLETION_TOKEN_ESTIMATE: int = 512
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (~4 characters per token). Only used to pace requests against a tokens-per-minute quota.
+
+    :param text: The text
+    :return: The estimated number of tokens
+
+    """
+
+    return len(text) // 4 + 1
+
+
+def is_rate_limit_error(ex: BaseException) -> bool:
+    """
+    Check if an exception from an LLM client is a rate-limit (HTTP 429) error
+
+    :param ex: The exception
+    :return: Whether it is a rate-limit error
+
+    """
+
+    if type(ex).__name__ == "RateLimitError":
+        return True
+
+    status_code = getattr(ex, "status_code", None) or getattr(getattr(ex, "response", None), "status_code", None)
+    return status_code == 429
+
+
+def _retry_after(ex: BaseException) -> Optional[float]:
+    """
+    The server-provided retry delay of a rate-limit error, if it sent one
+
+    :param ex: The rate-limit error
+    :return: The delay in seconds
+
+    """
+
+    headers = getattr(getattr(ex, "response", None), "headers", None) or {}
+
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at a per-minute rate, holding at most one minute's worth of tokens.
+
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity: float = per_minute
+        self.tokens: float = per_minute
+        self._refill_rate: float = per_minute / 60
+        self._updated_at: float = time.monotonic()
+        self._lock: asyncio.Lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now: float = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self._refill_rate)
+        self._updated_at = now
+
+    async def acquire(self, amount: float = 1) -> None:
+        """
+        Wait until the bucket holds enough tokens, then take them. Waiters are served in order.
+
+        :param amount: The number of tokens to take (capped at the bucket capacity)
+        :return: None
+
+        """
+
+        amount = min(amount, self.capacity)
+
+        async with self._lock:
+            self._refill()
+
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self._refill_rate)
+                self._refill()
+
+            self.tokens -= amount
+
+
+class LLMSchedulerStats(TypedDict):
+    queued: int
+    in_flight: int
+    max_queue_depth: int
+    completed: int
+    failed: int
+    retries: int
+    rate_limited: int
+
+
+class LLMScheduler:
+    """
+    Single gate for every LLM request made by the parser stages.
+
+    Caps the requests in flight, paces them against request- & token-per-minute quotas, and retries rate-limited
+    requests with jittered exponential backoff. Share one scheduler between parsers (and documents) so the limits
+    apply to all of them together.
+
+    """
+
+    def __init__(
+            self,
+            max_in_flight: Optional[int] = None,
+            requests_per_minute: Optional[float] = None,
+            tokens_per_minute: Optional[float] = None,
+            max_retries: int = 3,
+            base_backoff: float = 1.0,
+            max_backoff: float = 60.0
+    ):
+        """
+        Create the scheduler. Every limit is optional; without any it only adds rate-limit retries.
+
+        :param max_in_flight: The maximum number of concurrent requests
+        :param requests_per_minute: The request quota
+        :param tokens_per_minute: The (estimated) token quota
+        :param max_retries: How many times a rate-limited request is retried before giving up
+        :param base_backoff: The backoff ceiling of the first retry, in seconds (doubles every retry)
+        :param max_backoff: The largest backoff ceiling, in seconds
+
+        """
+
+        self.max_retries: int = max_retries
+        self.base_backoff: float = base_backoff
+        self.max_backoff: float = max_backoff
+
+        self._semaphore: Optional[asyncio.Semaphore] = asyncio.Semaphore(max_in_flight) if max_in_flight else None
+        self._request_bucket: Optional[TokenBucket] = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self._token_bucket: Optional[TokenBucket] = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._stats: LLMSchedulerStats = LLMSchedulerStats(
+            queued=0, in_flight=0, max_queue_depth=0, completed=0, failed=0, retries=0, rate_limited=0
+        )
+
+    @property
+    def stats(self) -> LLMSchedulerStats:
+        return LLMSchedulerStats(**self._stats)
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff"""
+
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt))
+
+    async def _acquire(self, estimated_tokens: int) -> None:
+        """Wait for a free slot & enough quota"""
+
+        self._stats['queued'] += 1
+        self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], self._stats['queued'])
+
+        try:
+            if self._semaphore is not None:
+                await self._semaphore.acquire()
+
+            try:
+                if self._request_bucket is not None:
+                    await self._request_bucket.acquire(1)
+
+                if self._token_bucket is not None:
+                    await self._token_bucket.acquire(estimated_tokens)
+            except BaseException:
+                if self._semaphore is not None:
+                    self._semaphore.release()
+                raise
+        finally:
+            self._stats['queued'] -= 1
+
+    def _release(self) -> None:
+        if self._semaphore is not None:
+            self._semaphore.release()
+
+    async def run(
+            self,
+            fn: Callable[[], Awaitable[ScheduledResponse]],
+            estimated_tokens: int = 0,
+            estimated_input_tokens: Optional[int] = None
+    ) -> ScheduledResponse:
+        """
+        Run an LLM request under the scheduler's limits. Every attempt is counted towards the running stage's trace.
+
+        :param fn: Makes the request. Called again for every retry.
+        :param estimated_tokens: The estimated input + output tokens of the request
+        :param estimated_input_tokens: The estimated input tokens, traced when the response has no usage
+            (defaults to estimated_tokens)
+        :return: The response
+
+        """
+
+        if estimated_input_tokens is None:
+            estimated_input_tokens = estimated_tokens
+
+        attempt: int = 0
+
+        while True:
+            await self._acquire(estimated_tokens)
+            self._stats['in_flight'] += 1
+
+            try:
+                response: ScheduledResponse = await fn()
+                self._stats['completed'] += 1
+                record_llm_call(response, estimated_input_tokens)
+                return response
+            except Exception as ex:
+                record_llm_call(None, estimated_input_tokens)
+
+                if not is_rate_limit_error(ex) or attempt >= self.max_retries:
+                    self._stats['failed'] += 1
+                    raise
+
+                self._stats['rate_limited'] += 1
+                self._stats['retries'] += 1
+                delay: float = _retry_after(ex) or self._backoff(attempt)
+                logging.warning(f"LLM request was rate-limited, retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})")
+            finally:
+                self._stats['in_flight'] -= 1
+                self._release()
+
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def achat(self, llm: Any, messages: Sequence[ChatMessage], **kwargs) -> ChatResponse:
+        """
+        Scheduled llm.achat
+
+        :param llm: The LLM
+        :param messages: The chat messages
+        :return: The chat response
+
+        """
+
+        estimated_tokens: int = sum(estimate_tokens(str(message.content or "")) for message in messages)
+
+        return await self.run(
+            lambda: llm.achat(messages=messages, **kwargs),
+            estimated_tokens=estimated_tokens + COMPLETION_TOKEN_ESTIMATE,
+            estimated_input_tokens=estimated_tokens
+        )
+
+    async def acomplete(
+            self,
+            llm: Any,
+            prompt: str,
+            image_documents: Optional[List[ImageDocument]] = None,
+            **kwargs
+    ) -> CompletionResponse:
+        """
+        Scheduled llm.acomplete (supports multimodal LLMs)
+
+        :param llm: The LLM
+        :param prompt: The prompt
+        :param image_documents: Images for multimodal LLMs
+        :return: The completion response
+
+        """
+
+        estimated_tokens: int = estimate_tokens(prompt) + IMAGE_TOKEN_ESTIMATE * len(image_documents or [])
+
+        if image_documents is not None:
+            kwargs['image_documents'] = image_documents
+
+        return await self.run(
+            lambda: llm.acomplete(prompt=prompt, **kwargs),
+            estimated_tokens=estimated_tokens + COMPLETION_TOKEN_ESTIMATE,
+            estimated_input_tokens=estimated_tokens
+        )
+
+
+__all__ = ["LLMScheduler", "LLMSchedulerStats", "TokenBucket", "estimate_tokens", "is_rate_limit_error"]
@@ -1,11 +1,16 @@
 import asyncio
+import collections
 import functools
 import io
-from typing import List, Tuple, TypedDict, Optional, Awaitable, Callable
+import itertools
+import logging
+import os
+from typing import List, Tuple, TypedDict, Optional, Awaitable, Callable, Iterable, AsyncIterator, Set, Dict, Deque, Iterator, Union
 
 from llama_index.core.node_parser import NodeParser
 from llama_index.multi_modal_llms.openai import OpenAIMultiModal
-from pydantic.v1 import BaseModel
+from pydantic.v1 import BaseModel, Field
+from unstructured.documents.elements import Element
 from unstructured.file_utils.filetype import detect_filetype
 from unstructured.file_utils.model import FileType
 from unstructured.partition.auto import partition as partition_auto
@@ -13,15 +18,29 @@ from unstructured_expanded.partition.docx import partition_docx
 from unstructured_expanded.partition.pdf import partition_pdf
 from unstructured_expanded.partition.pptx.partition_pptx import partition_pptx
 
-from SemanticDocumentParser.element_parsers.al_tables import al_table_parser
-from SemanticDocumentParser.element_parsers.image_captioner import image_captioner
-from SemanticDocumentParser.element_parsers.list_parser import list_parser
-from SemanticDocumentParser.element_parsers.metadata_parser import metadata_parser
+from SemanticDocumentParser.caching.caption_cache import CaptionCache
+from SemanticDocumentParser.caching.keys import fingerprint
+from SemanticDocumentParser.caching.partition_cache import PartitionCache
+from SemanticDocumentParser.caching.result_cache import ResultCache
+from SemanticDocumentParser.caching.table_cache import TableCache
+from SemanticDocumentParser.chunk import Chunk
+from SemanticDocumentParser.concurrency import StageLimiter
+from SemanticDocumentParser.element_parsers.al_tables import iter_al_table_parser
+from SemanticDocumentParser.element_parsers.image_captioner import image_captioner, CAPTION_PROMPT
+from SemanticDocumentParser.element_parsers.list_parser import iter_list_parser
+from SemanticDocumentParser.element_parsers.metadata_parser import iter_metadata_parser
 from SemanticDocumentParser.element_parsers.remove_small import remove_small
-from SemanticDocumentParser.element_parsers.semantic_splitter import semantic_splitter
-from SemanticDocumentParser.element_parsers.semantic_tables import semantic_tables
-from SemanticDocumentParser.element_parsers.window_parser import window_parser
-from SemanticDocumentParser.utils import with_timings_sync, with_timings_async
+from SemanticDocumentParser.element_parsers.section_index import SectionIndex
+from SemanticDocumentParser.element_parsers.semantic_splitter import semantic_splitter, iter_element_groups
+from SemanticDocumentParser.element_parsers.semantic_tables import (
+    semantic_tables, SemanticTablesStats, SemanticUnitsTemplate, SemanticSummaryTemplate, SemanticTableTemplate
+)
+from SemanticDocumentParser.element_parsers.simple_tables import SimpleTableClassifier
+from SemanticDocumentParser.element_parsers.window_parser import window_parser, WindowStream, WINDOW_SIZE
+from SemanticDocumentParser.llm_scheduler import LLMScheduler
+from SemanticDocumentParser.partition_executor import PartitionExecutor
+from SemanticDocumentParser.tracing import Tracer, TraceSink, StageTrace
+from SemanticDocumentParser.utils import TimedIterator
 
 
 class SemanticDocumentParserStats(TypedDict):
@@ -33,6 +52,18 @@ class SemanticDocumentParserStats(TypedDict):
     table_parse_time_strategy_2: Optional[float]
     combine_window_time: Optional[float]
     image_caption_time: Optional[float]
+    llm_tables: Optional[int]
+    bypassed_tables: Optional[int]
+    stage_traces: Optional[List[StageTrace]]
+
+
+class SemanticDocumentParserResult(TypedDict):
+    """The outcome of one document in a batch"""
+
+    document_filename: str
+    elements: List[Union[dict, Chunk]]
+    stats: Optional[SemanticDocumentParserStats]
+    error: Optional[Exception]
 
 
 PARSER_OVERRIDE_MAP: dict[FileType, Callable] = {
@@ -42,6 +73,26 @@ PARSER_OVERRIDE_MAP: dict[FileType, Callable] = {
 }
 
 
+# The stages run by _structure_stages, in order
+STRUCTURE_STAGE_NAMES: Tuple[str, ...] = ('Metadata Parsing', 'Table Parsing 1/2', 'List Parsing')
+
+
+def _empty_stats() -> SemanticDocumentParserStats:
+    return SemanticDocumentParserStats(
+        element_parse_time=None,
+        metadata_parse_time=None,
+        paragraph_parse_time=None,
+        list_parse_time=None,
+        table_parse_time_strategy_1=None,
+        table_parse_time_strategy_2=None,
+        combine_window_time=None,
+        image_caption_time=None,
+        llm_tables=None,
+        bypassed_tables=None,
+        stage_traces=None
+    )
+
+
 class SemanticDocumentParser(BaseModel):
     """
     Split nodes into semantic units
@@ -51,6 +102,61 @@ class SemanticDocumentParser(BaseModel):
     llm_model: OpenAIMultiModal
     node_parser: NodeParser
 
+    # Run partitioning in a warm process pool instead of on the event loop
+    partition_executor: Optional[PartitionExecutor] = None
+
+    # Skip all work for documents already parsed with the same config
+    result_cache: Optional[ResultCache] = None
+
+    # Re-use partitioned elements across runs that only change downstream settings
+    partition_cache: Optional[PartitionCache] = None
+
+    # Every LLM request goes through this. Share one between parsers to apply the limits to all of them.
+    llm_scheduler: LLMScheduler = Field(default_factory=LLMScheduler)
+
+    # Send each distinct table to the LLM once, across documents & runs
+    table_cache: Optional[TableCache] = None
+
+    # Ask for a table's units & summary in one LLM request instead of two
+    single_call_tables: bool = False
+
+    # Render tables this deems simple without the LLM. None sends every table to the LLM.
+    simple_table_classifier: Optional[SimpleTableClassifier] = None
+
+    # Per-document limits on concurrent image downloads & caption requests
+    max_concurrent_image_downloads: int = 8
+    max_concurrent_image_captions: int = 4
+
+    # Caption each unique image once; share captions across documents with the caption cache
+    caption_cache: Optional[CaptionCache] = None
+    perceptual_image_hash: bool = False
+    drop_duplicate_images: bool = False
+
+    # Images are downscaled (& optionally recompressed) before captioning
+    max_image_dimension: Optional[int] = 2048
+    image_format: Optional[str] = None
+    image_quality: int = 85
+    keep_image_base64: bool = True
+
+    # Return the compact Chunk objects instead of element dicts
+    output_chunks: bool = False
+
+    # The number of neighbouring chunks on each side included in a chunk's window
+    window_size: int = WINDOW_SIZE
+
+    # Serialize windows as [start, end) ranges into the returned elements ('window_range') instead of their text.
+    # Small nodes are removed before windowing so the ranges stay valid. See expand_windows.
+    window_references: bool = False
+
+    # Record each stage's timings, element counts & model usage (always in stats['stage_traces']) & send them here
+    trace_sink: Optional[TraceSink] = None
+
+    # Also record each stage's peak allocation with tracemalloc. Slow, for profiling only.
+    trace_memory: bool = False
+
+    # Chunks shorter than this are dropped
+    min_length: int = 10
+
     class Config:
         arbitrary_types_allowed = True
 
@@ -70,121 +176,659 @@ class SemanticDocumentParser(BaseModel):
         # Otherwise, default the basic partitioning for other types
         return functools.partial(partition_fn, **kwargs)
 
+    async def apartition(self, document: io.BytesIO, **kwargs) -> List[Element]:
+        """
+        Partition the document, in the partition executor if one is configured
+
+        :param document: The document to partition
+        :param kwargs: Partition kwargs (except 'file')
+        :return: The partitioned elements
+
+        """
+
+        if self.partition_cache is None:
+            return await self._apartition(document, **kwargs)
+
+        document_filename: str = kwargs.get("metadata_filename") or ""
+
+        partition_cache_key: str = PartitionCache.key(
+            document.getvalue(),
+            os.path.splitext(document_filename)[1],
+            {key: value for key, value in kwargs.items() if key != "metadata_filename"}
+        )
+
+        elements: Optional[List[Element]] = await self.partition_cache.aget(
+            partition_cache_key, document_filename, kwargs.get("unique_element_ids", False)
+        )
+
+        if elements is None:
+            elements = await self._apartition(document, **kwargs)
+            await self.partition_cache.aset(partition_cache_key, elements)
+
+        return elements
+
+    async def _apartition(self, document: io.BytesIO, **kwargs) -> List[Element]:
+        if self.partition_executor is not None:
+            return await self.partition_executor.apartition(document, **kwargs)
+
+        return self.partition(file=document, **kwargs)()
+
+    def config_fingerprint(self) -> str:
+        """
+        Fingerprint every setting that affects the output, so cached results are only reused under the same config
+
+        :return: The config fingerprint
+
+        """
+
+        node_parser_settings: dict = self.node_parser.model_dump(
+            mode="json",
+            exclude={"embed_model", "callback_manager", "id_func", "sentence_splitter"}
+        )
+
+        embed_model = getattr(self.node_parser, "embed_model", None)
+
+        return fingerprint(
+            self.llm_model.metadata.model_name,
+            getattr(self.llm_model, "temperature", None),
+            getattr(self.llm_model, "max_new_tokens", None),
+            node_parser_settings,
+            getattr(embed_model, "model_name", None),
+            self.window_size,
+            self.window_references,
+            self.min_length,
+            self.single_call_tables,
+            self.simple_table_classifier.settings() if self.simple_table_classifier else None,
+            self.perceptual_image_hash,
+            self.drop_duplicate_images,
+            self.max_image_dimension,
+            self.image_format,
+            self.image_quality,
+            self.keep_image_base64,
+            # Prompt edits change the LLM output, so they must miss the cache too
+            SemanticUnitsTemplate.content,
+            SemanticSummaryTemplate.content,
+            SemanticTableTemplate.content,
+            CAPTION_PROMPT
+        )
+
+    def _result_cache_key(self, document: io.BytesIO, document_filename: str) -> str:
+        return ResultCache.key(
+            document.getvalue(),
+            os.path.splitext(document_filename)[1],
+            self.config_fingerprint(),
+            os.path.basename(document_filename)
+        )
+
+    async def _aget_cached_result(
+            self,
+            result_cache_key: str,
+            document_filename: str
+    ) -> Optional[Tuple[List[Union[dict, Chunk]], SemanticDocumentParserStats]]:
+        """
+        Look up a previous result in the result cache
+
+        :param result_cache_key: The document's result cache key
+        :param document_filename: The name of the doc
+        :return: The cached (elements, stats) in the output form, or None on a miss
+
+        """
+
+        cached_result = await self.result_cache.aget(result_cache_key)
+
+        if cached_result is None:
+            return None
+
+        dict_elements, stats = cached_result
+
+        # The same file can be parsed from another directory. Stamped the way unstructured applies metadata_filename.
+        file_directory: str = os.path.dirname(document_filename)
+
+        for element in dict_elements:
+            if 'filename' not in element['metadata'] or 'attached_to_filename' in element['metadata']:
+                continue
+
+            if file_directory:
+                element['metadata']['file_directory'] = file_directory
+            else:
+                element['metadata'].pop('file_directory', None)
+
+        if self.output_chunks:
+            return [Chunk.from_dict(element) for element in dict_elements], stats
+
+        return dict_elements, stats
+
     async def aparse(
             self,
             document: io.BytesIO,
             document_filename: str,
-            on_step_finished: Callable[[str, float], Awaitable[None]] = lambda x, y: asyncio.sleep(0)
-    ) -> Tuple[List[dict], SemanticDocumentParserStats]:
+            on_step_finished: Callable[[str, float], Awaitable[None]] = lambda x, y: asyncio.sleep(0),
+            stage_limiter: Optional[StageLimiter] = None
+    ) -> Tuple[List[Union[dict, Chunk]], SemanticDocumentParserStats]:
         """
         Asynchronously (where possible) parse the document
 
         :param document: The document to parse of any type unstructured supports
         :param document_filename: The name of the doc
         :param on_step_finished: A callback to call when a step is finished
-        :return: A list of elements existing as distinct chunks of NarrativeText
+        :param stage_limiter: Caps on concurrent documents per stage, shared across a batch
+        :return: A list of elements existing as distinct chunks of NarrativeText (dicts, or Chunks with output_chunks)
 
         """
 
-        # Generate the document-agnostic array
-        element_parse_time, elements = with_timings_sync(
-            fn=self.partition(
-                # Note: Do NOT specify 'encoding' or 'content_type' here, it's auto-determined
-                file=document,
-                metadata_filename=document_filename,
-                languages=["en", "fr"],
-                xml_keep_tags=True
-            )
-        )
+        if self.result_cache is None:
+            chunks, stats = await self._aparse(document, document_filename, on_step_finished, stage_limiter)
+            return self._output(chunks), stats
 
-        await on_step_finished('Unstructured Partition', element_parse_time)
+        result_cache_key: str = self._result_cache_key(document, document_filename)
+        cached_result = await self._aget_cached_result(result_cache_key, document_filename)
 
-        # If there are no elements, don't run the parsers
-        if len(elements) < 1:
-            stats: SemanticDocumentParserStats = {
-                "element_parse_time": element_parse_time,
-                "metadata_parse_time": None,
-                "paragraph_parse_time": None,
-                "list_parse_time": None,
-                "table_parse_time_strategy_1": None,
-                "table_parse_time_strategy_2": None,
-                "combine_window_time": None,
-                "image_caption_time": None,
-            }
+        if cached_result is not None:
+            await on_step_finished('Result Cache Hit', 0)
+            return cached_result
 
-            return [], stats
+        chunks, stats = await self._aparse(document, document_filename, on_step_finished, stage_limiter)
 
-        # Parse document metadata
-        metadata_parse_time, _ = with_timings_sync(fn=functools.partial(metadata_parser, elements))
-        await on_step_finished('Metadata Parsing', metadata_parse_time)
+        # The cache always holds dicts, whatever the output form
+        dict_elements: List[dict] = [chunk.to_dict(self.window_references) for chunk in chunks]
+        await self.result_cache.aset(result_cache_key, dict_elements, stats)
 
-        # Parse tables strategy 1 [DOES NOT CONSUME TABLE ELEMENTS]
-        # Must occur BEFORE the semantic splitter
-        table_parse_time_strategy_1, elements = with_timings_sync(
-            fn=functools.partial(al_table_parser, elements)
+        return (chunks if self.output_chunks else dict_elements), stats
+
+    def _tracer(self, document_filename: str) -> Tracer:
+        return Tracer(document_filename, self.trace_sink, self.trace_memory)
+
+    def _output(self, chunks: List[Chunk]) -> List[Union[dict, Chunk]]:
+        """
+        Serialize the final chunks, unless the parser returns Chunk objects
+
+        :param chunks: The final chunks
+        :return: The elements in the output form
+
+        """
+
+        return chunks if self.output_chunks else [chunk.to_dict(self.window_references) for chunk in chunks]
+
+    def _acaption_images(self, chunks: List[Chunk]) -> Awaitable[List[Chunk]]:
+        return image_captioner(
+            chunks,
+            self.llm_model,
+            self.llm_scheduler,
+            max_concurrent_downloads=self.max_concurrent_image_downloads,
+            max_concurrent_captions=self.max_concurrent_image_captions,
+            caption_cache=self.caption_cache,
+            perceptual_hash=self.perceptual_image_hash,
+            drop_duplicate_images=self.drop_duplicate_images,
+            max_image_dimension=self.max_image_dimension,
+            image_format=self.image_format,
+            image_quality=self.image_quality,
+            keep_image_base64=self.keep_image_base64
         )
 
-        await on_step_finished('Table Parsing 1/2', table_parse_time_strategy_1)
+    async def _aparse(
+            self,
+            document: io.BytesIO,
+            document_filename: str,
+            on_step_finished: Callable[[str, float], Awaitable[None]],
+            stage_limiter: Optional[StageLimiter]
+    ) -> Tuple[List[Chunk], SemanticDocumentParserStats]:
+        """
+        Run every stage of the parser on the document. See aparse.
+        The late stages work on Chunks, which are only serialized at output.
 
-        # Group the list items into individual nodes
-        list_parse_time, elements = with_timings_sync(fn=functools.partial(list_parser, elements))
+        """
 
-        await on_step_finished('List Parsing', list_parse_time)
+        stage_limiter = stage_limiter or StageLimiter()
+        stats: SemanticDocumentParserStats = _empty_stats()
+        tracer: Tracer = self._tracer(document_filename)
+        stats['stage_traces'] = tracer.traces
+
+        elements: List[Element] = await self._apartition_document(
+            document, document_filename, stats, on_step_finished, stage_limiter, tracer
+        )
+
+        # If there are no elements, don't run the parsers
+        if len(elements) < 1:
+            return [], stats
+
+        elements = await self._aparse_structure(elements, stats, on_step_finished, tracer)
 
         # Group elements by title separation, then split unrelated texts into smaller ones
         # Note that the way grouping is set up, the auto-caption will be used in the 'Title' element since these descriptions
         # tend to be longer & we don't want to pollute
-        paragraph_parse_time, elements = await with_timings_async(semantic_splitter(elements, self.node_parser))
+        async with stage_limiter.stage('Paragraph Parsing'):
+            with tracer.stage('Paragraph Parsing', len(elements)) as paragraph_span:
+                elements = await semantic_splitter(elements, self.node_parser)
+                paragraph_span.elements_out = len(elements)
 
-        await on_step_finished('Paragraph Parsing', paragraph_parse_time)
+        await on_step_finished('Paragraph Parsing', paragraph_span.duration_ms)
 
         # Parse tables strategy 2 [CONSUMES TABLE ELEMENTS]
-        table_parse_time_strategy_2, elements = await with_timings_async(
-            semantic_tables(
-                elements,
-                self.llm_model
+        table_stats: SemanticTablesStats = SemanticTablesStats(llm_tables=0, bypassed_tables=0)
+
+        async with stage_limiter.stage('Table Parsing 2/2'):
+            with tracer.stage('Table Parsing 2/2', len(elements)) as table_span:
+                elements = await semantic_tables(
+                    elements,
+                    self.llm_model,
+                    self.llm_scheduler,
+                    self.table_cache,
+                    self.single_call_tables,
+                    self.simple_table_classifier,
+                    table_stats
+                )
+                table_span.elements_out = len(elements)
+
+        await on_step_finished('Table Parsing 2/2', table_span.duration_ms)
+
+        # Caption images
+        async with stage_limiter.stage('Image Captioning'):
+            with tracer.stage('Image Captioning', len(elements)) as image_span:
+                chunks: List[Chunk] = [Chunk.from_element(element) for element in elements]
+
+                # The chunks now hold the only reference to each image's data, which the captioner frees as it goes
+                del elements
+
+                chunks = await self._acaption_images(chunks)
+                image_span.elements_out = len(chunks)
+
+        await on_step_finished('Image Captioning', image_span.duration_ms)
+
+        # Window references index the returned elements, so small nodes go first
+        if self.window_references:
+            chunks = remove_small(chunks, min_length=self.min_length)
+
+        # Combine nodes naively with the Window approach (smaller nodes)
+        with tracer.stage('Window Combination', len(chunks)) as window_span:
+            chunks = window_parser(chunks, self.window_size)
+            window_span.elements_out = len(chunks)
+
+        await on_step_finished('Window Combination', window_span.duration_ms)
+
+        with tracer.stage('Remove Small Nodes', len(chunks)) as remove_span:
+            chunks = remove_small(
+                chunks,
+                min_length=self.min_length
             )
+            remove_span.elements_out = len(chunks)
+
+        await on_step_finished('Remove Small Nodes', remove_span.duration_ms)
+
+        stats.update(
+            paragraph_parse_time=paragraph_span.duration_ms,
+            table_parse_time_strategy_2=table_span.duration_ms,
+            combine_window_time=window_span.duration_ms,
+            image_caption_time=image_span.duration_ms,
+            **table_stats
         )
 
-        await on_step_finished('Table Parsing 2/2', table_parse_time_strategy_2)
+        return chunks, stats
 
-        # Caption images
-        image_caption_time, dict_elements = await with_timings_async(
-            image_captioner(
-                [element.to_dict() for element in elements],
-                self.llm_model
+    async def _apartition_document(
+            self,
+            document: io.BytesIO,
+            document_filename: str,
+            stats: SemanticDocumentParserStats,
+            on_step_finished: Callable[[str, float], Awaitable[None]],
+            stage_limiter: StageLimiter,
+            tracer: Tracer
+    ) -> List[Element]:
+        """
+        Generate the document-agnostic element array
+
+        :param document: The document to parse
+        :param document_filename: The name of the doc
+        :param stats: The stats to record the partition time in
+        :param on_step_finished: A callback to call when a step is finished
+        :param stage_limiter: Caps on concurrent documents per stage
+        :param tracer: The document's tracer
+        :return: The elements
+
+        """
+
+        async with stage_limiter.stage('Unstructured Partition'):
+            with tracer.stage('Unstructured Partition') as partition_span:
+                elements: List[Element] = await self.apartition(
+                    # Note: Do NOT specify 'encoding' or 'content_type' here, it's auto-determined
+                    document,
+                    metadata_filename=document_filename,
+                    languages=["en", "fr"],
+                    xml_keep_tags=True
+                )
+                partition_span.elements_out = len(elements)
+
+        stats['element_parse_time'] = partition_span.duration_ms
+        await on_step_finished('Unstructured Partition', partition_span.duration_ms)
+
+        return elements
+
+    @classmethod
+    async def _aparse_structure(
+            cls,
+            elements: List[Element],
+            stats: SemanticDocumentParserStats,
+            on_step_finished: Callable[[str, float], Awaitable[None]],
+            tracer: Tracer
+    ) -> List[Element]:
+        """
+        Run the document-wide, LLM-free stages (metadata, tables strategy 1 & lists)
+
+        :param elements: The partitioned elements
+        :param stats: The stats to record the stage times in
+        :param on_step_finished: A callback to call when a step is finished
+        :param tracer: The document's tracer
+        :return: The parsed elements
+
+        """
+
+        elements_in: int = len(elements)
+        stages: List[TimedIterator] = cls._structure_stages(elements)
+        elements = list(stages[-1])
+
+        await cls._report_structure_stages(stages, elements_in, stats, on_step_finished, tracer)
+        return elements
+
+    @classmethod
+    def _structure_stages(cls, elements: List[Element]) -> List[TimedIterator]:
+        """
+        Chain the document-wide, LLM-free stages into a single lazy pass over the partitioned elements.
+        Each stage only holds its own look-back, not a full copy of the document.
+
+        :param elements: The partitioned elements
+        :return: The timed stages, in order. Iterate the last one to run them all.
+
+        """
+
+        # Section context of every partitioned element, shared by the stages below
+        section_index: SectionIndex = SectionIndex(elements)
+
+        # Parse document metadata
+        metadata_stage: TimedIterator = TimedIterator(iter_metadata_parser(elements))
+
+        # Parse tables strategy 1 [DOES NOT CONSUME TABLE ELEMENTS]
+        # Must occur BEFORE the semantic splitter
+        table_stage: TimedIterator = TimedIterator(iter_al_table_parser(metadata_stage, section_index))
+
+        # Group the list items into individual nodes
+        list_stage: TimedIterator = TimedIterator(iter_list_parser(table_stage, section_index))
+
+        return [metadata_stage, table_stage, list_stage]
+
+    @classmethod
+    async def _report_structure_stages(
+            cls,
+            stages: List[TimedIterator],
+            elements_in: int,
+            stats: SemanticDocumentParserStats,
+            on_step_finished: Callable[[str, float], Awaitable[None]],
+            tracer: Tracer
+    ) -> None:
+        """
+        Report the time of each (exhausted) structure stage, excluding the time spent in the stages before it
+
+        :param stages: The stages from _structure_stages
+        :param elements_in: The number of partitioned elements
+        :param stats: The stats to record the stage times in
+        :param on_step_finished: A callback to call when a step is finished
+        :param tracer: The document's tracer
+        :return: None
+
+        """
+
+        upstream: Optional[TimedIterator] = None
+
+        # The stages ran interleaved, so no allocation peak can be told apart
+        for stage_name, stage in zip(STRUCTURE_STAGE_NAMES, stages):
+            tracer.record(
+                stage_name,
+                start_time=stage.start_time,
+                duration_ms=stage.elapsed - (upstream.elapsed if upstream else 0),
+                cpu_time_ms=stage.cpu_time - (upstream.cpu_time if upstream else 0),
+                elements_in=upstream.items if upstream else elements_in,
+                elements_out=stage.items
             )
-        )
 
-        await on_step_finished('Image Captioning', image_caption_time)
+            upstream = stage
 
-        # Combine nodes naively with the Window approach (smaller nodes)
-        combine_window_time, dict_elements = with_timings_sync(
-            fn=functools.partial(window_parser, dict_elements)
-        )
+        metadata_stage, table_stage, list_stage = stages
 
-        await on_step_finished('Window Combination', combine_window_time)
+        metadata_parse_time: float = round(metadata_stage.elapsed, 1)
+        table_parse_time_strategy_1: float = round(table_stage.elapsed - metadata_stage.elapsed, 1)
+        list_parse_time: float = round(list_stage.elapsed - table_stage.elapsed, 1)
 
-        dict_elements = remove_small(
-            dict_elements,
-            min_length=10
+        await on_step_finished('Metadata Parsing', metadata_parse_time)
+        await on_step_finished('Table Parsing 1/2', table_parse_time_strategy_1)
+        await on_step_finished('List Parsing', list_parse_time)
+
+        stats.update(
+            metadata_parse_time=metadata_parse_time,
+            table_parse_time_strategy_1=table_parse_time_strategy_1,
+            list_parse_time=list_parse_time
         )
 
-        await on_step_finished('Remove Small Nodes', 0)
-
-        return (
-            dict_elements,
-            SemanticDocumentParserStats(
-                element_parse_time=element_parse_time,
-                metadata_parse_time=metadata_parse_time,
-                paragraph_parse_time=paragraph_parse_time,
-                list_parse_time=list_parse_time,
-                table_parse_time_strategy_1=table_parse_time_strategy_1,
-                table_parse_time_strategy_2=table_parse_time_strategy_2,
-                combine_window_time=combine_window_time,
-                image_caption_time=image_caption_time
+    async def aparse_stream(
+            self,
+            document: io.BytesIO,
+            document_filename: str,
+            on_step_finished: Callable[[str, float], Awaitable[None]] = lambda x, y: asyncio.sleep(0),
+            stage_limiter: Optional[StageLimiter] = None,
+            max_groups_in_flight: int = 2,
+            stats: Optional[SemanticDocumentParserStats] = None
+    ) -> AsyncIterator[Union[dict, Chunk]]:
+        """
+        Parse the document, yielding the final elements as soon as they are ready instead of all at once.
+
+        After partitioning, each title group is split, has its tables parsed and its images captioned on its own, and is
+        windowed against its neighbours as it completes. The elements come out in document order, identical to aparse
+        except that duplicate images are only detected within a title group (the caption cache still spans them all).
+
+        Result cache hits are served, but streamed results are not written to the result cache.
+
+        :param document: The document to parse of any type unstructured supports
+        :param document_filename: The name of the doc
+        :param on_step_finished: A callback to call when a step is finished (per-group stages report their totals at the end,
+            the trace sink gets a trace per group)
+        :param stage_limiter: Caps on concurrent title groups per stage, shared across a batch
+        :param max_groups_in_flight: The number of title groups processed ahead of the consumer
+        :param stats: Filled in with the document's stats as it is parsed (complete once the stream is exhausted)
+        :return: The elements (dicts, or Chunks with output_chunks), in document order
+
+        """
+
+        if self.result_cache is not None:
+            cached_result = await self._aget_cached_result(
+                self._result_cache_key(document, document_filename), document_filename
             )
+
+            if cached_result is not None:
+                await on_step_finished('Result Cache Hit', 0)
+
+                if stats is not None:
+                    stats.update(cached_result[1])
+
+                for element in cached_result[0]:
+                    yield element
+
+                return
+
+        stage_limiter = stage_limiter or StageLimiter()
+        # The caller's stats are filled in place, so they can be read once the stream ends
+        stats = {} if stats is None else stats
+        stats.update(_empty_stats())
+        tracer: Tracer = self._tracer(document_filename)
+        stats['stage_traces'] = tracer.traces
+
+        elements: List[Element] = await self._apartition_document(
+            document, document_filename, stats, on_step_finished, stage_limiter, tracer
+        )
+
+        if len(elements) < 1:
+            return
+
+        elements_in: int = len(elements)
+
+        # The structure stages run lazily, as title groups are pulled
+        stages: List[TimedIterator] = self._structure_stages(elements)
+        groups: Iterator[List[Element]] = iter_element_groups(stages[-1])
+
+        stage_times: Dict[str, float] = {
+            'Paragraph Parsing': 0,
+            'Table Parsing 2/2': 0,
+            'Image Captioning': 0,
+            'Window Combination': 0,
+            'Remove Small Nodes': 0
+        }
+
+        # Shared by the groups, which each add their tables to it
+        table_stats: SemanticTablesStats = SemanticTablesStats(llm_tables=0, bypassed_tables=0)
+
+        async def parse_group(group_elements: List[Element]) -> List[Chunk]:
+            async with stage_limiter.stage('Paragraph Parsing'):
+                with tracer.stage('Paragraph Parsing', len(group_elements)) as paragraph_span:
+                    group_elements = await semantic_splitter(group_elements, self.node_parser)
+                    paragraph_span.elements_out = len(group_elements)
+
+            async with stage_limiter.stage('Table Parsing 2/2'):
+                with tracer.stage('Table Parsing 2/2', len(group_elements)) as table_span:
+                    group_elements = await semantic_tables(
+                        group_elements,
+                        self.llm_model,
+                        self.llm_scheduler,
+                        self.table_cache,
+                        self.single_call_tables,
+                        self.simple_table_classifier,
+                        table_stats
+                    )
+                    table_span.elements_out = len(group_elements)
+
+            async with stage_limiter.stage('Image Captioning'):
+                with tracer.stage('Image Captioning', len(group_elements)) as image_span:
+                    group_chunks: List[Chunk] = [Chunk.from_element(element) for element in group_elements]
+
+                    # The chunks now hold the only reference to each image's data, which the captioner frees as it goes
+                    del group_elements
+
+                    group_chunks = await self._acaption_images(group_chunks)
+                    image_span.elements_out = len(group_chunks)
+
+            stage_times['Paragraph Parsing'] += paragraph_span.duration_ms
+            stage_times['Table Parsing 2/2'] += table_span.duration_ms
+            stage_times['Image Captioning'] += image_span.duration_ms
+
+            return group_chunks
+
+        def remove_small_nodes(windowed_chunks: List[Chunk]) -> List[Union[dict, Chunk]]:
+            with tracer.stage('Remove Small Nodes', len(windowed_chunks)) as remove_span:
+                windowed_chunks = remove_small(windowed_chunks, min_length=self.min_length)
+                remove_span.elements_out = len(windowed_chunks)
+
+            stage_times['Remove Small Nodes'] += remove_span.duration_ms
+            return self._output(windowed_chunks)
+
+        window_stream: WindowStream = WindowStream(self.window_size)
+        pending: Deque[asyncio.Task] = collections.deque()
+
+        try:
+            while True:
+                # Top up the groups being processed ahead of the consumer
+                pending.extend(
+                    asyncio.create_task(parse_group(group_elements))
+                    for group_elements in itertools.islice(groups, max_groups_in_flight - len(pending))
+                )
+
+                if not pending:
+                    break
+
+                # Groups are awaited in order so the elements come out in document order
+                group_chunks: List[Chunk] = await pending.popleft()
+
+                # Window references index the yielded elements, so small nodes go first
+                if self.window_references:
+                    group_chunks = remove_small(group_chunks, min_length=self.min_length)
+
+                with tracer.stage('Window Combination', len(group_chunks)) as window_span:
+                    windowed_chunks: List[Chunk] = window_stream.push(group_chunks)
+                    window_span.elements_out = len(windowed_chunks)
+
+                stage_times['Window Combination'] += window_span.duration_ms
+
+                for element in remove_small_nodes(windowed_chunks):
+                    yield element
+
+            for element in remove_small_nodes(window_stream.flush()):
+                yield element
+        finally:
+            # The consumer stopped early (or errored), so don't leave orphan tasks behind
+            for task in pending:
+                task.cancel()
+
+        await self._report_structure_stages(stages, elements_in, stats, on_step_finished, tracer)
+
+        for stage_name, stage_time in stage_times.items():
+            await on_step_finished(stage_name, round(stage_time, 1))
+
+        stats.update(
+            paragraph_parse_time=round(stage_times['Paragraph Parsing'], 1),
+            table_parse_time_strategy_2=round(stage_times['Table Parsing 2/2'], 1),
+            combine_window_time=round(stage_times['Window Combination'], 1),
+            image_caption_time=round(stage_times['Image Captioning'], 1),
+            **table_stats
         )
 
+    async def aparse_many(
+            self,
+            documents: Iterable[Tuple[io.BytesIO, str]],
+            max_documents_in_flight: int = 4,
+            stage_limits: Optional[Dict[str, int]] = None
+    ) -> AsyncIterator[SemanticDocumentParserResult]:
+        """
+        Parse a batch of documents, yielding each result as soon as its document finishes
+
+        Documents are pulled from the iterable lazily, so it can be a generator over a very large corpus.
+        A failed document is reported through its result's 'error' and does not stop the batch.
+
+        :param documents: (document, document_filename) pairs
+        :param max_documents_in_flight: The maximum number of documents being parsed at once
+        :param stage_limits: The maximum number of documents inside a given stage at once, keyed by stage name
+        :return: The results, in completion order
+
+        """
 
-__all__ = ['SemanticDocumentParser']
+        stage_limiter: StageLimiter = StageLimiter(stage_limits)
+        documents_iterator = iter(documents)
+        pending: Set[asyncio.Task] = set()
+
+        async def parse_document(document: io.BytesIO, document_filename: str) -> SemanticDocumentParserResult:
+            try:
+                elements, stats = await self.aparse(document, document_filename, stage_limiter=stage_limiter)
+                return SemanticDocumentParserResult(
+                    document_filename=document_filename, elements=elements, stats=stats, error=None
+                )
+            except Exception as ex:
+                logging.exception(f"Failed to parse document '{document_filename}'")
+                return SemanticDocumentParserResult(
+                    document_filename=document_filename, elements=[], stats=None, error=ex
+                )
+
+        try:
+            while True:
+                # Top up the in-flight documents
+                for document, document_filename in itertools.islice(
+                        documents_iterator, max_documents_in_flight - len(pending)
+                ):
+                    pending.add(asyncio.create_task(parse_document(document, document_filename)))
+
+                if not pending:
+                    break
+
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    yield task.result()
+        finally:
+            # The consumer stopped early (or errored), so don't leave orphan tasks behind
+            for task in pending:
+                task.cancel()
+
+
+__all__ = ['SemanticDocumentParser', 'SemanticDocumentParserResult']
@@ -0,0 +1,219 @@
+import asyncio
+import concurrent.futures
+import functools
+import io
+import multiprocessing
+import os
+from multiprocessing.context import BaseContext
+from typing import List, Optional
+
+from unstructured.documents.elements import Element
+from unstructured.file_utils.filetype import detect_filetype
+from unstructured.file_utils.model import FileType
+from unstructured.staging.base import elements_to_dicts, elements_from_dicts
+
+from SemanticDocumentParser.sharding import (
+    DocumentShard,
+    split_document,
+    merge_shards,
+    DEFAULT_PAGES_PER_SHARD,
+    DEFAULT_SHARD_THRESHOLD_PAGES,
+    SHARDABLE_FILE_TYPES
+)
+
+# Modules that are expensive to import. Workers import them once, up-front, so a document never pays for it.
+PARTITION_PRELOAD_MODULES: List[str] = [
+    "SemanticDocumentParser.parser",
+]
+
+
+def _warm_worker() -> None:
+    """
+    Import the partitioners in the worker process so the first document does not pay the import cost.
+
+    :return: None
+
+    """
+
+    from SemanticDocumentParser.parser import PARSER_OVERRIDE_MAP  # noqa: F401
+
+
+def _ping_worker() -> int:
+    """
+    No-op task used to force the pool to spawn its workers ahead of time.
+
+    :return: The worker PID
+
+    """
+
+    return os.getpid()
+
+
+def _partition_worker(document_bytes: bytes, **kwargs) -> List[dict]:
+    """
+    Partition a document inside a worker process.
+
+    Elements are returned as dicts since that's the stable, picklable form unstructured can rebuild them from.
+
+    :param document_bytes: The raw document
+    :param kwargs: Partition kwargs (metadata_filename, languages, etc.)
+    :return: The partitioned elements as dicts
+
+    """
+
+    from SemanticDocumentParser.parser import SemanticDocumentParser
+
+    elements: List[Element] = SemanticDocumentParser.partition(file=io.BytesIO(document_bytes), **kwargs)()
+    return elements_to_dicts(elements)
+
+
+def _default_mp_context() -> BaseContext:
+    """
+    Prefer a forkserver so the heavy imports happen once in the server & are inherited by every forked worker.
+    Fall back to spawn where forkserver is not available (Windows).
+
+    :return: The multiprocessing context
+
+    """
+
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload(PARTITION_PRELOAD_MODULES)
+    return context
+
+
+class PartitionExecutor:
+    """
+    Process pool that runs unstructured partitioning off the event loop.
+
+    Partitioning is CPU-bound & holds the GIL, so running it in the event loop (or in a thread) stalls every other
+    coroutine in the process. Workers import the partitioners once when they start & are kept warm between documents.
+
+    Long PDFs & decks are split into page (or slide) ranges that are partitioned by several workers at once.
+
+    """
+
+    def __init__(
+            self,
+            max_workers: Optional[int] = None,
+            mp_context: Optional[BaseContext] = None,
+            max_tasks_per_child: Optional[int] = None,
+            pages_per_shard: int = DEFAULT_PAGES_PER_SHARD,
+            shard_threshold_pages: Optional[int] = DEFAULT_SHARD_THRESHOLD_PAGES
+    ):
+        """
+        Create the executor. Workers are not started until the first document or an explicit call to start().
+
+        :param max_workers: Number of worker processes. Defaults to the number of CPUs.
+        :param mp_context: The multiprocessing context to use. Defaults to forkserver where available.
+        :param max_tasks_per_child: Recycle a worker after this many documents (guards against leaky partitioners)
+        :param pages_per_shard: The number of PDF pages (or PPTX slides) partitioned by a single worker
+        :param shard_threshold_pages: Only shard documents with more pages (or slides) than this. None disables sharding.
+
+        """
+
+        self.pages_per_shard: int = pages_per_shard
+        self.shard_threshold_pages: Optional[int] = shard_threshold_pages
+
+        self.max_workers: int = max_workers or os.cpu_count() or 1
+        self._mp_context: BaseContext = mp_context or _default_mp_context()
+        self._max_tasks_per_child: Optional[int] = max_tasks_per_child
+        self._pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+
+    @property
+    def pool(self) -> concurrent.futures.ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=self._mp_context,
+                initializer=_warm_worker,
+                max_tasks_per_child=self._max_tasks_per_child
+            )
+
+        return self._pool
+
+    def start(self) -> None:
+        """
+        Spawn (and warm) every worker now rather than on the first documents.
+
+        :return: None
+
+        """
+
+        futures = [self.pool.submit(_ping_worker) for _ in range(self.max_workers)]
+        concurrent.futures.wait(futures)
+
+    async def apartition(self, document: io.BytesIO, **kwargs) -> List[Element]:
+        """
+        Partition a document in a worker process without blocking the event loop.
+
+        :param document: The document to partition
+        :param kwargs: Partition kwargs, same as SemanticDocumentParser.partition (except 'file')
+        :return: The partitioned elements
+
+        """
+
+        document_bytes: bytes = document.getvalue()
+        shards: List[DocumentShard] = await self._asplit(document_bytes, kwargs.get("metadata_filename"))
+
+        if len(shards) < 2:
+            return elements_from_dicts(await self._arun_partition(document_bytes, **kwargs))
+
+        shard_element_dicts: List[List[dict]] = await asyncio.gather(
+            *[self._arun_partition(shard['document_bytes'], **kwargs) for shard in shards]
+        )
+
+        return merge_shards(
+            [elements_from_dicts(element_dicts) for element_dicts in shard_element_dicts],
+            shards,
+            unique_element_ids=kwargs.get("unique_element_ids", False)
+        )
+
+    async def _arun_partition(self, document_bytes: bytes, **kwargs) -> List[dict]:
+        return await asyncio.get_running_loop().run_in_executor(
+            self.pool,
+            functools.partial(_partition_worker, document_bytes, **kwargs)
+        )
+
+    async def _asplit(self, document_bytes: bytes, document_filename: Optional[str]) -> List[DocumentShard]:
+        """
+        Split the document into shards if it is a long PDF or deck
+
+        :param document_bytes: The raw document
+        :param document_filename: The name of the doc
+        :return: The shards, or an empty list if it should be partitioned whole
+
+        """
+
+        if self.shard_threshold_pages is None:
+            return []
+
+        file_type: FileType = detect_filetype(file=io.BytesIO(document_bytes), metadata_file_path=document_filename)
+
+        if file_type not in SHARDABLE_FILE_TYPES:
+            return []
+
+        # Reading the page count means parsing the document, so keep it off the event loop too
+        return await asyncio.get_running_loop().run_in_executor(
+            self.pool,
+            functools.partial(
+                split_document, document_bytes, file_type, self.pages_per_shard, self.shard_threshold_pages
+            )
+        )
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
+
+    def __enter__(self) -> "PartitionExecutor":
+        self.start()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.shutdown()
+
+
+__all__ = ["PartitionExecutor"]
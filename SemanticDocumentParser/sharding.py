@@ -0,0 +1,168 @@
+import io
+from typing import List, TypedDict, Set
+
+from unstructured.documents.elements import Element, assign_and_map_hash_ids
+from unstructured.file_utils.model import FileType
+from unstructured.partition.common.metadata import set_element_hierarchy
+
+# Split documents longer than this many pages (or slides)
+DEFAULT_SHARD_THRESHOLD_PAGES: int = 60
+
+# The number of pages (or slides) partitioned by a single worker
+DEFAULT_PAGES_PER_SHARD: int = 20
+
+SHARDABLE_FILE_TYPES: Set[FileType] = {FileType.PDF, FileType.PPTX}
+
+
+class DocumentShard(TypedDict):
+    """A standalone page (or slide) range of a document"""
+
+    page_offset: int
+    document_bytes: bytes
+
+
+def _page_ranges(page_count: int, pages_per_shard: int) -> List[range]:
+    return [range(start, min(start + pages_per_shard, page_count)) for start in range(0, page_count, pages_per_shard)]
+
+
+def split_pdf(document_bytes: bytes, pages_per_shard: int, shard_threshold_pages: int) -> List[DocumentShard]:
+    """
+    Split a PDF into standalone PDFs of consecutive pages
+
+    :param document_bytes: The PDF
+    :param pages_per_shard: The number of pages per shard
+    :param shard_threshold_pages: Only split PDFs with more pages than this
+    :return: The shards, or an empty list if the PDF is not worth splitting
+
+    """
+
+    from pypdf import PdfReader, PdfWriter
+
+    reader: PdfReader = PdfReader(io.BytesIO(document_bytes))
+
+    if len(reader.pages) <= shard_threshold_pages:
+        return []
+
+    shards: List[DocumentShard] = []
+
+    for page_range in _page_ranges(len(reader.pages), pages_per_shard):
+        writer: PdfWriter = PdfWriter()
+
+        for page_idx in page_range:
+            writer.add_page(reader.pages[page_idx])
+
+        shard_io: io.BytesIO = io.BytesIO()
+        writer.write(shard_io)
+        shards.append(DocumentShard(page_offset=page_range.start, document_bytes=shard_io.getvalue()))
+
+    return shards
+
+
+def split_pptx(document_bytes: bytes, slides_per_shard: int, shard_threshold_slides: int) -> List[DocumentShard]:
+    """
+    Split a deck into standalone decks of consecutive slides
+
+    :param document_bytes: The deck
+    :param slides_per_shard: The number of slides per shard
+    :param shard_threshold_slides: Only split decks with more slides than this
+    :return: The shards, or an empty list if the deck is not worth splitting
+
+    """
+
+    from pptx import Presentation
+
+    slide_count: int = len(Presentation(io.BytesIO(document_bytes)).slides)
+
+    if slide_count <= shard_threshold_slides:
+        return []
+
+    shards: List[DocumentShard] = []
+
+    for slide_range in _page_ranges(slide_count, slides_per_shard):
+        # python-pptx has no public slide removal, so drop the slide references & let the save skip orphaned parts
+        presentation = Presentation(io.BytesIO(document_bytes))
+        slide_id_list = presentation.slides._sldIdLst
+
+        for slide_idx, slide_id in reversed(list(enumerate(slide_id_list))):
+            if slide_idx not in slide_range:
+                presentation.part.drop_rel(slide_id.rId)
+                slide_id_list.remove(slide_id)
+
+        shard_io: io.BytesIO = io.BytesIO()
+        presentation.save(shard_io)
+        shards.append(DocumentShard(page_offset=slide_range.start, document_bytes=shard_io.getvalue()))
+
+    return shards
+
+
+def split_document(
+        document_bytes: bytes,
+        file_type: FileType,
+        pages_per_shard: int = DEFAULT_PAGES_PER_SHARD,
+        shard_threshold_pages: int = DEFAULT_SHARD_THRESHOLD_PAGES
+) -> List[DocumentShard]:
+    """
+    Split a long PDF or deck into page (or slide) range shards that can be partitioned in parallel
+
+    :param document_bytes: The document
+    :param file_type: The detected file type
+    :param pages_per_shard: The number of pages (or slides) per shard
+    :param shard_threshold_pages: Only split documents with more pages (or slides) than this
+    :return: The shards, or an empty list if the document should be partitioned whole
+
+    """
+
+    if file_type == FileType.PDF:
+        return split_pdf(document_bytes, pages_per_shard, shard_threshold_pages)
+
+    if file_type == FileType.PPTX:
+        return split_pptx(document_bytes, pages_per_shard, shard_threshold_pages)
+
+    return []
+
+
+def merge_shards(
+        shard_elements: List[List[Element]],
+        shards: List[DocumentShard],
+        unique_element_ids: bool = False
+) -> List[Element]:
+    """
+    Merge partitioned shards back into the element list of the whole document.
+
+    Page numbers are shifted back to the document's, then element IDs & the title hierarchy (parent_id) are recomputed
+    across the whole list, so they match an unsharded partition & titles carry over shard boundaries.
+
+    :param shard_elements: The partitioned elements of each shard, in shard order
+    :param shards: The shards
+    :param unique_element_ids: Whether the partition used UUIDs instead of hash IDs
+    :return: The elements of the whole document
+
+    """
+
+    elements: List[Element] = []
+
+    for shard, shard_element_list in zip(shards, shard_elements):
+        for element in shard_element_list:
+            if element.metadata.page_number is not None:
+                element.metadata.page_number += shard['page_offset']
+
+            # Hierarchy was computed within the shard only
+            element.metadata.parent_id = None
+            elements.append(element)
+
+    if not unique_element_ids:
+        elements = assign_and_map_hash_ids(elements)
+
+    return set_element_hierarchy(elements)
+
+
+__all__ = [
+    "DocumentShard",
+    "split_document",
+    "split_pdf",
+    "split_pptx",
+    "merge_shards",
+    "DEFAULT_PAGES_PER_SHARD",
+    "DEFAULT_SHARD_THRESHOLD_PAGES",
+    "SHARDABLE_FILE_TYPES"
+]
@@ -0,0 +1,356 @@
+import abc
+import contextlib
+import contextvars
+import json
+import math
+import time
+import tracemalloc
+from typing import TypedDict, Optional, List, Callable, Iterator, Any, IO, Union, Tuple
+
+
+class StageTrace(TypedDict):
+    """What one stage of one document consumed & produced"""
+
+    document_filename: str
+    stage: str
+
+    # Wall-clock start (epoch seconds), for exporting as spans
+    start_time: float
+
+    # perf_counter duration & process CPU time, in ms. CPU time covers the whole process, so stages of concurrent
+    # documents count towards each other, and work done in the partition pool's workers is not included.
+    duration_ms: float
+    cpu_time_ms: float
+
+    # None where the stage has no element input (partitioning) or the count isn't known
+    elements_in: Optional[int]
+    elements_out: Optional[int]
+
+    # Requests sent to the models, each retry & failed attempt included. Cache hits aren't counted.
+    llm_calls: int
+    embedding_calls: int
+
+    # LLM prompt & completion tokens (the provider's usage when it reports it, otherwise estimated) & the estimated
+    # tokens of the embedded texts
+    input_tokens: int
+    output_tokens: int
+    embedding_tokens: int
+
+    # Peak traced allocation above the stage's starting point, in bytes. Only with trace_memory.
+    memory_peak_bytes: Optional[int]
+
+
+class StageCounters:
+    """The model usage of the running stage, added to by the LLM scheduler & the node parser"""
+
+    __slots__ = ("llm_calls", "embedding_calls", "input_tokens", "output_tokens", "embedding_tokens")
+
+    def __init__(self):
+        self.llm_calls: int = 0
+        self.embedding_calls: int = 0
+        self.input_tokens: int = 0
+        self.output_tokens: int = 0
+        self.embedding_tokens: int = 0
+
+
+# Tasks copy the context when they are created, so the requests a stage fans out still count towards it
+_stage_counters: contextvars.ContextVar[Optional[StageCounters]] = contextvars.ContextVar("stage_counters", default=None)
+
+
+def _usage_value(usage: Any, name: str) -> Optional[int]:
+    value = usage.get(name) if isinstance(usage, dict) else getattr(usage, name, None)
+    return value if isinstance(value, int) else None
+
+
+def _response_usage(response: Any) -> Tuple[Optional[int], Optional[int]]:
+    """
+    The prompt & completion tokens a llama-index response reports, if any
+
+    :param response: The ChatResponse or CompletionResponse
+    :return: (prompt tokens, completion tokens)
+
+    """
+
+    raw = getattr(response, "raw", None)
+    usage = raw.get("usage") if isinstance(raw, dict) else getattr(raw, "usage", None)
+
+    if usage is None:
+        return None, None
+
+    return _usage_value(usage, "prompt_tokens"), _usage_value(usage, "completion_tokens")
+
+
+def record_llm_call(response: Optional[Any], estimated_input_tokens: int) -> None:
+    """
+    Count an LLM request attempt towards the running stage, if any
+
+    :param response: The ChatResponse or CompletionResponse, or None if the attempt failed (its tokens aren't known)
+    :param estimated_input_tokens: The prompt estimate, used when the response has no usage
+    :return: None
+
+    """
+
+    counters: Optional[StageCounters] = _stage_counters.get()
+
+    if counters is None:
+        return
+
+    counters.llm_calls += 1
+
+    if response is None:
+        return
+
+    # The scheduler reports to this module, so its import is deferred
+    from SemanticDocumentParser.llm_scheduler import estimate_tokens
+
+    input_tokens, output_tokens = _response_usage(response)
+    counters.input_tokens += estimated_input_tokens if input_tokens is None else input_tokens
+    counters.output_tokens += estimate_tokens(str(response)) if output_tokens is None else output_tokens
+
+
+def record_embedding_calls(texts: List[str], batch_size: int) -> None:
+    """
+    Count a batch of embedded texts towards the running stage, if any
+
+    :param texts: The texts sent to the embedding model
+    :param batch_size: The embedding model's batch size (one request per batch)
+    :return: None
+
+    """
+
+    counters: Optional[StageCounters] = _stage_counters.get()
+
+    if counters is None or not texts:
+        return
+
+    from SemanticDocumentParser.llm_scheduler import estimate_tokens
+
+    counters.embedding_calls += math.ceil(len(texts) / max(1, batch_size))
+    counters.embedding_tokens += sum(estimate_tokens(text) for text in texts)
+
+
+class TraceSink(abc.ABC):
+    """Receives every finished stage trace"""
+
+    @abc.abstractmethod
+    def emit(self, trace: StageTrace) -> None:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class CallbackTraceSink(TraceSink):
+    """Hands each trace to a function"""
+
+    def __init__(self, callback: Callable[[StageTrace], None]):
+        self.callback: Callable[[StageTrace], None] = callback
+
+    def emit(self, trace: StageTrace) -> None:
+        self.callback(trace)
+
+
+class JSONLinesTraceSink(TraceSink):
+    """Appends each trace as a line of JSON to a file"""
+
+    def __init__(self, file: Union[str, IO[str]]):
+        """
+        Create the sink
+
+        :param file: A path (opened for appending & closed with the sink) or an open text file
+
+        """
+
+        self._owns_file: bool = isinstance(file, str)
+        self.file: IO[str] = open(file, "a", encoding="utf-8") if isinstance(file, str) else file
+
+    def emit(self, trace: StageTrace) -> None:
+        self.file.write(json.dumps(trace) + "\n")
+        self.file.flush()
+
+    def close(self) -> None:
+        if self._owns_file:
+            self.file.close()
+
+
+class OpenTelemetryTraceSink(TraceSink):
+    """
+    Exports each trace as an OpenTelemetry span named after the stage, with the counts as 'sdp.*' attributes.
+    Requires opentelemetry-api (pip install SemanticDocumentParser[otel]); spans go wherever its SDK is configured to send them.
+
+    """
+
+    def __init__(self, tracer: Any = None):
+        try:
+            from opentelemetry import trace
+        except ImportError as ex:
+            raise ImportError("OpenTelemetryTraceSink requires opentelemetry-api: pip install opentelemetry-api") from ex
+
+        self.tracer = tracer or trace.get_tracer("SemanticDocumentParser")
+
+    def emit(self, trace: StageTrace) -> None:
+        start_time_ns: int = int(trace['start_time'] * 1e9)
+
+        span = self.tracer.start_span(
+            trace['stage'],
+            start_time=start_time_ns,
+            attributes={
+                f"sdp.{name}": value for name, value in trace.items()
+                if name not in ("stage", "start_time") and value is not None
+            }
+        )
+
+        span.end(end_time=start_time_ns + int(trace['duration_ms'] * 1e6))
+
+
+class StageSpan:
+    """A running stage. Set elements_out before it ends."""
+
+    __slots__ = ("elements_in", "elements_out", "duration_ms", "trace")
+
+    def __init__(self, elements_in: Optional[int]):
+        self.elements_in: Optional[int] = elements_in
+        self.elements_out: Optional[int] = None
+
+        # Set once the stage ends
+        self.duration_ms: float = 0
+        self.trace: Optional[StageTrace] = None
+
+
+class Tracer:
+    """
+    Records a StageTrace for every stage of one document, delivering them to the sink as each stage ends.
+
+    """
+
+    def __init__(self, document_filename: str, sink: Optional[TraceSink] = None, trace_memory: bool = False):
+        """
+        Create the tracer
+
+        :param document_filename: The name of the doc
+        :param sink: Where the traces are delivered. They are always kept in traces.
+        :param trace_memory: Record each stage's peak allocation. Starts tracemalloc (& leaves it running), which slows
+            parsing down a lot. Stages running concurrently reset each other's peak, so only trace one document at a time.
+
+        """
+
+        self.document_filename: str = document_filename
+        self.sink: Optional[TraceSink] = sink
+        self.trace_memory: bool = trace_memory
+        self.traces: List[StageTrace] = []
+
+    @contextlib.contextmanager
+    def stage(self, stage: str, elements_in: Optional[int] = None) -> Iterator[StageSpan]:
+        """
+        Trace a stage. Model requests made within it (including by tasks it creates) are counted towards it.
+
+        :param stage: The stage name
+        :param elements_in: The number of elements the stage receives
+        :return: The span, whose duration_ms is set once the stage ends
+
+        """
+
+        span: StageSpan = StageSpan(elements_in)
+        counters: StageCounters = StageCounters()
+        counters_token: contextvars.Token = _stage_counters.set(counters)
+
+        memory_start: Optional[int] = None
+
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+
+            tracemalloc.reset_peak()
+            memory_start = tracemalloc.get_traced_memory()[0]
+
+        start_time: float = time.time()
+        start_counter: float = time.perf_counter()
+        start_cpu: float = time.process_time()
+
+        try:
+            yield span
+        finally:
+            duration_ms: float = (time.perf_counter() - start_counter) * 1000
+            cpu_time_ms: float = (time.process_time() - start_cpu) * 1000
+            memory_peak_bytes: Optional[int] = None
+
+            if memory_start is not None and tracemalloc.is_tracing():
+                memory_peak_bytes = max(0, tracemalloc.get_traced_memory()[1] - memory_start)
+
+            _stage_counters.reset(counters_token)
+
+            span.duration_ms = round(duration_ms, 1)
+            span.trace = self.record(
+                stage,
+                start_time=start_time,
+                duration_ms=duration_ms,
+                cpu_time_ms=cpu_time_ms,
+                elements_in=span.elements_in,
+                elements_out=span.elements_out,
+                counters=counters,
+                memory_peak_bytes=memory_peak_bytes
+            )
+
+    def record(
+            self,
+            stage: str,
+            start_time: float,
+            duration_ms: float,
+            cpu_time_ms: float,
+            elements_in: Optional[int],
+            elements_out: Optional[int],
+            counters: Optional[StageCounters] = None,
+            memory_peak_bytes: Optional[int] = None
+    ) -> StageTrace:
+        """
+        Record a stage measured elsewhere (e.g. a lazy stage timed per item)
+
+        :param stage: The stage name
+        :param start_time: The wall-clock start, in epoch seconds
+        :param duration_ms: The duration, in ms
+        :param cpu_time_ms: The process CPU time, in ms
+        :param elements_in: The number of elements the stage received
+        :param elements_out: The number of elements the stage produced
+        :param counters: The stage's model usage
+        :param memory_peak_bytes: The stage's peak allocation
+        :return: The trace
+
+        """
+
+        counters = counters or StageCounters()
+
+        trace: StageTrace = StageTrace(
+            document_filename=self.document_filename,
+            stage=stage,
+            start_time=start_time,
+            duration_ms=round(duration_ms, 3),
+            cpu_time_ms=round(cpu_time_ms, 3),
+            elements_in=elements_in,
+            elements_out=elements_out,
+            llm_calls=counters.llm_calls,
+            embedding_calls=counters.embedding_calls,
+            input_tokens=counters.input_tokens,
+            output_tokens=counters.output_tokens,
+            embedding_tokens=counters.embedding_tokens,
+            memory_peak_bytes=memory_peak_bytes
+        )
+
+        self.traces.append(trace)
+
+        if self.sink is not None:
+            self.sink.emit(trace)
+
+        return trace
+
+
+__all__ = [
+    "StageTrace",
+    "StageSpan",
+    "Tracer",
+    "TraceSink",
+    "CallbackTraceSink",
+    "JSONLinesTraceSink",
+    "OpenTelemetryTraceSink",
+    "record_llm_call",
+    "record_embedding_calls",
+]
@@ -1,18 +1,47 @@
 import time
-from typing import Callable, Tuple, TypeVar, Awaitable
+from typing import TypeVar, Iterable, Iterator
 
-TimingsResponse = TypeVar("TimingsResponse")
+TimedItem = TypeVar("TimedItem")
 
 
-def with_timings_sync(fn: Callable[..., TimingsResponse]) -> Tuple[float, TimingsResponse]:
-    start_time: float = time.time() * 1000
-    fn_response: TimingsResponse = fn()
-    end_time: float = time.time() * 1000
-    return round(end_time - start_time, 1), fn_response
+class TimedIterator(Iterator[TimedItem]):
+    """
+    Wraps a (lazy) stage, adding up the time spent producing its items (perf_counter & process CPU time, in ms) and
+    counting them.
 
+    When stages are chained, the time includes pulling from the upstream stages. Subtract the upstream's time to get
+    the stage's own.
 
-async def with_timings_async(fn: Awaitable[TimingsResponse]) -> Tuple[float, TimingsResponse]:
-    start_time: float = time.time() * 1000
-    fn_response: TimingsResponse = await fn
-    end_time: float = time.time() * 1000
-    return round(end_time - start_time, 1), fn_response
+    """
+
+    def __init__(self, iterable: Iterable[TimedItem]):
+        self._iterator: Iterator[TimedItem] = iter(iterable)
+        self._elapsed: float = 0
+        self._cpu_time: float = 0
+        self.items: int = 0
+
+        # Wall-clock time of the first pull, in epoch seconds
+        self.start_time: float = 0
+
+    @property
+    def elapsed(self) -> float:
+        return self._elapsed
+
+    @property
+    def cpu_time(self) -> float:
+        return self._cpu_time
+
+    def __next__(self) -> TimedItem:
+        if not self.start_time:
+            self.start_time = time.time()
+
+        start_counter: float = time.perf_counter()
+        start_cpu: float = time.process_time()
+
+        try:
+            item: TimedItem = next(self._iterator)
+            self.items += 1
+            return item
+        finally:
+            self._elapsed += (time.perf_counter() - start_counter) * 1000
+            self._cpu_time += (time.process_time() - start_cpu) * 1000
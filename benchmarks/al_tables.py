@@ -0,0 +1,122 @@
+"""
+Benchmark of the al_tables rendering path on large exported gradebooks, against the previous BeautifulSoup + pandas
+implementation (kept here for comparison only).
+
+Usage:
+    python -m benchmarks.al_tables [--rows 500] [--columns 12] [--repeat 5]
+"""
+
+import argparse
+import random
+import time
+from typing import List, Callable
+
+from SemanticDocumentParser.element_parsers.al_tables import read_tables, render_tables_add_to_nodes_text
+
+
+def gradebook_html(rows: int, columns: int, seed: int = 1) -> str:
+    """
+    A gradebook-style table: a header row, a student column & one column per assessment (some cells empty or linked)
+
+    :param rows: The number of student rows
+    :param columns: The number of columns
+    :param seed: The random seed
+    :return: The table HTML
+
+    """
+
+    rng = random.Random(seed)
+    header: List[str] = ["Student"] + [f"Assignment {column}" for column in range(1, columns)]
+    html: List[str] = ["<table><thead><tr>", "".join(f"<td>{name}</td>" for name in header), "</tr></thead><tbody>"]
+
+    for row in range(rows):
+        cells: List[str] = [f'<td><a href="https://eclass.yorku.ca/user/{row}">Student {row}</a></td>']
+        cells += [f"<td>{rng.randint(40, 100)}%</td>" if rng.random() > 0.1 else "<td></td>" for _ in range(1, columns)]
+        html.append("<tr>" + "".join(cells) + "</tr>")
+
+    html.append("</tbody></table>")
+    return "".join(html)
+
+
+def legacy_render(html_text: str) -> List[str]:
+    """The previous implementation: BeautifulSoup (twice) into pandas DataFrames, walked with iloc"""
+
+    import pandas as pd
+    from bs4 import BeautifulSoup
+
+    html_text = html_text.replace("th", "td")
+    soup = BeautifulSoup(html_text, 'html.parser')
+    data_frames = []
+
+    for table in soup.find_all('table'):
+        table_data = []
+
+        for row in table.find_all('tr'):
+            cols = row.find_all('td')
+            cols_text = [col.get_text() for col in cols]
+            cols_links = [col.find('a')['href'] if col.find('a') and 'href' in col.find('a').attrs else '' for col in cols]
+            table_data.append([f'[{text}] ({link})' if link else text for text, link in zip(cols_text, cols_links)])
+
+        data_frames.append(pd.DataFrame(table_data))
+
+    table_titles = ["Gradebook" for _ in BeautifulSoup(html_text, 'html.parser').find_all('table')]
+    nodes_text: List[str] = []
+
+    for idx, title in enumerate(table_titles):
+        temp_df = data_frames[idx]
+        temp_text = "*" + title + "*\n "
+
+        for j in range(1, len(temp_df)):
+            if temp_df.iloc[0, 0] and temp_df.iloc[j, 0]:
+                temp_text += "The following " + temp_df.iloc[0, 0].strip() + ": " + temp_df.iloc[j, 0].strip() + " has "
+
+            for k in range(1, len(temp_df.columns) - 1):
+                if not temp_df.iloc[0, k] or not temp_df.iloc[j, k] or not temp_df.iloc[0, k + 1] or not temp_df.iloc[j, k + 1]:
+                    continue
+
+                temp_text += "the following " + temp_df.iloc[0, k].strip() + ": " + str(temp_df.iloc[j, k]).strip() + " has "
+                temp_text += "the following " + temp_df.iloc[0, k + 1].strip() + ": " + str(temp_df.iloc[j, k + 1]).strip() + ", "
+
+        nodes_text.append(temp_text)
+
+    return nodes_text
+
+
+def current_render(html_text: str) -> List[str]:
+    doc_tables, _ = read_tables(html_text, [])
+    return render_tables_add_to_nodes_text(["Gradebook"] * len(doc_tables), doc_tables)
+
+
+def best_time(fn: Callable[[str], List[str]], html_text: str, repeat: int) -> float:
+    timings: List[float] = []
+
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        fn(html_text)
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--columns", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>6} {'legacy (s)':>12} {'current (s)':>12} {'speedup':>8}")
+
+    for rows in args.rows:
+        html_text: str = gradebook_html(rows, args.columns)
+
+        # Both implementations must agree before their timings mean anything
+        assert legacy_render(html_text) == current_render(html_text)
+
+        legacy: float = best_time(legacy_render, html_text, args.repeat)
+        current: float = best_time(current_render, html_text, args.repeat)
+        print(f"{rows:>6} {legacy:>12.4f} {current:>12.4f} {legacy / current:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
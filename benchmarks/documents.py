@@ -0,0 +1,446 @@
+"""
+Synthetic course documents for the benchmarks. The same deterministic content (titled sections of paragraphs with
+hyperlinks, tables, bulleted lists & images) is rendered as DOCX, PPTX, HTML or PDF, or built directly as the
+unstructured elements partitioning would produce (to benchmark the stages without the partitioner).
+"""
+
+import base64
+import io
+import random
+import zlib
+from typing import TypedDict, List, Tuple, Union, Callable, Dict, Sequence
+
+from unstructured.documents.elements import Element, Title, NarrativeText, Table, ListItem, Image, ElementMetadata
+
+WORDS: List[str] = "course grade policy exam week lab office hours reading quiz lecture tutorial assignment term".split()
+
+
+class DocumentSpec(TypedDict):
+    """How much of each kind of content a synthetic document holds"""
+
+    sections: int
+    paragraphs_per_section: int
+    tables: int
+    table_rows: int
+    lists: int
+    list_items: int
+    links: int
+    images: int
+    seed: int
+
+
+def default_spec(**overrides) -> DocumentSpec:
+    spec: DocumentSpec = DocumentSpec(
+        sections=10,
+        paragraphs_per_section=3,
+        tables=4,
+        table_rows=8,
+        lists=4,
+        list_items=5,
+        links=20,
+        images=4,
+        seed=1
+    )
+
+    spec.update(overrides)
+    return spec
+
+
+class Link(TypedDict):
+    text: str
+    url: str
+    start_index: int
+
+
+# (kind, payload) in document order. Paragraphs carry (text, links), tables rows of cells, lists items, images PNG bytes.
+Block = Tuple[str, Union[str, Tuple[str, List[Link]], List[List[str]], List[str], bytes]]
+
+
+def _png(index: int, size: int = 32) -> bytes:
+    """A small PNG whose colour depends on its index, so every image is distinct"""
+
+    from PIL import Image as PILImage
+
+    image = PILImage.new("RGB", (size, size), ((index * 67) % 256, (index * 131) % 256, (index * 29) % 256))
+    output = io.BytesIO()
+    image.save(output, format="PNG")
+    return output.getvalue()
+
+
+def document_blocks(spec: DocumentSpec) -> List[Block]:
+    """
+    Lay out the content of a synthetic document. Tables, lists & images are spread over the sections round-robin and
+    the links over the paragraphs.
+
+    :param spec: The document spec
+    :return: The blocks, in document order
+
+    """
+
+    rng = random.Random(spec['seed'])
+    sections: int = max(1, spec['sections'])
+    paragraphs: int = sections * spec['paragraphs_per_section']
+
+    def sentence() -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 14))).capitalize() + "."
+
+    blocks: List[Block] = []
+    paragraph_index: int = 0
+
+    for section in range(sections):
+        blocks.append(("title", f"Section {section + 1}: {rng.choice(WORDS).capitalize()} {rng.choice(WORDS)}"))
+
+        for _ in range(spec['paragraphs_per_section']):
+            text: str = " ".join(sentence() for _ in range(rng.randint(2, 6)))
+            links: List[Link] = []
+
+            # This paragraph's share of the links, each appended as its own sentence
+            for link in range(paragraph_index, spec['links'], max(1, paragraphs)):
+                link_text: str = f"reading {link + 1}"
+                text += " See the " + link_text + "."
+                links.append(Link(text=link_text, url=f"https://eclass.example.ca/mod/resource/view.php?id={link + 1}",
+                                  start_index=len(text) - len(link_text) - 1))
+
+            blocks.append(("paragraph", (text, links)))
+            paragraph_index += 1
+
+        for table in range(section, spec['tables'], sections):
+            header: List[str] = ["Week", "Topic", "Reading", "Due"]
+            rows: List[List[str]] = [header] + [
+                [str(row + 1), rng.choice(WORDS).capitalize(), f"Chapter {rng.randint(1, 20)}", rng.choice(["Quiz", "Lab", ""])]
+                for row in range(spec['table_rows'])
+            ]
+            blocks.append(("table", rows))
+
+        for _ in range(section, spec['lists'], sections):
+            blocks.append(("list", [sentence() for _ in range(spec['list_items'])]))
+
+        for image in range(section, spec['images'], sections):
+            blocks.append(("image", _png(image)))
+
+    return blocks
+
+
+def make_elements(spec: DocumentSpec) -> List[Element]:
+    """The synthetic document as the elements unstructured produces for it"""
+
+    elements: List[Element] = []
+
+    for kind, payload in document_blocks(spec):
+        if kind == "title":
+            elements.append(Title(payload, metadata=ElementMetadata(category_depth=1)))
+        elif kind == "paragraph":
+            text, links = payload
+            elements.append(NarrativeText(text, metadata=ElementMetadata(links=[dict(link) for link in links] or None)))
+        elif kind == "table":
+            elements.append(Table(
+                "\n".join(" ".join(row) for row in payload),
+                metadata=ElementMetadata(text_as_html=_html_table(payload))
+            ))
+        elif kind == "list":
+            elements.extend(ListItem(item) for item in payload)
+        elif kind == "image":
+            elements.append(Image("", metadata=ElementMetadata(
+                image_base64=base64.b64encode(payload).decode(), image_mime_type="image/png"
+            )))
+
+    return elements
+
+
+def _html_table(rows: List[List[str]]) -> str:
+    return "<table>" + "".join(
+        "<tr>" + "".join(f"<td>{cell}</td>" for cell in row) + "</tr>" for row in rows
+    ) + "</table>"
+
+
+def make_html(spec: DocumentSpec) -> bytes:
+    html: List[str] = ["<html><head><title>Course Outline</title></head><body>"]
+
+    for kind, payload in document_blocks(spec):
+        if kind == "title":
+            html.append(f"<h1>{payload}</h1>")
+        elif kind == "paragraph":
+            text, links = payload
+            cursor, parts = 0, []
+
+            for link in links:
+                parts.append(text[cursor:link['start_index']])
+                parts.append(f'<a href="{link["url"]}">{link["text"]}</a>')
+                cursor = link['start_index'] + len(link['text'])
+
+            html.append("<p>" + "".join(parts) + text[cursor:] + "</p>")
+        elif kind == "table":
+            html.append(_html_table(payload))
+        elif kind == "list":
+            html.append("<ul>" + "".join(f"<li>{item}</li>" for item in payload) + "</ul>")
+        elif kind == "image":
+            html.append(f'<img src="data:image/png;base64,{base64.b64encode(payload).decode()}" alt="Figure">')
+
+    html.append("</body></html>")
+    return "".join(html).encode()
+
+
+def _docx_add_hyperlink(paragraph, text: str, url: str) -> None:
+    from docx.opc.constants import RELATIONSHIP_TYPE
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
+
+    hyperlink = OxmlElement("w:hyperlink")
+    hyperlink.set(qn("r:id"), paragraph.part.relate_to(url, RELATIONSHIP_TYPE.HYPERLINK, is_external=True))
+
+    run = OxmlElement("w:r")
+    run_text = OxmlElement("w:t")
+    run_text.text = text
+    run.append(run_text)
+    hyperlink.append(run)
+    paragraph._p.append(hyperlink)
+
+
+def make_docx(spec: DocumentSpec) -> bytes:
+    import docx
+    from docx.shared import Inches
+
+    document = docx.Document()
+
+    for kind, payload in document_blocks(spec):
+        if kind == "title":
+            document.add_heading(payload, level=1)
+        elif kind == "paragraph":
+            text, links = payload
+            paragraph = document.add_paragraph()
+            cursor: int = 0
+
+            for link in links:
+                paragraph.add_run(text[cursor:link['start_index']])
+                _docx_add_hyperlink(paragraph, link['text'], link['url'])
+                cursor = link['start_index'] + len(link['text'])
+
+            paragraph.add_run(text[cursor:])
+        elif kind == "table":
+            table = document.add_table(rows=len(payload), cols=len(payload[0]))
+
+            for row, cells in zip(table.rows, payload):
+                for cell, text in zip(row.cells, cells):
+                    cell.text = text
+        elif kind == "list":
+            for item in payload:
+                document.add_paragraph(item, style="List Bullet")
+        elif kind == "image":
+            document.add_picture(io.BytesIO(payload), width=Inches(1))
+
+    output = io.BytesIO()
+    document.save(output)
+    return output.getvalue()
+
+
+def make_pptx(spec: DocumentSpec) -> bytes:
+    """One slide per section: the title, then the section's other blocks stacked top to bottom"""
+
+    from pptx import Presentation
+    from pptx.util import Inches, Pt
+
+    presentation = Presentation()
+    slide, top = None, 0
+
+    for kind, payload in document_blocks(spec):
+        if kind == "title":
+            slide = presentation.slides.add_slide(presentation.slide_layouts[5])
+            slide.shapes.title.text = payload
+            top = 1.5
+            continue
+
+        if slide is None:
+            slide = presentation.slides.add_slide(presentation.slide_layouts[6])
+            top = 0.5
+
+        if kind in ("paragraph", "list"):
+            text_frame = slide.shapes.add_textbox(Inches(0.5), Inches(top), Inches(9), Inches(1)).text_frame
+            text_frame.word_wrap = True
+            items = [payload[0]] if kind == "paragraph" else payload
+
+            for idx, item in enumerate(items):
+                paragraph = text_frame.paragraphs[0] if idx == 0 else text_frame.add_paragraph()
+                paragraph.font.size = Pt(10)
+
+                if kind == "list":
+                    paragraph.text = item
+                    paragraph.level = 1
+                    continue
+
+                cursor: int = 0
+
+                for link in payload[1]:
+                    paragraph.add_run().text = item[cursor:link['start_index']]
+                    run = paragraph.add_run()
+                    run.text = link['text']
+                    run.hyperlink.address = link['url']
+                    cursor = link['start_index'] + len(link['text'])
+
+                paragraph.add_run().text = item[cursor:]
+
+            top += 0.3 * len(items) + 0.5
+        elif kind == "table":
+            table = slide.shapes.add_table(
+                len(payload), len(payload[0]), Inches(0.5), Inches(top), Inches(9), Inches(0.3 * len(payload))
+            ).table
+
+            for row_idx, cells in enumerate(payload):
+                for column_idx, text in enumerate(cells):
+                    table.cell(row_idx, column_idx).text = text
+
+            top += 0.3 * len(payload) + 0.5
+        elif kind == "image":
+            slide.shapes.add_picture(io.BytesIO(payload), Inches(0.5), Inches(top), Inches(1), Inches(1))
+            top += 1.5
+
+    output = io.BytesIO()
+    presentation.save(output)
+    return output.getvalue()
+
+
+class _PDFWriter:
+    """
+    Minimal PDF writer (Helvetica text, link annotations & RGB images), so no PDF library is needed to generate inputs.
+    Tables are laid out as rows of text, as in a PDF exported without tagging.
+
+    """
+
+    PAGE_WIDTH, PAGE_HEIGHT, MARGIN = 612, 792, 54
+
+    def __init__(self):
+        self.objects: List[bytes] = []
+        self.pages: List[Tuple[List[str], List[Tuple[float, float, float, float, str]], Dict[str, int]]] = []
+        self.font: int = self._add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+        self._new_page()
+
+    def _add(self, body: bytes) -> int:
+        self.objects.append(body)
+        return len(self.objects)
+
+    def _new_page(self) -> None:
+        self.pages.append(([], [], {}))
+        self.y: float = self.PAGE_HEIGHT - self.MARGIN
+
+    def _space(self, height: float) -> None:
+        if self.y - height < self.MARGIN:
+            self._new_page()
+
+        self.y -= height
+
+    @staticmethod
+    def _escape(text: str) -> str:
+        return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    def text(self, text: str, size: float = 10, indent: float = 0, links: Sequence[Link] = ()) -> None:
+        """Write wrapped text, adding a link annotation over each link's line"""
+
+        max_chars: int = int((self.PAGE_WIDTH - 2 * self.MARGIN - indent) / (size * 0.5))
+        words, line, offset = text.split(" "), "", 0
+
+        def flush(line_text: str, line_start: int) -> None:
+            self._space(size * 1.4)
+            x: float = self.MARGIN + indent
+            self.pages[-1][0].append(f"BT /F1 {size} Tf 1 0 0 1 {x} {self.y} Tm ({self._escape(line_text)}) Tj ET")
+
+            for link in links:
+                if line_start <= link['start_index'] < line_start + len(line_text):
+                    link_x: float = x + (link['start_index'] - line_start) * size * 0.5
+                    self.pages[-1][1].append((link_x, self.y - 2, link_x + len(link['text']) * size * 0.5, self.y + size, link['url']))
+
+        for word in words:
+            if line and len(line) + len(word) + 1 > max_chars:
+                flush(line, offset)
+                offset += len(line) + 1
+                line = word
+            else:
+                line = f"{line} {word}" if line else word
+
+        if line:
+            flush(line, offset)
+
+        self._space(size * 0.6)
+
+    def image(self, png_bytes: bytes, size: float = 72) -> None:
+        from PIL import Image as PILImage
+
+        image = PILImage.open(io.BytesIO(png_bytes)).convert("RGB")
+        data: bytes = zlib.compress(image.tobytes())
+        image_object: int = self._add(
+            f"<< /Type /XObject /Subtype /Image /Width {image.width} /Height {image.height} /ColorSpace /DeviceRGB "
+            f"/BitsPerComponent 8 /Filter /FlateDecode /Length {len(data)} >>\nstream\n".encode() + data + b"\nendstream"
+        )
+
+        self._space(size + 10)
+        name: str = f"Im{len(self.pages[-1][2])}"
+        self.pages[-1][2][name] = image_object
+        self.pages[-1][0].append(f"q {size} 0 0 {size} {self.MARGIN} {self.y} cm /{name} Do Q")
+
+    def render(self) -> bytes:
+        pages_object: int = len(self.objects) + 1
+        page_objects: List[int] = []
+        self._add(b"")
+
+        for commands, annotations, images in self.pages:
+            stream: bytes = "\n".join(commands).encode("cp1252", errors="replace")
+            contents: int = self._add(f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream")
+            annotation_objects: List[int] = [
+                self._add(
+                    f"<< /Type /Annot /Subtype /Link /Rect [{x1:.1f} {y1:.1f} {x2:.1f} {y2:.1f}] /Border [0 0 0] "
+                    f"/A << /S /URI /URI ({self._escape(url)}) >> >>".encode()
+                )
+                for x1, y1, x2, y2, url in annotations
+            ]
+            xobjects: str = " ".join(f"/{name} {obj} 0 R" for name, obj in images.items())
+            page_objects.append(self._add(
+                f"<< /Type /Page /Parent {pages_object} 0 R /MediaBox [0 0 {self.PAGE_WIDTH} {self.PAGE_HEIGHT}] "
+                f"/Resources << /Font << /F1 {self.font} 0 R >> /XObject << {xobjects} >> >> /Contents {contents} 0 R "
+                f"/Annots [{' '.join(f'{obj} 0 R' for obj in annotation_objects)}] >>".encode()
+            ))
+
+        self.objects[pages_object - 1] = (
+            f"<< /Type /Pages /Kids [{' '.join(f'{obj} 0 R' for obj in page_objects)}] /Count {len(page_objects)} >>".encode()
+        )
+        catalog: int = self._add(f"<< /Type /Catalog /Pages {pages_object} 0 R >>".encode())
+
+        output = io.BytesIO()
+        output.write(b"%PDF-1.4\n")
+        offsets: List[int] = []
+
+        for number, body in enumerate(self.objects, start=1):
+            offsets.append(output.tell())
+            output.write(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+
+        xref: int = output.tell()
+        output.write(f"xref\n0 {len(self.objects) + 1}\n0000000000 65535 f \n".encode())
+        output.write("".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode())
+        output.write(f"trailer\n<< /Size {len(self.objects) + 1} /Root {catalog} 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+        return output.getvalue()
+
+
+def make_pdf(spec: DocumentSpec) -> bytes:
+    writer = _PDFWriter()
+
+    for kind, payload in document_blocks(spec):
+        if kind == "title":
+            writer.text(payload, size=16)
+        elif kind == "paragraph":
+            writer.text(payload[0], links=payload[1])
+        elif kind == "table":
+            for row in payload:
+                writer.text("    ".join(row))
+        elif kind == "list":
+            for item in payload:
+                writer.text("• " + item, indent=12)
+        elif kind == "image":
+            writer.image(payload)
+
+    return writer.render()
+
+
+# File generators by format, named after the extension used to partition them
+DOCUMENT_GENERATORS: Dict[str, Callable[[DocumentSpec], bytes]] = {
+    "docx": make_docx,
+    "pptx": make_pptx,
+    "html": make_html,
+    "pdf": make_pdf,
+}
@@ -0,0 +1,432 @@
+"""
+Load & soak harness. Keeps a fixed number of `aparse` calls in flight against the stub LLM & embedding backends, made
+slow & unreliable with a latency distribution & rate-limit error rate each, and reports per-document latency
+percentiles, throughput, RSS & event-loop lag (how late a periodic timer fires, i.e. how long the loop was blocked).
+
+Runs a fixed number of documents, or (with --duration) keeps going for a soak, printing a JSON snapshot of the last
+interval to stderr every --report-interval seconds so a leak or slowdown shows up as a trend. No network is used; the
+'elements' format (the default) also skips unstructured, whose partitioners need NLTK data.
+
+Usage:
+    python -m benchmarks.load [--concurrency 50] [--documents 200 | --duration 3600] [--report-interval 10]
+                              [--llm-latency lognormal:0.8,0.5] [--llm-error-rate 0.02]
+                              [--embedding-latency uniform:0.05,0.2] [--embedding-error-rate 0]
+                              [--max-in-flight-llm 32] [--requests-per-minute 500] [--max-retries 3]
+                              [--base-backoff 1] [--format elements] [--vectorized-breakpoints]
+                              [--sections 10] ... [--output report.json]
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import logging
+import math
+import os
+import platform
+import resource
+import sys
+import time
+from typing import List, TypedDict, Optional, Dict, Callable, Tuple
+
+from unstructured.documents.elements import Element
+
+from SemanticDocumentParser.llm_scheduler import LLMScheduler, LLMSchedulerStats
+from SemanticDocumentParser.parser import SemanticDocumentParser
+from benchmarks.documents import DocumentSpec, default_spec, make_elements, DOCUMENT_GENERATORS
+from benchmarks.stages import FORMATS
+from benchmarks.stubs import StubMultiModalLLM, StubEmbedding, FaultInjector, LatencyDistribution, stub_node_parser
+
+
+class Percentiles(TypedDict):
+    p50: Optional[float]
+    p95: Optional[float]
+    p99: Optional[float]
+    max: Optional[float]
+
+
+class LoadSnapshot(TypedDict):
+    """The documents finished in one report interval of a run"""
+
+    elapsed_seconds: float
+    completed: int
+    failed: int
+    throughput_per_second: float
+    latency_seconds: Percentiles
+    event_loop_lag_ms: Percentiles
+    rss_bytes: Optional[int]
+
+
+class BackendReport(TypedDict):
+    requests: int
+    injected_errors: int
+
+
+class LoadReport(TypedDict):
+    """The result of a load run"""
+
+    concurrency: int
+    duration_seconds: float
+    completed: int
+    failed: int
+    errors: Dict[str, int]
+    throughput_per_second: float
+    latency_seconds: Percentiles
+    event_loop_lag_ms: Percentiles
+    rss_start_bytes: Optional[int]
+    rss_end_bytes: Optional[int]
+    rss_peak_sampled_bytes: Optional[int]
+    max_rss_bytes: int
+    llm: BackendReport
+    embedding: BackendReport
+    llm_scheduler: LLMSchedulerStats
+    timeline: List[LoadSnapshot]
+
+
+class LoadParser(SemanticDocumentParser):
+    """Builds the elements of the synthetic document whose spec (as JSON) it is given, skipping unstructured"""
+
+    async def apartition(self, document: io.BytesIO, **kwargs) -> List[Element]:
+        return make_elements(json.loads(document.getvalue()))
+
+
+class LoadModels:
+    """The fault-injecting stub backends of a run"""
+
+    def __init__(
+            self,
+            llm_latency: Optional[LatencyDistribution] = None,
+            llm_error_rate: float = 0.0,
+            embedding_latency: Optional[LatencyDistribution] = None,
+            embedding_error_rate: float = 0.0,
+            seed: int = 0
+    ):
+        self.llm_faults: FaultInjector = FaultInjector(llm_latency, llm_error_rate, seed)
+        self.embedding_faults: FaultInjector = FaultInjector(embedding_latency, embedding_error_rate, seed + 1)
+        self.llm: StubMultiModalLLM = StubMultiModalLLM(self.llm_faults)
+        self.embedding: StubEmbedding = StubEmbedding(self.embedding_faults, embed_batch_size=64)
+
+
+def build_parser(
+        models: LoadModels,
+        scheduler: LLMScheduler,
+        document_format: str = "elements",
+        vectorized_breakpoints: bool = False
+) -> SemanticDocumentParser:
+    """
+    The parser under load, on the stub backends
+
+    :param models: The stub backends
+    :param scheduler: The LLM scheduler
+    :param document_format: 'elements' (partitioning skipped) or a DOCUMENT_GENERATORS format
+    :param vectorized_breakpoints: Use the node parser's NumPy breakpoints
+    :return: The parser
+
+    """
+
+    parser_class = LoadParser if document_format == "elements" else SemanticDocumentParser
+
+    return parser_class.construct(
+        llm_model=models.llm,
+        node_parser=stub_node_parser(models.embedding, vectorized_breakpoints),
+        llm_scheduler=scheduler
+    )
+
+
+def document_factory(document_format: str, spec: DocumentSpec) -> Callable[[int], Tuple[bytes, str]]:
+    """
+    Make the n-th document of a run. Each gets its own seed, so none are identical.
+
+    :param document_format: 'elements' or a DOCUMENT_GENERATORS format
+    :param spec: The document spec
+    :return: A function returning the document bytes & filename for an index
+
+    """
+
+    def make_document(index: int) -> Tuple[bytes, str]:
+        document_spec: DocumentSpec = DocumentSpec(**{**spec, 'seed': spec['seed'] + index})
+
+        if document_format == "elements":
+            return json.dumps(document_spec).encode(), f"load-{index}.elements"
+
+        return DOCUMENT_GENERATORS[document_format](document_spec), f"load-{index}.{document_format}"
+
+    return make_document
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """
+    The q-th percentile of the values, interpolated between the closest ranks
+
+    :param values: The values
+    :param q: The percentile, 0 to 100
+    :return: The percentile, or None without values
+
+    """
+
+    if not values:
+        return None
+
+    ordered: List[float] = sorted(values)
+    rank: float = q / 100 * (len(ordered) - 1)
+    low, high = math.floor(rank), math.ceil(rank)
+
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def _percentiles(values: List[float], digits: int = 4) -> Percentiles:
+    def rounded(value: Optional[float]) -> Optional[float]:
+        return None if value is None else round(value, digits)
+
+    return Percentiles(
+        p50=rounded(percentile(values, 50)),
+        p95=rounded(percentile(values, 95)),
+        p99=rounded(percentile(values, 99)),
+        max=rounded(max(values, default=None))
+    )
+
+
+def current_rss() -> Optional[int]:
+    """The resident set size of this process in bytes, where /proc is available"""
+
+    try:
+        with open("/proc/self/statm", "rb") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def max_rss() -> int:
+    """The peak resident set size of this process so far, in bytes"""
+
+    max_rss_value: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss_value if sys.platform == "darwin" else max_rss_value * 1024
+
+
+async def _sample_loop_lag(interval: float, lags_ms: List[float]) -> None:
+    loop = asyncio.get_running_loop()
+
+    while True:
+        started: float = loop.time()
+        await asyncio.sleep(interval)
+        lags_ms.append(max(0.0, (loop.time() - started - interval) * 1000))
+
+
+async def run_load(
+        parser: SemanticDocumentParser,
+        make_document: Callable[[int], Tuple[bytes, str]],
+        models: LoadModels,
+        concurrency: int = 50,
+        documents: Optional[int] = None,
+        duration: Optional[float] = None,
+        report_interval: float = 10.0,
+        lag_interval: float = 0.05,
+        on_snapshot: Callable[[LoadSnapshot], None] = lambda snapshot: None
+) -> LoadReport:
+    """
+    Keep `concurrency` documents in flight until `documents` have been started or `duration` seconds have passed
+
+    :param parser: The parser under load
+    :param make_document: Returns the bytes & filename of the n-th document
+    :param models: The stub backends the parser uses
+    :param concurrency: The documents in flight at once
+    :param documents: Stop after this many documents
+    :param duration: Stop starting documents after this many seconds (the ones in flight are finished)
+    :param report_interval: Seconds between timeline snapshots
+    :param lag_interval: Seconds between event-loop lag samples
+    :param on_snapshot: Called with each timeline snapshot as it is taken
+    :return: The report
+
+    """
+
+    if documents is None and duration is None:
+        raise ValueError("Set a number of documents, a duration, or both")
+
+    started: float = time.perf_counter()
+    next_index: int = 0
+
+    # (finish time, latency) of each successful document, & the finish times of the failed ones
+    finished: List[Tuple[float, float]] = []
+    failed: List[float] = []
+    errors: Dict[str, int] = {}
+    lags_ms: List[float] = []
+    timeline: List[LoadSnapshot] = []
+    rss_start: Optional[int] = current_rss()
+    rss_samples: List[int] = [rss_start] if rss_start is not None else []
+
+    def take_index() -> Optional[int]:
+        nonlocal next_index
+
+        if documents is not None and next_index >= documents:
+            return None
+
+        if duration is not None and time.perf_counter() - started >= duration:
+            return None
+
+        next_index += 1
+        return next_index - 1
+
+    async def worker() -> None:
+        while (index := take_index()) is not None:
+            document, document_filename = make_document(index)
+            document_started: float = time.perf_counter()
+
+            try:
+                await parser.aparse(io.BytesIO(document), document_filename)
+            except Exception as ex:
+                failed.append(time.perf_counter())
+                errors[type(ex).__name__] = errors.get(type(ex).__name__, 0) + 1
+                logging.debug(f"Failed to parse {document_filename}: {ex!r}")
+                continue
+
+            finished_at: float = time.perf_counter()
+            finished.append((finished_at, finished_at - document_started))
+
+    def snapshot(window_start: float, window_end: float, lag_offset: int) -> LoadSnapshot:
+        latencies: List[float] = [latency for at, latency in finished if window_start <= at < window_end]
+        rss: Optional[int] = current_rss()
+
+        if rss is not None:
+            rss_samples.append(rss)
+
+        return LoadSnapshot(
+            elapsed_seconds=round(window_end - started, 3),
+            completed=len(latencies),
+            failed=sum(1 for at in failed if window_start <= at < window_end),
+            throughput_per_second=round(len(latencies) / (window_end - window_start), 3) if window_end > window_start else 0.0,
+            latency_seconds=_percentiles(latencies),
+            event_loop_lag_ms=_percentiles(lags_ms[lag_offset:], digits=2),
+            rss_bytes=rss
+        )
+
+    async def report_periodically() -> None:
+        window_start, lag_offset = started, 0
+
+        while True:
+            await asyncio.sleep(report_interval)
+            window_end: float = time.perf_counter()
+            timeline.append(snapshot(window_start, window_end, lag_offset))
+            on_snapshot(timeline[-1])
+            window_start, lag_offset = window_end, len(lags_ms)
+
+    monitors: List[asyncio.Task] = [
+        asyncio.create_task(_sample_loop_lag(lag_interval, lags_ms)),
+        asyncio.create_task(report_periodically())
+    ]
+
+    try:
+        await asyncio.gather(*[worker() for _ in range(max(1, concurrency))])
+    finally:
+        for monitor in monitors:
+            monitor.cancel()
+
+        await asyncio.gather(*monitors, return_exceptions=True)
+
+    elapsed: float = time.perf_counter() - started
+    rss_end: Optional[int] = current_rss()
+
+    if rss_end is not None:
+        rss_samples.append(rss_end)
+
+    return LoadReport(
+        concurrency=concurrency,
+        duration_seconds=round(elapsed, 3),
+        completed=len(finished),
+        failed=len(failed),
+        errors=errors,
+        throughput_per_second=round(len(finished) / elapsed, 3) if elapsed else 0.0,
+        latency_seconds=_percentiles([latency for _, latency in finished]),
+        event_loop_lag_ms=_percentiles(lags_ms, digits=2),
+        rss_start_bytes=rss_start,
+        rss_end_bytes=rss_end,
+        rss_peak_sampled_bytes=max(rss_samples, default=None),
+        max_rss_bytes=max_rss(),
+        llm=BackendReport(requests=models.llm_faults.requests, injected_errors=models.llm_faults.errors),
+        embedding=BackendReport(requests=models.embedding_faults.requests, injected_errors=models.embedding_faults.errors),
+        llm_scheduler=parser.llm_scheduler.stats,
+        timeline=timeline
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=50, help="Documents in flight at once")
+    parser.add_argument("--documents", type=int, help="Documents to parse (default 200 without --duration)")
+    parser.add_argument("--duration", type=float, help="Soak for this many seconds")
+    parser.add_argument("--report-interval", type=float, default=10.0)
+    parser.add_argument("--lag-interval", type=float, default=0.05, help="Seconds between event-loop lag samples")
+    parser.add_argument("--llm-latency", type=LatencyDistribution.parse, default=LatencyDistribution.parse("lognormal:0.8,0.5"))
+    parser.add_argument("--llm-error-rate", type=float, default=0.02)
+    parser.add_argument("--embedding-latency", type=LatencyDistribution.parse, default=LatencyDistribution.parse("uniform:0.05,0.2"))
+    parser.add_argument("--embedding-error-rate", type=float, default=0.0)
+    parser.add_argument("--max-in-flight-llm", type=int)
+    parser.add_argument("--requests-per-minute", type=float)
+    parser.add_argument("--max-retries", type=int, default=3)
+    parser.add_argument("--base-backoff", type=float, default=1.0)
+    parser.add_argument("--format", choices=FORMATS, default="elements")
+    parser.add_argument("--vectorized-breakpoints", action="store_true", help="Use the node parser's NumPy breakpoints")
+    parser.add_argument("--log-level", default="ERROR")
+    parser.add_argument("--output", help="Write the JSON here instead of stdout")
+
+    for field in DocumentSpec.__annotations__:
+        parser.add_argument(f"--{field.replace('_', '-')}", type=int, dest=field)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper())
+
+    spec: DocumentSpec = default_spec(**{
+        field: getattr(args, field) for field in DocumentSpec.__annotations__ if getattr(args, field) is not None
+    })
+
+    models: LoadModels = LoadModels(
+        llm_latency=args.llm_latency,
+        llm_error_rate=args.llm_error_rate,
+        embedding_latency=args.embedding_latency,
+        embedding_error_rate=args.embedding_error_rate,
+        seed=spec['seed']
+    )
+
+    scheduler: LLMScheduler = LLMScheduler(
+        max_in_flight=args.max_in_flight_llm,
+        requests_per_minute=args.requests_per_minute,
+        max_retries=args.max_retries,
+        base_backoff=args.base_backoff
+    )
+
+    load_report: LoadReport = asyncio.run(run_load(
+        build_parser(models, scheduler, args.format, args.vectorized_breakpoints),
+        document_factory(args.format, spec),
+        models,
+        concurrency=args.concurrency,
+        documents=args.documents if args.documents is not None or args.duration is not None else 200,
+        duration=args.duration,
+        report_interval=args.report_interval,
+        lag_interval=args.lag_interval,
+        on_snapshot=lambda snapshot: print(json.dumps(snapshot), file=sys.stderr, flush=True)
+    ))
+
+    report: dict = {
+        "spec": spec,
+        "format": args.format,
+        "vectorized_breakpoints": args.vectorized_breakpoints,
+        "llm_latency": str(args.llm_latency),
+        "llm_error_rate": args.llm_error_rate,
+        "embedding_latency": str(args.embedding_latency),
+        "embedding_error_rate": args.embedding_error_rate,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "result": load_report
+    }
+
+    output: str = json.dumps(report, indent=2)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Benchmark of the metadata_parser hyperlink substitution on link-dense elements (reading lists with a link per entry),
+against the previous per-link slicing & str.replace implementation (kept here for comparison only).
+
+Usage:
+    python -m benchmarks.metadata_links [--links 50 200 1000] [--repeat 5]
+"""
+
+import argparse
+import copy
+import time
+from typing import List, Callable
+
+from unstructured.documents.elements import Element, NarrativeText, ElementMetadata
+
+from SemanticDocumentParser.element_parsers.metadata_parser import _parse_element_urls, _manual_link_detection
+
+
+def reading_list_element(links: int, with_spans: bool) -> Element:
+    """
+    A reading list: one linked title per entry, separated by plain text
+
+    :param links: The number of links
+    :param with_spans: Store the links as unstructured's 'links' spans, otherwise as link_texts/link_urls
+    :return: The element
+
+    """
+
+    text_parts: List[str] = []
+    spans: List[dict] = []
+    offset: int = 0
+
+    for idx in range(links):
+        prefix: str = f"Week {idx}: read "
+        link_text: str = f"Chapter {idx} of the course reader"
+
+        spans.append({'text': link_text, 'url': f"https://eclass.yorku.ca/mod/resource/view.php?id={idx}", 'start_index': offset + len(prefix)})
+        text_parts.append(prefix + link_text + " before the lecture. ")
+        offset += len(text_parts[-1])
+
+    metadata = ElementMetadata(links=spans) if with_spans else ElementMetadata(
+        link_texts=[span['text'] for span in spans],
+        link_urls=[span['url'] for span in spans]
+    )
+
+    return NarrativeText(text="".join(text_parts), metadata=metadata)
+
+
+def legacy_parse_element_urls(element: Element) -> None:
+    """The previous implementation: slice & concatenate the whole text once per link"""
+
+    change_delta: int = 0
+
+    for link in element.metadata.links:
+        start_index: int = link['start_index'] + change_delta
+        link_text: str = link['text']
+        end_index: int = start_index + len(link_text)
+
+        markdown_link = f"[{link_text}]({link['url']})"
+        change_delta += len(markdown_link) - len(link_text)
+        element.text = element.text[:start_index] + markdown_link + element.text[end_index:]
+
+
+def legacy_manual_link_detection(element: Element) -> None:
+    """The previous implementation: one str.replace over the whole text per link"""
+
+    text = element.text
+
+    for i, link_text in enumerate(element.metadata.link_texts):
+        if i < len(element.metadata.link_urls):
+            text = text.replace(link_text, f"[{link_text}]({element.metadata.link_urls[i]})")
+
+    element.text = text
+
+
+def best_time(fn: Callable[[Element], None], element: Element, repeat: int) -> float:
+    timings: List[float] = []
+
+    for _ in range(repeat):
+        # Both implementations modify the element in place
+        fresh_element: Element = copy.deepcopy(element)
+        start: float = time.perf_counter()
+        fn(fresh_element)
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+def parsed_text(fn: Callable[[Element], None], element: Element) -> str:
+    fresh_element: Element = copy.deepcopy(element)
+    fn(fresh_element)
+    return fresh_element.text
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--links", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    cases = [
+        ("links", True, legacy_parse_element_urls, _parse_element_urls),
+        ("link_texts", False, legacy_manual_link_detection, _manual_link_detection),
+    ]
+
+    print(f"{'metadata':>10} {'links':>6} {'legacy (s)':>12} {'current (s)':>12} {'speedup':>8}")
+
+    for name, with_spans, legacy_fn, current_fn in cases:
+        for links in args.links:
+            element: Element = reading_list_element(links, with_spans)
+
+            # Both implementations must agree before their timings mean anything
+            assert parsed_text(legacy_fn, element) == parsed_text(current_fn, element)
+
+            legacy: float = best_time(legacy_fn, element, args.repeat)
+            current: float = best_time(current_fn, element, args.repeat)
+            print(f"{name:>10} {links:>6} {legacy:>12.5f} {current:>12.5f} {legacy / current:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Per-stage micro-benchmarks. Each element parser is run on its own, on the output the stages before it produce for a
+synthetic document, with the stub LLM & embedding model. Results are written as JSON: per format & stage, the best
+wall time, CPU time, throughput (elements in per second), model requests & tracemalloc allocation peak.
+
+Documents are partitioned (untimed, with unstructured) first; the 'elements' format builds the elements directly, so
+the stages can be benchmarked without the partitioner or its NLTK data.
+
+Usage:
+    python -m benchmarks.stages [--formats elements docx pptx html pdf] [--sections 10] [--tables 4] [--lists 4]
+                                [--links 20] [--images 4] [--repeat 5] [--vectorized-breakpoints]
+                                [--output results.json]
+"""
+
+import argparse
+import asyncio
+import copy
+import inspect
+import io
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from typing import List, TypedDict, Callable, Any, Optional, Tuple
+
+from unstructured.documents.elements import Element
+
+from SemanticDocumentParser.chunk import Chunk
+from SemanticDocumentParser.element_parsers.al_tables import al_table_parser
+from SemanticDocumentParser.element_parsers.image_captioner import image_captioner
+from SemanticDocumentParser.element_parsers.list_parser import list_parser
+from SemanticDocumentParser.element_parsers.metadata_parser import metadata_parser
+from SemanticDocumentParser.element_parsers.semantic_splitter import semantic_splitter
+from SemanticDocumentParser.element_parsers.semantic_tables import semantic_tables
+from SemanticDocumentParser.element_parsers.window_parser import window_parser
+from SemanticDocumentParser.llm_scheduler import LLMScheduler
+from SemanticDocumentParser.llama_extensions.node_parser import AsyncSemanticSplitterNodeParser
+from SemanticDocumentParser.tracing import Tracer, StageTrace
+from benchmarks.documents import DocumentSpec, default_spec, make_elements, DOCUMENT_GENERATORS
+from benchmarks.stubs import StubMultiModalLLM, stub_node_parser
+
+FORMATS: Tuple[str, ...] = ("elements",) + tuple(DOCUMENT_GENERATORS)
+
+
+class StageResult(TypedDict):
+    """The benchmark of one stage on one document"""
+
+    format: str
+    stage: str
+    elements_in: int
+    elements_out: int
+    best_seconds: float
+    mean_seconds: float
+    cpu_seconds: float
+    elements_per_second: float
+    llm_calls: int
+    embedding_calls: int
+    peak_allocated_bytes: Optional[int]
+
+
+class StageModels:
+    """The stub models shared by the stages"""
+
+    def __init__(self, vectorized_breakpoints: bool = False):
+        self.llm: StubMultiModalLLM = StubMultiModalLLM()
+        self.scheduler: LLMScheduler = LLMScheduler()
+        self.node_parser: AsyncSemanticSplitterNodeParser = stub_node_parser(
+            vectorized_breakpoints=vectorized_breakpoints
+        )
+
+
+def _metadata_stage(elements: List[Element], models: StageModels) -> List[Element]:
+    metadata_parser(elements)
+    return elements
+
+
+def _image_stage(chunks: List[Chunk], models: StageModels):
+    return image_captioner(chunks, models.llm, models.scheduler)
+
+
+# The stages in parser order, each taking the previous one's output
+STAGES: List[Tuple[str, Callable[[List[Any], StageModels], Any]]] = [
+    ('metadata_parser', _metadata_stage),
+    ('al_table_parser', lambda elements, models: al_table_parser(elements)),
+    ('list_parser', lambda elements, models: list_parser(elements)),
+    ('semantic_splitter', lambda elements, models: semantic_splitter(elements, models.node_parser)),
+    ('semantic_tables', lambda elements, models: semantic_tables(elements, models.llm, models.scheduler)),
+    ('image_captioner', _image_stage),
+    ('window_parser', lambda chunks, models: window_parser(chunks)),
+]
+
+
+def partition_document(document_format: str, spec: DocumentSpec) -> List[Element]:
+    """
+    Generate the synthetic document & partition it
+
+    :param document_format: 'elements' or a DOCUMENT_GENERATORS format
+    :param spec: The document spec
+    :return: The partitioned elements
+
+    """
+
+    if document_format == "elements":
+        return make_elements(spec)
+
+    from SemanticDocumentParser.parser import SemanticDocumentParser
+
+    document = io.BytesIO(DOCUMENT_GENERATORS[document_format](spec))
+    partition = SemanticDocumentParser.partition(
+        file=document,
+        metadata_filename=f"benchmark.{document_format}",
+        languages=["en"],
+        xml_keep_tags=True
+    )
+
+    return partition()
+
+
+def _run_stage(tracer: Tracer, name: str, fn: Callable, stage_input: List[Any], models: StageModels) -> Tuple[Any, StageTrace]:
+    # Stages modify their input in place, so each run gets its own copy (made outside the timing)
+    stage_input = copy.deepcopy(stage_input)
+
+    async def run() -> Any:
+        with tracer.stage(name, len(stage_input)) as span:
+            output = fn(stage_input, models)
+
+            if inspect.isawaitable(output):
+                output = await output
+
+            span.elements_out = len(output)
+
+        return output
+
+    stage_output = asyncio.run(run())
+    return stage_output, tracer.traces[-1]
+
+
+def benchmark_stages(
+        document_format: str,
+        spec: DocumentSpec,
+        repeat: int,
+        measure_memory: bool = True,
+        vectorized_breakpoints: bool = False
+) -> List[StageResult]:
+    """
+    Benchmark every stage on a synthetic document
+
+    :param document_format: 'elements' or a DOCUMENT_GENERATORS format
+    :param spec: The document spec
+    :param repeat: The timed runs per stage
+    :param measure_memory: Add an (untimed) run per stage under tracemalloc
+    :param vectorized_breakpoints: Run the semantic splitter with the node parser's NumPy breakpoints
+    :return: The result of each stage
+
+    """
+
+    models: StageModels = StageModels(vectorized_breakpoints)
+    stage_input: List[Any] = partition_document(document_format, spec)
+    results: List[StageResult] = []
+
+    for name, fn in STAGES:
+        # The late stages work on Chunks, as in the parser
+        if name == 'image_captioner':
+            stage_input = [Chunk.from_element(element) for element in stage_input]
+
+        tracer: Tracer = Tracer(f"benchmark.{document_format}")
+        traces: List[StageTrace] = []
+        stage_output: Any = None
+
+        for _ in range(max(1, repeat)):
+            stage_output, trace = _run_stage(tracer, name, fn, stage_input, models)
+            traces.append(trace)
+
+        peak_allocated_bytes: Optional[int] = None
+
+        if measure_memory:
+            was_tracing: bool = tracemalloc.is_tracing()
+            memory_tracer: Tracer = Tracer(tracer.document_filename, trace_memory=True)
+            peak_allocated_bytes = _run_stage(memory_tracer, name, fn, stage_input, models)[1]['memory_peak_bytes']
+
+            if not was_tracing:
+                tracemalloc.stop()
+
+        best: StageTrace = min(traces, key=lambda trace: trace['duration_ms'])
+        best_seconds: float = best['duration_ms'] / 1000
+
+        results.append(StageResult(
+            format=document_format,
+            stage=name,
+            elements_in=len(stage_input),
+            elements_out=len(stage_output),
+            best_seconds=round(best_seconds, 6),
+            mean_seconds=round(sum(trace['duration_ms'] for trace in traces) / len(traces) / 1000, 6),
+            cpu_seconds=round(best['cpu_time_ms'] / 1000, 6),
+            elements_per_second=round(len(stage_input) / best_seconds, 1) if best_seconds else 0.0,
+            llm_calls=best['llm_calls'],
+            embedding_calls=best['embedding_calls'],
+            peak_allocated_bytes=peak_allocated_bytes
+        ))
+
+        stage_input = stage_output
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=["elements"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc run of each stage")
+    parser.add_argument("--vectorized-breakpoints", action="store_true", help="Use the node parser's NumPy breakpoints")
+    parser.add_argument("--output", help="Write the JSON here instead of stdout")
+
+    for field in DocumentSpec.__annotations__:
+        parser.add_argument(f"--{field.replace('_', '-')}", type=int, dest=field)
+
+    args = parser.parse_args()
+    spec: DocumentSpec = default_spec(**{
+        field: getattr(args, field) for field in DocumentSpec.__annotations__ if getattr(args, field) is not None
+    })
+
+    report: dict = {
+        "spec": spec,
+        "repeat": args.repeat,
+        "vectorized_breakpoints": args.vectorized_breakpoints,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "results": [
+            result
+            for document_format in args.formats
+            for result in benchmark_stages(
+                document_format,
+                spec,
+                args.repeat,
+                measure_memory=not args.no_memory,
+                vectorized_breakpoints=args.vectorized_breakpoints
+            )
+        ]
+    }
+
+    output: str = json.dumps(report, indent=2)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Deterministic in-process stand-ins for the LLM & embedding model, so the benchmarks measure the parser rather than the
+network. Replies are shaped like the real ones (JSON units for tables, a caption for images).
+
+For load tests, a FaultInjector makes either stub answer slowly (per a LatencyDistribution) & fail with rate-limit
+errors at a given rate.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+from typing import List, Sequence, Optional, Tuple
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.base.llms.types import ChatResponse, ChatMessage, CompletionResponse, LLMMetadata
+
+from SemanticDocumentParser.element_parsers.semantic_tables import SemanticUnitsTemplate, SemanticTableTemplate
+from SemanticDocumentParser.llama_extensions.node_parser import AsyncSemanticSplitterNodeParser
+
+_ROW_PATTERN = re.compile(r"<tr", re.IGNORECASE)
+
+
+class RateLimitError(Exception):
+    """The HTTP 429 of the fake backends, retried by the LLMScheduler like openai.RateLimitError"""
+
+    status_code: int = 429
+
+
+class LatencyDistribution:
+    """
+    The response delay of a fake backend, in seconds. Specs are 'kind:param,...':
+
+        constant:<seconds>          Always the same delay
+        uniform:<low>,<high>        Evenly spread between the bounds
+        lognormal:<median>,<sigma>  Long-tailed, like real model APIs
+        exponential:<mean>          Memoryless
+
+    """
+
+    KINDS: dict = {"constant": 1, "uniform": 2, "lognormal": 2, "exponential": 1}
+
+    def __init__(self, kind: str = "constant", params: Tuple[float, ...] = (0.0,)):
+        if self.KINDS.get(kind) != len(params):
+            raise ValueError(f"Latency '{kind}' takes {self.KINDS.get(kind)} parameter(s), got {len(params)}")
+
+        if any(param < 0 for param in params):
+            raise ValueError("Latency parameters must not be negative")
+
+        self.kind: str = kind
+        self.params: Tuple[float, ...] = tuple(params)
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyDistribution":
+        """
+        Parse a latency spec
+
+        :param spec: e.g. 'lognormal:0.8,0.5'
+        :return: The distribution
+
+        """
+
+        kind, _, params = spec.partition(":")
+
+        if kind not in cls.KINDS:
+            raise ValueError(f"Unknown latency distribution '{kind}' (one of {', '.join(cls.KINDS)})")
+
+        return cls(kind, tuple(float(param) for param in params.split(",") if param.strip()))
+
+    def sample(self, rng: random.Random) -> float:
+        """
+        Draw a delay
+
+        :param rng: The random source
+        :return: The delay in seconds
+
+        """
+
+        if self.kind == "uniform":
+            return rng.uniform(*self.params)
+
+        if self.kind == "lognormal":
+            median, sigma = self.params
+            return rng.lognormvariate(math.log(median), sigma) if median else 0.0
+
+        if self.kind == "exponential":
+            return rng.expovariate(1 / self.params[0]) if self.params[0] else 0.0
+
+        return self.params[0]
+
+    def __str__(self) -> str:
+        return f"{self.kind}:{','.join(f'{param:g}' for param in self.params)}"
+
+
+class FaultInjector:
+    """Delays each request of a fake backend & fails some of them with a RateLimitError"""
+
+    def __init__(self, latency: Optional[LatencyDistribution] = None, error_rate: float = 0.0, seed: int = 0):
+        if not 0 <= error_rate <= 1:
+            raise ValueError("The error rate must be between 0 and 1")
+
+        self.latency: LatencyDistribution = latency or LatencyDistribution()
+        self.error_rate: float = error_rate
+        self.requests: int = 0
+        self.errors: int = 0
+        self._rng: random.Random = random.Random(seed)
+
+    async def __call__(self) -> None:
+        """Wait out the request's latency, then raise if it is one of the failed ones"""
+
+        self.requests += 1
+        delay: float = self.latency.sample(self._rng)
+        failed: bool = self._rng.random() < self.error_rate
+
+        await asyncio.sleep(delay)
+
+        if failed:
+            self.errors += 1
+            raise RateLimitError("Rate limit reached (injected)")
+
+
+class StubMultiModalLLM:
+    """Answers table & caption requests with replies derived from the request, instantly unless given faults"""
+
+    metadata = LLMMetadata(model_name="stub-gpt-4o")
+
+    def __init__(self, faults: Optional[FaultInjector] = None):
+        self.requests: int = 0
+        self.faults: Optional[FaultInjector] = faults
+
+    def reply(self, messages: Sequence[ChatMessage]) -> str:
+        """
+        The reply to a table request, in the format its template asks for
+
+        :param messages: The template & the table
+        :return: The reply
+
+        """
+
+        template, table = str(messages[0].content), str(messages[-1].content)
+        units: List[str] = [f"Row {row} of the table." for row in range(1, len(_ROW_PATTERN.findall(table)))]
+        summary: str = f"The table has {len(units)} rows."
+
+        if template == SemanticUnitsTemplate.content:
+            return json.dumps(units)
+
+        if template == SemanticTableTemplate.content:
+            return json.dumps({"summary": summary, "units": units})
+
+        return summary
+
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs) -> ChatResponse:
+        self.requests += 1
+
+        if self.faults is not None:
+            await self.faults()
+
+        return ChatResponse(message=ChatMessage(role="assistant", content=self.reply(messages)))
+
+    async def acomplete(self, prompt: str, image_documents=None, **kwargs) -> CompletionResponse:
+        self.requests += 1
+
+        if self.faults is not None:
+            await self.faults()
+
+        image_hash: str = hashlib.sha256(str(image_documents[0].image if image_documents else "").encode()).hexdigest()
+        return CompletionResponse(text=f"A figure from the course outline ({image_hash[:12]}).")
+
+
+class StubEmbedding(BaseEmbedding):
+    """Embeds text as a vector derived from its hash, instantly unless given faults (applied per batch)"""
+
+    model_name: str = "stub-embedding"
+    _faults: Optional[FaultInjector] = PrivateAttr(default=None)
+
+    def __init__(self, faults: Optional[FaultInjector] = None, **kwargs):
+        super().__init__(**kwargs)
+        self._faults = faults
+
+    @property
+    def faults(self) -> Optional[FaultInjector]:
+        return self._faults
+
+    @classmethod
+    def _embed(cls, text: str) -> List[float]:
+        return [byte / 255 - 0.5 for byte in hashlib.sha256(text.encode()).digest()]
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embed(query)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._embed(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed(text)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        if self._faults is not None:
+            await self._faults()
+
+        return [self._embed(text) for text in texts]
+
+
+def _split_sentences(text: str) -> List[str]:
+    return [sentence + " " for sentence in re.split(r"(?<=[.!?])\s+", text) if sentence]
+
+
+def stub_node_parser(
+        embed_model: Optional[BaseEmbedding] = None,
+        vectorized_breakpoints: bool = False
+) -> AsyncSemanticSplitterNodeParser:
+    """
+    The semantic splitter's node parser on the stub embedding. Sentences are split on punctuation rather than with
+    NLTK, so no tokenizer data is needed.
+
+    :param embed_model: The embedding model, the StubEmbedding by default
+    :param vectorized_breakpoints: Compute the breakpoints with NumPy (off by default, as in the library)
+    :return: The node parser
+
+    """
+
+    node_parser = AsyncSemanticSplitterNodeParser.from_defaults(
+        embed_model=embed_model or StubEmbedding(embed_batch_size=64),
+        breakpoint_percentile_threshold=90,
+        sentence_splitter=_split_sentences
+    )
+
+    node_parser.vectorized_breakpoints = vectorized_breakpoints
+    return node_parser
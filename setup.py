@@ -17,7 +17,7 @@ if __name__ == '__main__':
 
     setuptools.setup(
         name=manifest["name"],
-        packages=setuptools.find_packages(),
+        packages=setuptools.find_packages(exclude=["benchmarks", "benchmarks.*"]),
         version=manifest["version"],
         license=manifest["license"],
         author=manifest["author"],
@@ -29,14 +29,16 @@ if __name__ == '__main__':
             "llama-index-llms-azure-openai==0.2.2",
             "llama-index-multi-modal-llms-azure-openai==0.2.0",
             "llama-index-embeddings-azure-openai==0.2.5",
-            "bs4",
-            "pandas",
             "unstructured[all-docs]==0.17.2",
             "unstructured_expanded==0.17.2",
             "numpy==1.26.4",
             "httpx",
-            "puremagic==1.30"
+            "puremagic==1.30",
+            "Pillow>=9.1"
         ],
+        extras_require={
+            "otel": ["opentelemetry-api"]
+        },
         classifiers=[
             "Development Status :: 4 - Beta",
             "Intended Audience :: Developers",
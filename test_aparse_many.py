@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Tests for batch ingestion (aparse_many) & the per-stage document caps, with a scripted parser in place of the stages.
+
+Usage:
+    python -m pytest test_aparse_many.py
+"""
+
+import asyncio
+import contextlib
+import io
+from typing import ClassVar, Dict, List, Optional
+
+from SemanticDocumentParser.concurrency import StageLimiter
+from SemanticDocumentParser.parser import SemanticDocumentParser, _empty_stats
+from testing_fakes import FakeMultiModalLLM, make_node_parser, StubPartitionParser
+
+
+class ScriptedParser(SemanticDocumentParser):
+    """Spends the number of seconds given as the document in 'Paragraph Parsing', failing on documents named 'fail*'"""
+
+    counters: ClassVar[Dict[str, int]] = {}
+    cancelled: ClassVar[List[str]] = []
+
+    @classmethod
+    def _enter(cls, name: str) -> None:
+        cls.counters[name] = cls.counters.get(name, 0) + 1
+        cls.counters['max_' + name] = max(cls.counters.get('max_' + name, 0), cls.counters[name])
+
+    async def aparse(
+            self,
+            document: io.BytesIO,
+            document_filename: str,
+            on_step_finished=None,
+            stage_limiter: Optional[StageLimiter] = None
+    ):
+        stage_limiter = stage_limiter or StageLimiter()
+        self._enter('documents')
+
+        try:
+            async with stage_limiter.stage('Paragraph Parsing'):
+                self._enter('paragraph')
+                await asyncio.sleep(float(document.getvalue()))
+                self.counters['paragraph'] -= 1
+
+            if document_filename.startswith("fail"):
+                raise ValueError(f"Could not parse {document_filename}")
+
+            return [{'text': document_filename}], _empty_stats()
+        except asyncio.CancelledError:
+            self.cancelled.append(document_filename)
+            raise
+        finally:
+            self.counters['documents'] -= 1
+
+
+def _parser() -> ScriptedParser:
+    ScriptedParser.counters.clear()
+    ScriptedParser.cancelled.clear()
+    return ScriptedParser.construct(llm_model=FakeMultiModalLLM(), node_parser=make_node_parser())
+
+
+def _documents(*delays: float, prefix: str = "doc"):
+    return [(io.BytesIO(str(delay).encode()), f"{prefix}-{idx}") for idx, delay in enumerate(delays)]
+
+
+async def _collect(results) -> list:
+    return [result async for result in results]
+
+
+def test_caps_the_documents_in_flight():
+    parser = _parser()
+    results = asyncio.run(_collect(parser.aparse_many(_documents(*[0.01] * 10), max_documents_in_flight=3)))
+
+    assert len(results) == 10
+    assert ScriptedParser.counters['max_documents'] == 3
+
+
+def test_caps_the_documents_in_a_stage():
+    parser = _parser()
+    asyncio.run(_collect(parser.aparse_many(
+        _documents(*[0.01] * 6), max_documents_in_flight=4, stage_limits={'Paragraph Parsing': 2}
+    )))
+
+    assert ScriptedParser.counters['max_documents'] == 4
+    assert ScriptedParser.counters['max_paragraph'] == 2
+
+
+def test_yields_in_completion_order():
+    results = asyncio.run(_collect(_parser().aparse_many(_documents(0.06, 0.01, 0.03), max_documents_in_flight=3)))
+
+    assert [result['document_filename'] for result in results] == ["doc-1", "doc-2", "doc-0"]
+
+
+def test_a_failing_document_does_not_stop_the_batch():
+    documents = _documents(0.01, 0.01) + _documents(0.01, prefix="fail") + _documents(0.02)
+    results = asyncio.run(_collect(_parser().aparse_many(documents, max_documents_in_flight=2)))
+
+    failed = [result for result in results if result['error'] is not None]
+
+    assert [result['document_filename'] for result in failed] == ["fail-0"]
+    assert isinstance(failed[0]['error'], ValueError) and failed[0]['elements'] == []
+    assert sum(result['error'] is None for result in results) == 3
+
+
+def test_stopping_early_cancels_the_pending_documents():
+    pulled: List[str] = []
+
+    def documents():
+        for document, document_filename in _documents(0.01, 1, 1, 1, 1):
+            pulled.append(document_filename)
+            yield document, document_filename
+
+    async def take_first():
+        async with contextlib.aclosing(_parser().aparse_many(documents(), max_documents_in_flight=3)) as results:
+            async for result in results:
+                break
+
+        # Checked before asyncio.run would cancel any leftover task itself
+        await asyncio.sleep(0)
+        return result, list(ScriptedParser.cancelled)
+
+    first, cancelled = asyncio.run(take_first())
+
+    assert first['document_filename'] == "doc-0"
+
+    # Documents are pulled lazily, and the ones in flight are cancelled rather than left running
+    assert pulled == ["doc-0", "doc-1", "doc-2"]
+    assert sorted(cancelled) == ["doc-1", "doc-2"]
+
+
+def test_parses_every_document_of_the_batch():
+    parser = StubPartitionParser.construct(llm_model=FakeMultiModalLLM(), node_parser=make_node_parser())
+    documents = [(io.BytesIO(b""), f"syllabus-{idx}.docx") for idx in range(3)]
+
+    results = asyncio.run(_collect(parser.aparse_many(documents, stage_limits={'Image Captioning': 1})))
+
+    assert sorted(result['document_filename'] for result in results) == [document[1] for document in documents]
+    assert all(result['error'] is None and result['elements'] for result in results)
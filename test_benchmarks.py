@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Smoke tests for the benchmark suite: the synthetic documents open, every stage benchmark runs & the load harness
+holds up against slow, failing backends.
+
+Usage:
+    python -m pytest test_benchmarks.py
+"""
+
+import asyncio
+import io
+
+import docx
+import pptx
+import pypdf
+import pytest
+
+from SemanticDocumentParser.llm_scheduler import LLMScheduler
+from benchmarks.documents import default_spec, make_docx, make_pptx, make_pdf, make_html
+from benchmarks.load import LoadModels, build_parser, document_factory, run_load, percentile
+from benchmarks.stages import benchmark_stages, StageModels, STAGES
+from benchmarks.stubs import LatencyDistribution
+
+
+def test_synthetic_documents_hold_the_requested_content():
+    spec = default_spec(sections=4, tables=2, lists=2, links=6, images=3)
+
+    document = docx.Document(io.BytesIO(make_docx(spec)))
+    assert len(document.tables) == 2 and len(document.inline_shapes) == 3
+
+    presentation = pptx.Presentation(io.BytesIO(make_pptx(spec)))
+    assert len(presentation.slides) == 4
+
+    pdf = pypdf.PdfReader(io.BytesIO(make_pdf(spec)))
+    assert sum(len(page.get('/Annots') or []) for page in pdf.pages) == 6
+    assert "Section 1" in pdf.pages[0].extract_text()
+
+    assert make_html(spec).count(b"<a href=") == 6
+
+
+def test_every_stage_is_benchmarked_on_the_previous_output():
+    results = benchmark_stages("elements", default_spec(sections=4), repeat=1, measure_memory=False)
+
+    assert [result['stage'] for result in results] == [name for name, _ in STAGES]
+
+    for upstream, result in zip(results, results[1:]):
+        assert result['elements_in'] == upstream['elements_out']
+
+    assert next(result for result in results if result['stage'] == 'semantic_splitter')['embedding_calls'] > 0
+    assert next(result for result in results if result['stage'] == 'image_captioner')['llm_calls'] == 4
+
+
+def test_stage_benchmarks_use_the_default_breakpoints_unless_asked():
+    spec = default_spec(sections=4)
+
+    assert not StageModels().node_parser.vectorized_breakpoints
+    assert StageModels(vectorized_breakpoints=True).node_parser.vectorized_breakpoints
+
+    default_results = benchmark_stages("elements", spec, repeat=1, measure_memory=False)
+    vectorized_results = benchmark_stages("elements", spec, repeat=1, measure_memory=False, vectorized_breakpoints=True)
+
+    assert [result['elements_out'] for result in default_results] == \
+           [result['elements_out'] for result in vectorized_results]
+
+
+def test_latency_distributions_parse_and_sample():
+    assert str(LatencyDistribution.parse("lognormal:0.8,0.5")) == "lognormal:0.8,0.5"
+    assert LatencyDistribution.parse("constant:0.25").sample(None) == 0.25
+
+    with pytest.raises(ValueError):
+        LatencyDistribution.parse("uniform:0.1")
+
+    assert percentile([4.0, 1.0, 3.0, 2.0], 50) == 2.5 and percentile([], 99) is None
+
+
+def _load(models: LoadModels, **kwargs):
+    spec = default_spec(sections=3, tables=1, images=1)
+    scheduler = LLMScheduler(max_retries=10, base_backoff=0.001)
+
+    return asyncio.run(run_load(
+        build_parser(models, scheduler), document_factory("elements", spec), models, report_interval=0.05, **kwargs
+    ))
+
+
+def test_load_run_retries_rate_limited_llm_requests():
+    models = LoadModels(LatencyDistribution.parse("uniform:0.001,0.01"), llm_error_rate=0.3)
+    report = _load(models, concurrency=4, documents=8)
+
+    assert (report['completed'], report['failed']) == (8, 0)
+    assert report['llm']['injected_errors'] > 0
+    assert report['llm_scheduler']['rate_limited'] == report['llm']['injected_errors']
+    assert report['latency_seconds']['p50'] <= report['latency_seconds']['p99'] <= report['latency_seconds']['max']
+    assert report['event_loop_lag_ms']['max'] is not None and report['max_rss_bytes'] > 0
+
+
+def test_load_soak_counts_failed_documents():
+    # Embedding requests are not retried, so every document fails
+    models = LoadModels(embedding_latency=LatencyDistribution.parse("constant:0.01"), embedding_error_rate=1.0)
+    report = _load(models, concurrency=2, duration=0.2)
+
+    assert report['completed'] == 0 and report['failed'] > 0
+    assert report['errors'] == {'RateLimitError': report['failed']}
+    assert report['timeline'] and sum(snapshot['failed'] for snapshot in report['timeline']) <= report['failed']
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Tests for the on-disk caches used to skip repeated work when re-ingesting a corpus.
+
+Usage:
+    python -m pytest test_caching.py
+"""
+
+import asyncio
+import io
+import os
+import threading
+
+from llama_index.core.base.llms.types import ChatMessage
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.schema import Document
+from unstructured.documents.elements import Title, NarrativeText, ElementMetadata, assign_and_map_hash_ids
+
+from SemanticDocumentParser.caching.embedding_cache import EmbeddingCache, MmapEmbeddingStore
+from SemanticDocumentParser.caching.partition_cache import PartitionCache
+from SemanticDocumentParser.caching.result_cache import ResultCache
+from SemanticDocumentParser.caching.store import SQLiteCacheStore
+from SemanticDocumentParser.caching.table_cache import TableCache
+from SemanticDocumentParser.llama_extensions.node_parser import AsyncSemanticSplitterNodeParser
+from SemanticDocumentParser.parser import SemanticDocumentParser
+from testing_fakes import FakeMultiModalLLM, make_node_parser, StubPartitionParser
+
+
+def test_store_round_trip(tmp_path):
+    """Values come back as written, and namespaces do not collide"""
+
+    store = SQLiteCacheStore(str(tmp_path / "cache.sqlite3"))
+    store.set("a", "key", b"value-a")
+    store.set("b", "key", b"value-b")
+
+    assert store.get("a", "key") == b"value-a"
+    assert store.get("b", "key") == b"value-b"
+    assert store.get("a", "missing") is None
+
+
+def test_store_evicts_least_recently_used(tmp_path):
+    """Once over the size limit, the entries read least recently are dropped first"""
+
+    store = SQLiteCacheStore(str(tmp_path / "cache.sqlite3"), max_size_bytes=30)
+    store.set("ns", "first", b"x" * 10)
+    store.set("ns", "second", b"x" * 10)
+    store.set("ns", "third", b"x" * 10)
+
+    # Touch the oldest entry so 'second' becomes the least recently used
+    assert store.get("ns", "first") is not None
+    store.set("ns", "fourth", b"x" * 10)
+
+    assert store.get("ns", "second") is None
+    assert store.get("ns", "first") is not None
+    assert store.size_bytes <= 30
+
+
+def test_result_cache_key_depends_on_content_extension_and_config():
+    """Any change to the bytes, the extension, the config or the name must produce a new key"""
+
+    key = ResultCache.key(b"document", ".pdf", "config")
+
+    assert key == ResultCache.key(b"document", ".PDF", "config")
+    assert key != ResultCache.key(b"document 2", ".pdf", "config")
+    assert key != ResultCache.key(b"document", ".docx", "config")
+    assert key != ResultCache.key(b"document", ".pdf", "config 2")
+    assert key != ResultCache.key(b"document", ".pdf", "config", "syllabus.pdf")
+
+
+def test_config_fingerprint_covers_output_settings():
+    """Every setting that changes the output changes the fingerprint"""
+
+    def fingerprint(**settings) -> str:
+        return SemanticDocumentParser.construct(
+            llm_model=FakeMultiModalLLM(), node_parser=make_node_parser(), **settings
+        ).config_fingerprint()
+
+    default_fingerprint = fingerprint()
+
+    for setting, value in [
+        ("perceptual_image_hash", True), ("drop_duplicate_images", True), ("max_image_dimension", 512),
+        ("image_format", "JPEG"), ("image_quality", 60), ("keep_image_base64", False), ("window_size", 2),
+        ("window_references", True), ("min_length", 20), ("single_call_tables", True)
+    ]:
+        assert fingerprint(**{setting: value}) != default_fingerprint, setting
+
+    # Performance-only settings are left out
+    assert fingerprint(max_concurrent_image_captions=1) == default_fingerprint
+
+
+def test_config_fingerprint_covers_prompts(monkeypatch):
+    """Editing a prompt invalidates results cached under the old one"""
+
+    def fingerprint() -> str:
+        return SemanticDocumentParser.construct(
+            llm_model=FakeMultiModalLLM(), node_parser=make_node_parser()
+        ).config_fingerprint()
+
+    default_fingerprint = fingerprint()
+
+    monkeypatch.setattr("SemanticDocumentParser.parser.CAPTION_PROMPT", "Describe the image.")
+    assert fingerprint() != default_fingerprint
+
+    monkeypatch.undo()
+    monkeypatch.setattr(
+        "SemanticDocumentParser.parser.SemanticTableTemplate",
+        ChatMessage(role="system", content="Summarize the table.")
+    )
+    assert fingerprint() != default_fingerprint
+
+
+def test_result_cache_round_trip(tmp_path):
+    """Stored elements & stats are returned unchanged"""
+
+    cache = ResultCache.from_path(str(tmp_path / "cache.sqlite3"))
+    key = ResultCache.key(b"document", ".pdf", "config")
+    elements = [{"type": "NarrativeText", "element_id": "1", "text": "Hello", "metadata": {"window": "Hello"}}]
+    stats = {"element_parse_time": 1.0, "metadata_parse_time": None}
+
+    assert cache.get(key) is None
+    cache.set(key, elements, stats)
+    assert cache.get(key) == (elements, stats)
+
+
+class StampingPartitionParser(StubPartitionParser):
+    """Stamps the elements with the filename & directory like unstructured's metadata_filename"""
+
+    async def apartition(self, document: io.BytesIO, **kwargs):
+        file_directory, filename = os.path.split(kwargs["metadata_filename"])
+        elements = await super().apartition(document, **kwargs)
+
+        for element in elements:
+            element.metadata.filename, element.metadata.file_directory = filename, file_directory or None
+
+        return elements
+
+
+def test_aparse_serves_result_cache_hits(tmp_path):
+    """A parse of the same file is read from the cache (off the event loop) & matches a fresh parse"""
+
+    steps = []
+
+    async def on_step_finished(step, duration):
+        steps.append(step)
+
+    def parse(document_filename, result_cache=None):
+        parser = StampingPartitionParser.construct(
+            llm_model=FakeMultiModalLLM(), node_parser=make_node_parser(), result_cache=result_cache
+        )
+
+        return asyncio.run(parser.aparse(io.BytesIO(b"document"), document_filename, on_step_finished))[0]
+
+    result_cache = ResultCache.from_path(str(tmp_path / "cache.sqlite3"))
+    parse("2023/syllabus.docx", result_cache)
+    steps.clear()
+
+    cached = parse("2024/syllabus.docx", result_cache)
+
+    assert steps == ['Result Cache Hit']
+    assert [element['metadata']['file_directory'] for element in cached] == ["2024"] * len(cached)
+    assert [element['metadata'] for element in cached] == [element['metadata'] for element in parse("2024/syllabus.docx")]
+
+    # Element IDs are hashed from the name, so another name is a miss
+    steps.clear()
+    parse("2024/outline.docx", result_cache)
+
+    assert 'Result Cache Hit' not in steps
+
+
+def test_partition_cache_rebuilds_elements(tmp_path):
+    """Cached elements are rebuilt as the same Element types, stamped with the current filename"""
+
+    cache = PartitionCache.from_path(str(tmp_path / "cache.sqlite3"))
+    key = PartitionCache.key(b"document", ".docx", {"languages": ["en", "fr"], "xml_keep_tags": True})
+    elements = [
+        Title(text="Grading", metadata=ElementMetadata(filename="old.docx", category_depth=1)),
+        NarrativeText(text="Assignments are worth 40%.", metadata=ElementMetadata(filename="old.docx")),
+    ]
+
+    assert cache.get(key, "new.docx") is None
+    cache.set(key, elements)
+    rebuilt = cache.get(key, "new.docx")
+
+    assert [type(element) for element in rebuilt] == [Title, NarrativeText]
+    assert [element.text for element in rebuilt] == [element.text for element in elements]
+    assert rebuilt[0].metadata.category_depth == 1
+    assert all(element.metadata.filename == "new.docx" for element in rebuilt)
+    assert key != PartitionCache.key(b"document", ".docx", {"languages": ["en"], "xml_keep_tags": True})
+    assert [element.to_dict() for element in asyncio.run(cache.aget(key, "new.docx"))] == [element.to_dict() for element in rebuilt]
+
+
+def test_table_cache_key_keeps_links_and_images():
+    """Tables that only differ in presentation share a key; tables that differ in a link or image do not"""
+
+    table = '<table class="grid"><tr><td style="x">Lecture</td><td><a href="https://zoom.us/j/1">Zoom</a></td></tr></table>'
+    key = TableCache.key(table, "model", "prompt")
+
+    assert key == TableCache.key(table.replace('class="grid"', 'id="t1"').replace("><", ">\n<"), "model", "prompt")
+    assert key != TableCache.key(table.replace("/j/1", "/j/2"), "model", "prompt")
+
+    image_table = '<table><tr><td><img src="a.png" alt="Map"/></td></tr></table>'
+    image_key = TableCache.key(image_table, "model", "prompt")
+
+    assert image_key != TableCache.key(image_table.replace("a.png", "b.png"), "model", "prompt")
+    assert image_key != TableCache.key(image_table.replace("Map", "Floor plan"), "model", "prompt")
+
+
+def test_partition_cache_hits_match_a_fresh_partition(tmp_path):
+    """A hit under another path gets that path's filename, directory & hash IDs, as partitioning it would"""
+
+    def partitioned(document_filename):
+        file_directory, filename = os.path.split(document_filename)
+        metadata = dict(filename=filename, file_directory=file_directory or None)
+        title = Title(text="Grading", metadata=ElementMetadata(category_depth=1, **metadata))
+        text = NarrativeText(text="Assignments are worth 40%.", metadata=ElementMetadata(parent_id=title.id, **metadata))
+        return assign_and_map_hash_ids([title, text])
+
+    cache = PartitionCache.from_path(str(tmp_path / "cache.sqlite3"))
+    key = PartitionCache.key(b"document", ".docx", {})
+    cache.set(key, partitioned("2023/old.docx"))
+
+    rebuilt = cache.get(key, "2024/new.docx")
+
+    assert [element.to_dict() for element in rebuilt] == [element.to_dict() for element in partitioned("2024/new.docx")]
+    assert rebuilt[1].metadata.parent_id == rebuilt[0].id
+    assert cache.get(key, "new.docx")[0].metadata.file_directory is None
+
+
+def test_embedding_cache_memory_tier_is_lru():
+    """The memory tier keeps only the most recently used embeddings & counts hits/misses"""
+
+    cache = EmbeddingCache(max_memory_entries=2)
+    cache.set_many("model", ["a", "b"], [[1.0], [2.0]])
+    assert cache.get_many("model", ["a"]) == [[1.0]]
+
+    cache.set_many("model", ["c"], [[3.0]])
+
+    assert cache.get_many("model", ["a", "b", "c"]) == [[1.0], None, [3.0]]
+    assert cache.get_many("other-model", ["a"]) == [None]
+    assert cache.stats["hits"] == 3
+    assert cache.stats["misses"] == 2
+
+
+def test_embedding_cache_mmap_tier_is_shared(tmp_path):
+    """A second cache (e.g. in another worker) pointing at the same files sees the stored vectors"""
+
+    path = str(tmp_path / "embeddings")
+    writer = EmbeddingCache(mmap_store=MmapEmbeddingStore(path, capacity=2))
+    writer.set_many("model", ["a", "b", "c"], [[1.0, 1.0], [2.0, 2.0], [3.0, 3.0]])
+
+    reader = EmbeddingCache(mmap_store=MmapEmbeddingStore(path, capacity=2))
+
+    # Capacity is 2, so the oldest vector was overwritten
+    assert reader.get_many("model", ["a", "b", "c"]) == [None, [2.0, 2.0], [3.0, 3.0]]
+    assert reader.stats["mmap_hits"] == 2
+
+
+def test_mmap_store_ignores_reused_rows(tmp_path):
+    """A reader whose index still maps a key to a row that was since rewritten gets a miss, not another vector"""
+
+    path = str(tmp_path / "embeddings")
+    writer = MmapEmbeddingStore(path, capacity=2)
+    writer.set_many({"a": [1.0, 1.0]})
+
+    reader = MmapEmbeddingStore(path, capacity=2)
+    assert reader.get_many(["a"]) == {"a": [1.0, 1.0]}
+
+    # Row 0 is rewritten for 'c' while the index still maps 'a' to it (as before the writer commits)
+    writer._tags[0] = MmapEmbeddingStore._tag("c")
+    writer._matrix[0] = [3.0, 3.0]
+
+    assert reader.get_many(["a"]) == {}
+
+
+def test_mmap_store_skips_vectors_of_other_dimensions(tmp_path):
+    """A second model with another vector size is not stored, rather than failing the document"""
+
+    cache = EmbeddingCache(mmap_store=MmapEmbeddingStore(str(tmp_path / "embeddings"), capacity=4))
+    cache.set_many("small-model", ["a"], [[1.0, 1.0]])
+    cache.set_many("large-model", ["a"], [[1.0, 2.0, 3.0]])
+
+    reader = EmbeddingCache(mmap_store=MmapEmbeddingStore(str(tmp_path / "embeddings"), capacity=4))
+
+    assert reader.get_many("small-model", ["a"]) == [[1.0, 1.0]]
+    assert reader.get_many("large-model", ["a"]) == [None]
+    assert cache.get_many("large-model", ["a"]) == [[1.0, 2.0, 3.0]]
+
+
+def test_node_parser_only_embeds_missing_texts():
+    """Cached sentence groups are never sent to the embedding model again"""
+
+    class CountingEmbedding(MockEmbedding):
+        calls: list = []
+
+        async def _aget_text_embeddings(self, texts):
+            self.calls.append(list(texts))
+            return await super()._aget_text_embeddings(texts)
+
+    embed_model = CountingEmbedding(embed_dim=4)
+    node_parser = AsyncSemanticSplitterNodeParser.from_defaults(
+        embed_model=embed_model,
+        sentence_splitter=lambda text: [sentence + "." for sentence in text.split(".") if sentence],
+    )
+    node_parser.embedding_cache = EmbeddingCache()
+    document = Document(text="One. Two. Three. Four.")
+
+    first = asyncio.run(node_parser.abuild_semantic_nodes_from_documents([document]))
+    second = asyncio.run(node_parser.abuild_semantic_nodes_from_documents([document]))
+
+    assert [node.text for node in first] == [node.text for node in second]
+    assert len(embed_model.calls) == 1
+    assert node_parser.embedding_cache.stats["hits"] == 4
+
+
+def test_node_parser_reads_and_writes_the_mmap_store_off_the_event_loop(tmp_path):
+    """The mmap store's SQLite transaction & memmap flush never run on the event loop thread"""
+
+    store = MmapEmbeddingStore(str(tmp_path / "embeddings"), capacity=8)
+    threads = []
+    get_many, set_many = store.get_many, store.set_many
+    store.get_many = lambda keys: threads.append(threading.current_thread()) or get_many(keys)
+    store.set_many = lambda vectors: threads.append(threading.current_thread()) or set_many(vectors)
+
+    node_parser = AsyncSemanticSplitterNodeParser.from_defaults(
+        embed_model=MockEmbedding(embed_dim=4),
+        sentence_splitter=lambda text: [sentence + "." for sentence in text.split(".") if sentence],
+    )
+    node_parser.embedding_cache = EmbeddingCache(mmap_store=store)
+    asyncio.run(node_parser.abuild_semantic_nodes_from_documents([Document(text="One. Two. Three. Four.")]))
+
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
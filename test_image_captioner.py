@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Tests for image captioning, run against a local fake multimodal LLM (no network).
+
+Usage:
+    python -m pytest test_image_captioner.py
+"""
+
+import asyncio
+import base64
+import io
+import random
+import threading
+import time
+from typing import List
+
+from PIL import Image
+from llama_index.core.base.llms.types import CompletionResponse
+
+from SemanticDocumentParser.caching.caption_cache import CaptionCache
+from SemanticDocumentParser.element_parsers import image_captioner as image_captioner_module
+from SemanticDocumentParser.element_parsers.image_captioner import image_captioner, image_hash, preprocess_image
+from benchmarks.documents import _png as benchmark_png
+from testing_fakes import FakeMultiModalLLM
+
+
+def _image(element_id: str, data: bytes) -> dict:
+    return {
+        "type": "Image",
+        "element_id": element_id,
+        "text": f"alt {element_id}",
+        "metadata": {"image_base64": base64.b64encode(data).decode(), "image_mime_type": "image/png"},
+    }
+
+
+def _png(size: int, shade: int) -> bytes:
+    image = Image.new("L", (size, size))
+    image.putdata([(x * shade) % 256 for x in range(size * size)])
+    stream = io.BytesIO()
+    image.save(stream, format="PNG")
+    return stream.getvalue()
+
+
+def test_captions_concurrently_in_order_and_isolates_failures():
+    llm = FakeMultiModalLLM()
+    elements: List[dict] = [_image(str(idx), f"image {idx}".encode()) for idx in range(10)]
+    elements.insert(3, {"type": "NarrativeText", "element_id": "text", "text": "Hello", "metadata": {}})
+    elements.append(_image("broken", b"FAIL"))
+
+    captioned = asyncio.run(image_captioner(elements, llm, max_concurrent_captions=3))
+
+    assert [element["element_id"] for element in captioned] == [element["element_id"] for element in elements]
+    assert llm.max_in_flight == 3
+    assert captioned[0]["text"] == "[IMAGE 0 DESCRIPTION START]image 0[IMAGE 0 DESCRIPTION END]"
+    assert captioned[-1]["text"] == "alt broken"
+
+
+def test_duplicate_images_are_captioned_once():
+    llm = FakeMultiModalLLM()
+    elements = [_image("a", b"logo"), _image("b", b"chart"), _image("c", b"logo")]
+
+    captioned = asyncio.run(image_captioner(elements, llm))
+
+    assert llm.requests == 2
+    assert captioned[2]["text"] == "[IMAGE c DESCRIPTION START]logo[IMAGE c DESCRIPTION END]"
+
+
+def test_duplicate_images_can_be_dropped():
+    captioned = asyncio.run(image_captioner(
+        [_image("a", b"logo"), _image("b", b"chart"), _image("c", b"logo")],
+        FakeMultiModalLLM(),
+        drop_duplicate_images=True
+    ))
+
+    assert [element["element_id"] for element in captioned] == ["a", "b"]
+
+
+def test_caption_cache_is_shared_across_documents(tmp_path):
+    cache = CaptionCache.from_path(str(tmp_path / "cache.sqlite3"))
+    first_llm, second_llm = FakeMultiModalLLM(), FakeMultiModalLLM()
+
+    asyncio.run(image_captioner([_image("a", b"logo")], first_llm, caption_cache=cache))
+    captioned = asyncio.run(image_captioner([_image("z", b"logo")], second_llm, caption_cache=cache))
+
+    assert first_llm.requests == 1 and second_llm.requests == 0
+    assert captioned[0]["text"] == "[IMAGE z DESCRIPTION START]logo[IMAGE z DESCRIPTION END]"
+
+
+def test_caption_cache_is_read_and_written_off_the_event_loop(tmp_path):
+    cache = CaptionCache.from_path(str(tmp_path / "cache.sqlite3"))
+    store_threads = []
+
+    for method in ("get", "set"):
+        def recording(*args, _method=getattr(cache.store, method)):
+            store_threads.append(threading.current_thread())
+            return _method(*args)
+
+        setattr(cache.store, method, recording)
+
+    asyncio.run(image_captioner([_image("a", b"logo")], FakeMultiModalLLM(), caption_cache=cache))
+
+    assert len(store_threads) == 2
+    assert threading.main_thread() not in store_threads
+
+
+def test_perceptual_hash_matches_resized_copies():
+    """Only the perceptual hash treats a downscaled copy as the same image"""
+
+    original = _png(64, 3)
+    different = _png(64, 7)
+
+    stream = io.BytesIO()
+    Image.open(io.BytesIO(original)).resize((32, 32)).save(stream, format="PNG")
+    smaller = stream.getvalue()
+
+    assert image_hash(original) != image_hash(smaller)
+    assert image_hash(original, perceptual=True) == image_hash(smaller, perceptual=True)
+    assert image_hash(original, perceptual=True) != image_hash(different, perceptual=True)
+
+
+def test_perceptual_hash_tells_flat_images_apart():
+    def solid(colour, size=(64, 64)) -> bytes:
+        stream = io.BytesIO()
+        Image.new("RGB", size, colour).save(stream, format="PNG")
+        return stream.getvalue()
+
+    red, blue, wide_red = solid((255, 0, 0)), solid((0, 0, 255)), solid((255, 0, 0), (128, 32))
+
+    assert image_hash(red, perceptual=True) == image_hash(solid((255, 0, 0), (32, 32)), perceptual=True)
+    assert len({image_hash(image, perceptual=True) for image in (red, blue, wide_red)}) == 3
+
+    # The benchmark documents' images are solid colours too, & all distinct
+    benchmark_images = [benchmark_png(index) for index in range(8)]
+    assert len({image_hash(image, perceptual=True) for image in benchmark_images}) == 8
+
+
+def test_perceptual_hash_only_dedupes_within_a_document(tmp_path):
+    """Near-identical images in other documents get their own caption, not a cached one"""
+
+    cache = CaptionCache.from_path(str(tmp_path / "cache.sqlite3"))
+    first_llm, second_llm = FakeMultiModalLLM(), FakeMultiModalLLM()
+
+    stream = io.BytesIO()
+    Image.open(io.BytesIO(_png(64, 3))).resize((32, 32)).save(stream, format="PNG")
+    original, smaller = _png(64, 3), stream.getvalue()
+
+    asyncio.run(image_captioner(
+        [_image("a", original), _image("b", smaller)], first_llm, caption_cache=cache, perceptual_hash=True
+    ))
+    asyncio.run(image_captioner([_image("z", smaller)], second_llm, caption_cache=cache, perceptual_hash=True))
+
+    assert first_llm.requests == 1 and second_llm.requests == 1
+
+
+def test_perceptual_copies_keep_their_own_image_data():
+    """Images grouped by the perceptual hash share a caption, not their data"""
+
+    stream = io.BytesIO()
+    Image.open(io.BytesIO(_png(64, 3))).resize((32, 32)).save(stream, format="PNG")
+    original, smaller = _png(64, 3), stream.getvalue()
+
+    llm = FakeMultiModalLLM()
+    captioned = asyncio.run(image_captioner(
+        [_image("a", original), _image("b", smaller), _image("c", original)], llm, perceptual_hash=True
+    ))
+
+    assert llm.requests == 1
+    assert [base64.b64decode(element["metadata"]["image_base64"]) for element in captioned] == [original, smaller, original]
+
+
+def test_large_images_are_downscaled_before_captioning():
+    """The model receives the downscaled image, and the output carries the smaller data"""
+
+    received = []
+
+    class RecordingLLM(FakeMultiModalLLM):
+        async def acomplete(self, prompt, image_documents, **kwargs) -> CompletionResponse:
+            received.append(Image.open(io.BytesIO(base64.b64decode(image_documents[0].image))))
+            return CompletionResponse(text="A gradient")
+
+    # Noise compresses poorly, like a photo or a scanned page
+    stream = io.BytesIO()
+    Image.frombytes("L", (1000, 1000), random.Random(1).randbytes(1000 * 1000)).save(stream, format="PNG")
+    large_png = stream.getvalue()
+
+    captioned = asyncio.run(image_captioner(
+        [_image("big", large_png)],
+        RecordingLLM(),
+        max_image_dimension=256,
+        image_format="JPEG"
+    ))
+
+    assert received[0].size == (256, 256) and received[0].format == "JPEG"
+    assert captioned[0]["metadata"]["image_mime_type"] == "image/jpeg"
+    assert len(base64.b64decode(captioned[0]["metadata"]["image_base64"])) < len(large_png)
+
+
+def test_small_images_are_left_untouched():
+    image_bytes = _png(64, 3)
+    assert preprocess_image(image_bytes, "image/png", max_dimension=256) == (image_bytes, "image/png")
+
+
+def test_preprocessing_counts_towards_the_caption_limit(monkeypatch):
+    """Only as many full-resolution decodes as caption requests are held at once"""
+
+    lock, in_flight, max_in_flight = threading.Lock(), [0], [0]
+
+    def counting_preprocess_image(image_bytes, mime_type, *args):
+        with lock:
+            in_flight[0] += 1
+            max_in_flight[0] = max(max_in_flight[0], in_flight[0])
+
+        time.sleep(0.01)
+
+        with lock:
+            in_flight[0] -= 1
+
+        return image_bytes, mime_type
+
+    monkeypatch.setattr(image_captioner_module, "preprocess_image", counting_preprocess_image)
+    elements: List[dict] = [_image(str(idx), f"image {idx}".encode()) for idx in range(8)]
+    asyncio.run(image_captioner(elements, FakeMultiModalLLM(), max_concurrent_captions=2))
+
+    assert max_in_flight[0] == 2
+
+
+def test_cached_captions_skip_preprocessing(tmp_path, monkeypatch):
+    preprocessed = []
+
+    def recording_preprocess_image(image_bytes, mime_type, *args):
+        preprocessed.append(image_bytes)
+        return image_bytes, mime_type
+
+    monkeypatch.setattr(image_captioner_module, "preprocess_image", recording_preprocess_image)
+    cache = CaptionCache.from_path(str(tmp_path / "cache.sqlite3"))
+
+    asyncio.run(image_captioner([_image("a", b"logo")], FakeMultiModalLLM(), caption_cache=cache))
+    captioned = asyncio.run(image_captioner(
+        [_image("z", b"logo")], FakeMultiModalLLM(), caption_cache=cache, keep_image_base64=False
+    ))
+
+    assert preprocessed == [b"logo"]
+    assert captioned[0]["text"] == "[IMAGE z DESCRIPTION START]logo[IMAGE z DESCRIPTION END]"
+
+
+def test_image_data_is_dropped_from_the_metadata():
+    elements = [_image("a", b"logo"), _image("b", b"logo")]
+    captioned = asyncio.run(image_captioner(elements, FakeMultiModalLLM(), keep_image_base64=False))
+
+    assert all("image_base64" not in element["metadata"] for element in captioned)
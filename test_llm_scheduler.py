@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared LLM scheduler, run against a local fake LLM (no network).
+
+Usage:
+    python -m pytest test_llm_scheduler.py
+"""
+
+import asyncio
+import time
+
+import pytest
+from unstructured.documents.elements import Table, Title, ElementMetadata
+
+from SemanticDocumentParser.element_parsers.semantic_tables import semantic_tables
+from SemanticDocumentParser.llm_scheduler import LLMScheduler, TokenBucket
+from testing_fakes import RateLimitError, FakeLLM, table_messages
+
+
+def test_scheduler_caps_requests_in_flight():
+    llm = FakeLLM()
+    scheduler = LLMScheduler(max_in_flight=3)
+
+    async def run():
+        await asyncio.gather(*[scheduler.achat(llm, table_messages()) for _ in range(20)])
+
+    asyncio.run(run())
+
+    assert llm.max_in_flight == 3
+    assert scheduler.stats["completed"] == 20
+    assert scheduler.stats["max_queue_depth"] >= 17
+    assert scheduler.stats["queued"] == 0 and scheduler.stats["in_flight"] == 0
+
+
+def test_scheduler_retries_rate_limited_requests():
+    llm = FakeLLM(rate_limited_requests=2)
+    scheduler = LLMScheduler(max_retries=3, base_backoff=0.01)
+
+    response = asyncio.run(scheduler.achat(llm, table_messages()))
+
+    assert response.message.content == '["Row 1", "Row 2"]'
+    assert llm.requests == 3
+    assert scheduler.stats["rate_limited"] == 2
+
+
+def test_scheduler_gives_up_after_max_retries():
+    llm = FakeLLM(rate_limited_requests=10)
+    scheduler = LLMScheduler(max_retries=1, base_backoff=0.01)
+
+    with pytest.raises(RateLimitError):
+        asyncio.run(scheduler.achat(llm, table_messages()))
+
+    assert llm.requests == 2
+    assert scheduler.stats["failed"] == 1
+
+
+def test_token_bucket_paces_requests():
+    """A 600/minute bucket refills 10 per second, so 5 tokens past the capacity take ~0.5s"""
+
+    bucket = TokenBucket(per_minute=600)
+
+    async def run():
+        for _ in range(605):
+            await bucket.acquire(1)
+
+    start = time.monotonic()
+    asyncio.run(run())
+    assert 0.4 < time.monotonic() - start < 1.0
+
+
+def test_semantic_tables_go_through_the_scheduler():
+    """Both LLM calls of every table are counted & capped by the shared scheduler"""
+
+    llm = FakeLLM()
+    scheduler = LLMScheduler(max_in_flight=2)
+    elements = [Title("Schedule")] + [Table("Table", metadata=ElementMetadata(text_as_html="<table></table>")) for _ in range(5)]
+
+    nodes = asyncio.run(semantic_tables(elements, llm, scheduler))
+
+    assert llm.requests == 10
+    assert llm.max_in_flight == 2
+    assert not any(isinstance(node, Table) for node in nodes)
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Tests for the single-pass hyperlink substitution of the metadata parser.
+
+Usage:
+    python -m pytest test_metadata_links.py
+"""
+
+from unstructured.documents.elements import NarrativeText, ElementMetadata
+
+from SemanticDocumentParser.element_parsers.metadata_parser import metadata_parser
+
+
+def test_link_spans_are_substituted_in_order():
+    text = "See the syllabus and the reader."
+    links = [
+        {'text': "the reader", 'url': "https://a.ca/reader", 'start_index': text.index("the reader")},
+        {'text': "syllabus", 'url': "https://a.ca/syllabus", 'start_index': text.index("syllabus")},
+    ]
+
+    element = NarrativeText(text=text, metadata=ElementMetadata(links=links))
+    metadata_parser([element])
+
+    assert element.text == "See the [syllabus](https://a.ca/syllabus) and [the reader](https://a.ca/reader)."
+    assert element.metadata.links is None
+
+
+def test_link_texts_are_not_substituted_twice():
+    element = NarrativeText(
+        text="Read Chapter 1 and Chapter 10, see eclass for more.",
+        metadata=ElementMetadata(
+            link_texts=["Chapter 1", "Chapter 10", "eclass"],
+            link_urls=["https://eclass.ca/1", "https://eclass.ca/10", "https://eclass.ca"]
+        )
+    )
+
+    metadata_parser([element])
+
+    assert element.text == (
+        "Read [Chapter 1](https://eclass.ca/1) and [Chapter 10](https://eclass.ca/10), "
+        "see [eclass](https://eclass.ca) for more."
+    )
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Tests for the streaming parser & the incremental window, with a stubbed partition step.
+
+Usage:
+    python -m pytest test_parser_stream.py
+"""
+
+import asyncio
+import copy
+import gc
+import io
+import random
+from typing import List
+
+from unstructured.documents.elements import CheckBox, Element, Title, NarrativeText, ListItem, ElementMetadata
+
+from SemanticDocumentParser.chunk import Chunk
+from SemanticDocumentParser.element_parsers.semantic_splitter import iter_element_groups
+from SemanticDocumentParser.element_parsers.window_parser import window_parser, WindowStream, expand_windows
+from SemanticDocumentParser.parser import SemanticDocumentParser
+from testing_fakes import FakeLLM, FakeMultiModalLLM, make_node_parser, make_document_elements, StubPartitionParser
+
+
+def _parser() -> StubPartitionParser:
+    return StubPartitionParser.construct(llm_model=FakeMultiModalLLM(), node_parser=make_node_parser())
+
+
+def test_window_stream_matches_window_parser():
+    rng = random.Random(3)
+    elements = [{'text': f"  element {idx} " * rng.randint(1, 120), 'metadata': {}} for idx in range(50)]
+
+    expected = window_parser(copy.deepcopy(elements))
+
+    # Push in uneven batches, including empty ones
+    window_stream, streamed, remaining = WindowStream(), [], copy.deepcopy(elements)
+
+    while remaining:
+        batch_size = rng.randint(0, 5)
+        streamed.extend(window_stream.push(remaining[:batch_size]))
+        remaining = remaining[batch_size:]
+
+    streamed.extend(window_stream.flush())
+
+    assert streamed == expected
+
+
+def test_chunks_serialize_like_element_dicts():
+    elements = [element for element in make_document_elements(sections=3) if element.category != "Table"]
+
+    expected = window_parser([element.to_dict() for element in elements])
+    chunks = window_parser([Chunk.from_element(element) for element in elements])
+
+    assert [chunk.to_dict() for chunk in chunks] == expected
+    assert Chunk.from_dict(expected[0]).to_dict() == expected[0]
+
+
+def test_chunks_from_elements_match_chunks_from_element_dicts():
+    title = Title("Grading", metadata=ElementMetadata(filename="outline.docx", page_number=2))
+    title.embeddings = [0.5, 0.25]
+
+    narrative = NarrativeText("Assignments are due weekly.")
+    narrative.metadata.window = "Grading Assignments are due weekly."
+
+    elements = [
+        title,
+        narrative,
+        CheckBox(checked=True, metadata=ElementMetadata(filename="outline.docx"))
+    ]
+
+    for element in elements:
+        assert Chunk.from_element(element).to_dict() == Chunk.from_dict(element.to_dict()).to_dict()
+
+
+def test_chunk_windows_do_not_make_reference_cycles():
+    elements = [{'type': "NarrativeText", 'text': f"element {idx}", 'metadata': {}} for idx in range(20)]
+
+    gc.collect()
+    gc.disable()
+
+    try:
+        chunks = window_parser([Chunk.from_dict(element) for element in elements], window_size=2)
+        windows = [chunk.window_text for chunk in chunks]
+        del chunks
+
+        # Everything was freed by reference counting, leaving the collector nothing to find
+        assert gc.collect() == 0
+    finally:
+        gc.enable()
+
+    assert windows[0] == "element 0 element 1 element 2"
+
+
+def test_output_chunks_returns_chunk_objects():
+    parser = StubPartitionParser.construct(
+        llm_model=FakeMultiModalLLM(), node_parser=make_node_parser(), output_chunks=True
+    )
+    chunks, _ = asyncio.run(parser.aparse(io.BytesIO(b""), "syllabus.docx"))
+    parsed, _ = asyncio.run(_parser().aparse(io.BytesIO(b""), "syllabus.docx"))
+
+    assert all(isinstance(chunk, Chunk) for chunk in chunks)
+    assert [chunk.to_dict()['metadata']['window'] for chunk in chunks] == [element['metadata']['window'] for element in parsed]
+
+
+def test_window_references_expand_to_the_window_text():
+    parser = StubPartitionParser.construct(
+        llm_model=FakeMultiModalLLM(), node_parser=make_node_parser(), window_size=2, window_references=True
+    )
+
+    referenced, _ = asyncio.run(parser.aparse(io.BytesIO(b""), "syllabus.docx"))
+    unwindowed = copy.deepcopy(referenced)
+
+    for element in unwindowed:
+        del element['metadata']['window_range']
+
+    chunks = window_parser([Chunk.from_dict(element) for element in unwindowed], window_size=2)
+
+    assert all('window' not in element['metadata'] for element in referenced)
+    assert len(str(referenced)) < len(str([chunk.to_dict() for chunk in chunks]))
+    assert expand_windows(copy.deepcopy(referenced)) == [chunk.to_dict() for chunk in chunks]
+
+    async def collect() -> List[dict]:
+        return [element async for element in parser.aparse_stream(io.BytesIO(b""), "syllabus.docx")]
+
+    assert [(element['text'], element['metadata']) for element in asyncio.run(collect())] == \
+           [(element['text'], element['metadata']) for element in referenced]
+
+
+def test_stream_yields_the_same_elements_as_aparse():
+    async def collect() -> List[dict]:
+        return [element async for element in _parser().aparse_stream(io.BytesIO(b""), "syllabus.docx")]
+
+    streamed = asyncio.run(collect())
+    parsed, _ = asyncio.run(_parser().aparse(io.BytesIO(b""), "syllabus.docx"))
+
+    assert len(streamed) > 12
+    assert [(element['text'], element['metadata']['window']) for element in streamed] == \
+           [(element['text'], element['metadata']['window']) for element in parsed]
+
+
+def test_stream_yields_before_the_document_is_finished():
+    """The first element is available while later title groups are still unprocessed"""
+
+    parser = _parser()
+
+    async def first_element():
+        stream = parser.aparse_stream(io.BytesIO(b""), "syllabus.docx", max_groups_in_flight=1)
+        element = await stream.__anext__()
+        requests = parser.node_parser.embed_model.requests
+        await stream.aclose()
+        return element, requests
+
+    element, requests = asyncio.run(first_element())
+
+    assert element['metadata']['window']
+    assert requests < 12
+
+
+def test_structure_stages_run_lazily():
+    """Pulling the first title group only runs the synchronous stages over the start of the document"""
+
+    elements: List[Element] = []
+
+    for section in range(100):
+        elements += [
+            Title(f"Section {section}", metadata=ElementMetadata(page_number=1)),
+            NarrativeText("Readings:", metadata=ElementMetadata(page_number=1)),
+            ListItem("Chapter 1", metadata=ElementMetadata(page_number=1))
+        ]
+
+    stages = SemanticDocumentParser._structure_stages(elements)
+    first_group = next(iter_element_groups(stages[-1]))
+
+    assert [element.text for element in first_group] == ["Section 0", "### Section 0\n\n- Chapter 1"]
+    assert sum(element.metadata.page_number is None for element in elements) < 10
+
+
+def test_structure_stage_timings_are_reported():
+    steps = []
+
+    async def on_step_finished(name: str, time: float):
+        steps.append(name)
+
+    asyncio.run(_parser().aparse(io.BytesIO(b""), "syllabus.docx", on_step_finished=on_step_finished))
+
+    assert steps[:4] == ['Unstructured Partition', 'Metadata Parsing', 'Table Parsing 1/2', 'List Parsing']
+
+
+def test_stream_reports_the_same_stats_as_aparse():
+    class TablesPartitionParser(SemanticDocumentParser):
+        async def apartition(self, document: io.BytesIO, **kwargs) -> List[Element]:
+            return make_document_elements(sections=4)
+
+    parser = TablesPartitionParser.construct(llm_model=FakeLLM(), node_parser=make_node_parser())
+    steps = {}
+
+    async def on_step_finished(step: str, duration: float) -> None:
+        steps[step] = duration
+
+    async def collect(stats: dict) -> List[dict]:
+        stream = parser.aparse_stream(io.BytesIO(b""), "syllabus.docx", on_step_finished, stats=stats)
+        return [element async for element in stream]
+
+    streamed_stats = {}
+    asyncio.run(collect(streamed_stats))
+    _, parsed_stats = asyncio.run(parser.aparse(io.BytesIO(b""), "syllabus.docx"))
+
+    assert streamed_stats['llm_tables'] == parsed_stats['llm_tables'] > 0
+    assert streamed_stats['bypassed_tables'] == parsed_stats['bypassed_tables']
+    assert streamed_stats['table_parse_time_strategy_2'] == steps['Table Parsing 2/2'] > 0
+
+    # Small nodes are removed (& timed) as each batch of windowed elements is yielded
+    removed = [trace for trace in streamed_stats['stage_traces'] if trace['stage'] == 'Remove Small Nodes']
+    assert removed and sum(trace['duration_ms'] for trace in removed) > 0
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for the partition process pool, on documents unstructured partitions without NLTK data (CSV & HTML
+titles & tables).
+
+Usage:
+    python -m pytest test_partition_executor.py
+"""
+
+import asyncio
+import io
+import os
+
+import pytest
+
+from SemanticDocumentParser.parser import SemanticDocumentParser
+from SemanticDocumentParser.partition_executor import PartitionExecutor, _ping_worker
+from testing_fakes import FakeMultiModalLLM, make_node_parser
+
+CSV_DOCUMENT: bytes = b"Week,Topic,Reading\n1,Introduction,Chapter 1\n2,Sets & Logic,Chapter 2\n"
+HTML_DOCUMENT: bytes = (
+    b"<html><body><h1>Grading</h1><table><tr><td>Midterm</td><td>25%</td></tr></table>"
+    b"<h2>Schedule</h2><table><tr><td>Week 1</td><td>Introduction</td></tr></table></body></html>"
+)
+
+PARTITION_KWARGS: dict = {"languages": ["en"], "xml_keep_tags": True}
+
+
+@pytest.fixture(scope="module")
+def executor():
+    with PartitionExecutor(max_workers=2) as partition_executor:
+        yield partition_executor
+
+
+def _parser(**kwargs) -> SemanticDocumentParser:
+    return SemanticDocumentParser.construct(llm_model=FakeMultiModalLLM(), node_parser=make_node_parser(), **kwargs)
+
+
+def _partition_in_process(document: bytes, document_filename: str) -> list:
+    return SemanticDocumentParser.partition(
+        file=io.BytesIO(document), metadata_filename=document_filename, **PARTITION_KWARGS
+    )()
+
+
+def test_start_warms_every_worker(executor):
+    worker_pids = {future.result() for future in [executor.pool.submit(_ping_worker) for _ in range(8)]}
+
+    assert len(executor.pool._processes) == 2
+    assert os.getpid() not in worker_pids and len(worker_pids) <= 2
+
+
+@pytest.mark.parametrize(
+    "document, document_filename", [(CSV_DOCUMENT, "schedule.csv"), (HTML_DOCUMENT, "outline.html")], ids=["csv", "html"]
+)
+def test_elements_round_trip_through_the_pool(executor, document, document_filename):
+    """Elements partitioned in a worker come back as the same elements, IDs included"""
+
+    parser = _parser(partition_executor=executor)
+    elements = asyncio.run(parser.apartition(
+        io.BytesIO(document), metadata_filename=document_filename, **PARTITION_KWARGS
+    ))
+
+    expected = _partition_in_process(document, document_filename)
+
+    assert [type(element) for element in elements] == [type(element) for element in expected]
+    assert [element.to_dict() for element in elements] == [element.to_dict() for element in expected]
+
+
+def test_shutdown_releases_the_pool():
+    partition_executor = PartitionExecutor(max_workers=1)
+
+    with partition_executor:
+        pool = partition_executor.pool
+        assert pool.submit(_ping_worker).result() != os.getpid()
+
+    assert partition_executor._pool is None
+
+    with pytest.raises(RuntimeError):
+        pool.submit(_ping_worker)
+
+
+def test_partitions_in_process_without_an_executor(monkeypatch):
+    partition_pids = []
+    partition = SemanticDocumentParser.partition.__func__
+
+    def recording_partition(cls, **kwargs):
+        partition_pids.append(os.getpid())
+        return partition(cls, **kwargs)
+
+    monkeypatch.setattr(SemanticDocumentParser, "partition", classmethod(recording_partition))
+
+    elements = asyncio.run(_parser().apartition(
+        io.BytesIO(CSV_DOCUMENT), metadata_filename="schedule.csv", **PARTITION_KWARGS
+    ))
+
+    assert partition_pids == [os.getpid()]
+    assert [element.to_dict() for element in elements] == [
+        element.to_dict() for element in _partition_in_process(CSV_DOCUMENT, "schedule.csv")
+    ]
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-element section index & the stages looking context up in it.
+
+Usage:
+    python -m pytest test_section_index.py
+"""
+
+from unstructured.documents.elements import Title, NarrativeText, Table, ListItem, ElementMetadata
+
+from SemanticDocumentParser.element_parsers.al_tables import al_table_parser
+from SemanticDocumentParser.element_parsers.list_parser import list_parser
+from SemanticDocumentParser.element_parsers.section_index import SectionIndex
+
+TABLE_HTML = "<table><tr><td>Week</td><td>Topic</td><td>Room</td></tr><tr><td>1</td><td>Intro</td><td>VH 1018</td></tr></table>"
+
+
+def _table() -> Table:
+    return Table("Table", metadata=ElementMetadata(text_as_html=TABLE_HTML))
+
+
+def test_index_records_section_context():
+    intro, chapter, paragraph, section, item = (
+        NarrativeText("Intro"),
+        Title("Chapter", metadata=ElementMetadata(category_depth=1)),
+        NarrativeText("Paragraph"),
+        Title("Section", metadata=ElementMetadata(category_depth=2)),
+        ListItem("Item")
+    )
+
+    index = SectionIndex([intro, chapter, paragraph, section, item])
+
+    assert index.get(intro) == dict(position=0, title=None, title_position=None)
+    assert index.get(paragraph) == dict(position=2, title=chapter, title_position=1)
+    assert index.get(item) == dict(position=4, title=section, title_position=3)
+    assert index.get(NarrativeText("Not indexed")) is None
+
+
+def test_table_headings_only_look_25_elements_back():
+    in_range = [Title("Schedule")] + [NarrativeText(f"Text {idx}") for idx in range(24)] + [_table()]
+    out_of_range = [Title("Schedule")] + [NarrativeText(f"Text {idx}") for idx in range(25)] + [_table()]
+
+    assert al_table_parser(in_range)[-1].text.startswith("*Schedule*\n ")
+    assert al_table_parser(out_of_range)[-1].text.startswith("*Untitled Table*\n ")
+
+
+def test_stages_share_one_index():
+    elements = [Title("Readings", metadata=ElementMetadata(category_depth=1)), ListItem("Chapter 1"), ListItem("Chapter 2"), _table()]
+    index = SectionIndex(elements)
+
+    nodes = list_parser(al_table_parser(elements, index), index)
+
+    assert nodes[1].text == "## Readings\n\n- Chapter 1\n- Chapter 2"
+    assert nodes[3].text.startswith("*Readings*\n The following Week: 1 has")
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Tests for the semantic splitter & its async node parser, using a deterministic in-process embedding model.
+
+Usage:
+    python -m pytest test_semantic_splitter.py
+"""
+
+import asyncio
+
+from unstructured.documents.elements import Title, NarrativeText, Table
+
+from SemanticDocumentParser.element_parsers.semantic_splitter import semantic_splitter
+from testing_fakes import make_node_parser, make_document_elements
+
+
+def test_splitter_batches_embeddings_across_nodes():
+    """Every NarrativeText in the document shares a few full-size embedding requests"""
+
+    node_parser = make_node_parser()
+    elements = make_document_elements(sections=10)
+    nodes = asyncio.run(semantic_splitter(elements, node_parser))
+
+    sentence_groups = sum(len(element.text.split(". ")) for element in elements if type(element) is NarrativeText)
+    assert node_parser.embed_model.requests == -(-sentence_groups // 64)
+
+    # Each node gets its own splits back, under its own section's title
+    assert [node.text for node in nodes if isinstance(node, Title)] == [f"Section {idx}" for idx in range(10)]
+    assert sum(isinstance(node, Table) for node in nodes) == 10
+
+    section: str = ""
+
+    for node in nodes:
+        if isinstance(node, Title):
+            section = node.text
+        elif isinstance(node, NarrativeText) and section:
+            assert node.text.startswith(f"## {section}\n")
+
+
+def test_vectorized_breakpoints_match_default_path():
+    """The NumPy path produces the same chunks as the per-pair path"""
+
+    elements = make_document_elements(sections=10)
+
+    default_nodes = asyncio.run(semantic_splitter(elements, make_node_parser()))
+    vectorized_nodes = asyncio.run(semantic_splitter(elements, make_node_parser(vectorized_breakpoints=True)))
+
+    assert [node.text for node in default_nodes] == [node.text for node in vectorized_nodes]
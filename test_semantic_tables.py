@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests for the LLM table parser (strategy 2): the table cache & single-call mode, run against a local fake LLM.
+
+Usage:
+    python -m pytest test_semantic_tables.py
+"""
+
+import asyncio
+import threading
+
+from unstructured.documents.elements import Table, Title, ElementMetadata
+
+from SemanticDocumentParser.caching.table_cache import TableCache
+from SemanticDocumentParser.element_parsers.semantic_tables import semantic_tables
+from SemanticDocumentParser.llm_scheduler import LLMScheduler
+from testing_fakes import FakeLLM
+
+
+def test_table_cache_makes_warm_runs_free(tmp_path):
+    """Copies of a table differing only in attributes & whitespace share the cached replies, across runs"""
+
+    table_cache = TableCache.from_path(str(tmp_path / "cache.sqlite3"))
+
+    def elements(copies: int):
+        return [Title("Schedule")] + [
+            Table("Table", metadata=ElementMetadata(text_as_html=f'<table id="t{idx}">\n <tr><td> Week 1</td></tr></table>'))
+            for idx in range(copies)
+        ]
+
+    cold_llm = FakeLLM()
+    cold_nodes = asyncio.run(semantic_tables(elements(1), cold_llm, LLMScheduler(), table_cache))
+
+    warm_llm = FakeLLM()
+    warm_nodes = asyncio.run(semantic_tables(elements(3), warm_llm, LLMScheduler(), table_cache))
+
+    assert cold_llm.requests == 2
+    assert warm_llm.requests == 0
+    assert [node.text.split("\n")[-1] for node in warm_nodes[1:]] == [node.text.split("\n")[-1] for node in cold_nodes[1:]] * 3
+
+
+def test_table_cache_serves_empty_replies(tmp_path):
+    """A well-formed reply for an empty table is cached like any other"""
+
+    table_cache = TableCache.from_path(str(tmp_path / "cache.sqlite3"))
+    elements = [Title("Schedule"), Table("Table", metadata=ElementMetadata(text_as_html="<table></table>"))]
+
+    for single_call, reply in [(False, "[]"), (True, '{"summary": "An empty table.", "units": []}')]:
+        cold_llm, warm_llm = FakeLLM(reply=reply), FakeLLM(reply=reply)
+
+        asyncio.run(semantic_tables(elements, cold_llm, LLMScheduler(), table_cache, single_call=single_call))
+        asyncio.run(semantic_tables(elements, warm_llm, LLMScheduler(), table_cache, single_call=single_call))
+
+        assert cold_llm.requests > 0 and warm_llm.requests == 0
+
+
+def test_table_cache_shares_requests_for_copies_in_flight(tmp_path):
+    """Copies of a table parsed at the same time, in one document or several, make one request per prompt"""
+
+    table_cache = TableCache.from_path(str(tmp_path / "cache.sqlite3"))
+    llm = FakeLLM()
+
+    def elements():
+        return [Title("Schedule")] + [
+            Table("Table", metadata=ElementMetadata(text_as_html="<table><tr><td>Week 1</td></tr></table>"))
+            for _ in range(3)
+        ]
+
+    async def run():
+        scheduler = LLMScheduler()
+        return await asyncio.gather(*[semantic_tables(elements(), llm, scheduler, table_cache) for _ in range(2)])
+
+    first, second = asyncio.run(run())
+
+    assert llm.requests == 2
+    assert [node.text for node in first] == [node.text for node in second]
+    assert len(first) == 1 + 3 * 3
+
+
+def test_single_call_tables_make_one_request_per_table():
+    llm = FakeLLM(reply='{"summary": "Two rows.", "units": ["Row 1", "Row 2"]}')
+    elements = [Title("Schedule")] + [Table("Table", metadata=ElementMetadata(text_as_html="<table></table>")) for _ in range(3)]
+
+    nodes = asyncio.run(semantic_tables(elements, llm, LLMScheduler(), single_call=True))
+
+    assert llm.requests == 3
+    assert [node.text for node in nodes[:4]] == [
+        "Schedule", "Schedule\n\nList Item 1: Row 1", "Schedule\n\nList Item 2: Row 2", "Schedule\nTwo rows."
+    ]
+
+
+def test_single_call_tables_survive_malformed_replies():
+    elements = [Title("Schedule"), Table("Table", metadata=ElementMetadata(text_as_html="<table></table>"))]
+
+    assert asyncio.run(semantic_tables(elements, FakeLLM(reply="Sure! Here it is"), single_call=True)) == elements[:1]
+
+    partial_nodes = asyncio.run(semantic_tables(elements, FakeLLM(reply='{"units": ["Row 1", 2]}'), single_call=True))
+    assert [node.text for node in partial_nodes] == ["Schedule", "Schedule\n\nList Item 1: Row 1"]
+
+
+def test_table_cache_is_read_and_written_off_the_event_loop(tmp_path):
+    table_cache = TableCache.from_path(str(tmp_path / "cache.sqlite3"))
+    store_threads = []
+
+    for method in ("get", "set"):
+        def recording(*args, _method=getattr(table_cache.store, method)):
+            store_threads.append(threading.current_thread())
+            return _method(*args)
+
+        setattr(table_cache.store, method, recording)
+
+    elements = [Title("Schedule"), Table("Table", metadata=ElementMetadata(text_as_html="<table></table>"))]
+    asyncio.run(semantic_tables(elements, FakeLLM(), LLMScheduler(), table_cache))
+
+    assert len(store_threads) == 4
+    assert threading.main_thread() not in store_threads
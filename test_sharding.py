@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests for splitting long PDFs & decks into page ranges and merging the partitioned shards back.
+
+Usage:
+    python -m pytest test_sharding.py
+"""
+
+import copy
+import io
+from typing import List
+
+from pptx import Presentation
+from pypdf import PdfReader, PdfWriter
+from unstructured.documents.elements import Element, Title, NarrativeText, ElementMetadata, assign_and_map_hash_ids
+from unstructured.file_utils.model import FileType
+from unstructured.partition.common.metadata import set_element_hierarchy
+
+from SemanticDocumentParser.sharding import split_document, merge_shards, DocumentShard
+
+
+def _pdf(pages: int) -> bytes:
+    writer = PdfWriter()
+
+    for page in range(pages):
+        writer.add_blank_page(width=72 + page, height=72)
+
+    pdf_io = io.BytesIO()
+    writer.write(pdf_io)
+    return pdf_io.getvalue()
+
+
+def _pptx(slides: int) -> bytes:
+    presentation = Presentation()
+
+    for slide in range(slides):
+        presentation.slides.add_slide(presentation.slide_layouts[5]).shapes.title.text = f"Slide {slide}"
+
+    pptx_io = io.BytesIO()
+    presentation.save(pptx_io)
+    return pptx_io.getvalue()
+
+
+def _elements(pages: int) -> List[Element]:
+    """Each page opens a new section every other page, so sections span page (and shard) boundaries"""
+
+    elements: List[Element] = []
+
+    for page in range(1, pages + 1):
+        if page % 2:
+            elements.append(Title(f"Section {page}", metadata=ElementMetadata(page_number=page, category_depth=0)))
+
+        elements.append(NarrativeText("Footer text repeated on every page", metadata=ElementMetadata(page_number=page)))
+
+    return elements
+
+
+def test_small_documents_are_not_split():
+    assert split_document(_pdf(5), FileType.PDF, pages_per_shard=2, shard_threshold_pages=5) == []
+    assert split_document(b"<html></html>", FileType.HTML, pages_per_shard=2, shard_threshold_pages=0) == []
+
+
+def test_pdf_is_split_into_page_ranges():
+    shards = split_document(_pdf(7), FileType.PDF, pages_per_shard=3, shard_threshold_pages=5)
+
+    assert [shard['page_offset'] for shard in shards] == [0, 3, 6]
+    assert [
+        [int(page.mediabox.width) for page in PdfReader(io.BytesIO(shard['document_bytes'])).pages] for shard in shards
+    ] == [[72, 73, 74], [75, 76, 77], [78]]
+
+
+def test_pptx_is_split_into_slide_ranges():
+    shards = split_document(_pptx(5), FileType.PPTX, pages_per_shard=2, shard_threshold_pages=2)
+
+    assert [shard['page_offset'] for shard in shards] == [0, 2, 4]
+    assert [
+        [slide.shapes.title.text for slide in Presentation(io.BytesIO(shard['document_bytes'])).slides]
+        for shard in shards
+    ] == [["Slide 0", "Slide 1"], ["Slide 2", "Slide 3"], ["Slide 4"]]
+
+
+def test_merged_shards_match_an_unsharded_partition():
+    """Page numbers, hash IDs & parent IDs come out as if the document was partitioned whole"""
+
+    expected = set_element_hierarchy(assign_and_map_hash_ids(_elements(6)))
+
+    # Partition each 3-page shard on its own (pages renumbered from 1, hierarchy local to the shard)
+    shards: List[DocumentShard] = []
+    shard_elements: List[List[Element]] = []
+
+    for page_offset in (0, 3):
+        elements = [copy.deepcopy(element) for element in _elements(6) if page_offset < element.metadata.page_number <= page_offset + 3]
+
+        for element in elements:
+            element.metadata.page_number -= page_offset
+
+        shards.append(DocumentShard(page_offset=page_offset, document_bytes=b""))
+        shard_elements.append(set_element_hierarchy(assign_and_map_hash_ids(elements)))
+
+    merged = merge_shards(shard_elements, shards)
+
+    assert [(element.id, element.metadata.page_number, element.metadata.parent_id) for element in merged] == \
+           [(element.id, element.metadata.page_number, element.metadata.parent_id) for element in expected]
+
+    # The text at the top of page 4 (in the second shard) hangs off the page 3 title from the first shard
+    assert merged[5].text == "Footer text repeated on every page" and merged[5].metadata.page_number == 4
+    assert merged[5].metadata.parent_id == merged[3].id
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for the table shape classifier & the deterministic table fast path.
+
+Usage:
+    python -m pytest test_simple_tables.py
+"""
+
+import asyncio
+
+from unstructured.documents.elements import Table, Title, ElementMetadata
+
+from SemanticDocumentParser.element_parsers.al_tables import al_table_parser
+from SemanticDocumentParser.element_parsers.semantic_tables import semantic_tables, SemanticTablesStats
+from SemanticDocumentParser.element_parsers.simple_tables import SimpleTableClassifier, classify_table_html, render_simple_table
+from SemanticDocumentParser.element_parsers.table_html import read_table_rows
+from testing_fakes import FakeLLM
+
+KEY_VALUE_TABLE = "<table><tr><td>Instructor</td><td><a href='mailto:prof@yorku.ca'>Prof. X</a></td></tr><tr><td>Office</td><td>VH 1018</td></tr></table>"
+HEADER_TABLE = "<table><thead><tr><th>Week</th><th>Topic</th><th>Reading</th></tr></thead><tr><td>1</td><td>Intro</td><td></td></tr></table>"
+MERGED_TABLE = "<table><tr><td colspan='2'>Schedule</td></tr><tr><td>Mon</td><td>Lab</td></tr></table>"
+WIDE_TABLE = "<table><tr><td>1</td><td>2</td><td>3</td></tr><tr><td>4</td><td>5</td><td>6</td></tr></table>"
+
+
+def test_classifier_thresholds():
+    classifier = SimpleTableClassifier()
+
+    assert classify_table_html(KEY_VALUE_TABLE, classifier) is not None
+    assert classify_table_html(MERGED_TABLE, classifier) is None
+    assert classify_table_html(WIDE_TABLE, SimpleTableClassifier(max_columns=3)) is None
+    assert classify_table_html(HEADER_TABLE, SimpleTableClassifier(max_columns=3)) is not None
+    assert classify_table_html(HEADER_TABLE, SimpleTableClassifier(max_columns=3, max_empty_cell_ratio=0.1)) is None
+    assert classify_table_html(KEY_VALUE_TABLE, SimpleTableClassifier(max_rows=1)) is None
+
+
+def test_tables_without_cells_are_not_simple():
+    classifier = SimpleTableClassifier()
+
+    assert not classifier.is_simple([])
+    assert not classifier.is_simple([[], []])
+    assert classify_table_html("<table></table>", classifier) is None
+    assert classify_table_html("<table><tr></tr></table>", classifier) is None
+
+
+def test_render_simple_tables():
+    assert render_simple_table(read_table_rows(KEY_VALUE_TABLE)[0]) == [
+        "Instructor: Prof. X (mailto:prof@yorku.ca)", "Office: VH 1018"
+    ]
+    assert render_simple_table(read_table_rows(HEADER_TABLE)[0]) == ["Week: 1, Topic: Intro"]
+
+
+def test_simple_tables_skip_the_llm():
+    llm = FakeLLM()
+    stats = SemanticTablesStats(llm_tables=0, bypassed_tables=0)
+    elements = [
+        Title("Contact"),
+        Table("Table", metadata=ElementMetadata(text_as_html=KEY_VALUE_TABLE)),
+        Table("Table", metadata=ElementMetadata(text_as_html=MERGED_TABLE))
+    ]
+
+    nodes = asyncio.run(semantic_tables(elements, llm, simple_table_classifier=SimpleTableClassifier(), stats=stats))
+
+    assert llm.requests == 2
+    assert stats == {"llm_tables": 1, "bypassed_tables": 1}
+    assert [node.text for node in nodes[:3]] == [
+        "Contact", "Contact\n\nList Item 1: Instructor: Prof. X (mailto:prof@yorku.ca)", "Contact\n\nList Item 2: Office: VH 1018"
+    ]
+
+
+def test_al_table_parser_renders_every_column_pair():
+    html = "<table><tr><th>Month</th><th>Theme</th><th>Path</th></tr><tr><td>Sept</td><td>Intro</td><td><a href='https://x.ca'>Start</a></td></tr></table>"
+    elements = [Title("Schedule"), Table("Table", metadata=ElementMetadata(text_as_html=html))]
+
+    nodes = al_table_parser(elements)
+
+    assert nodes[:2] == elements
+    assert nodes[2].text == (
+        "*Schedule*\n The following Month: Sept has the following Theme: Intro has the following Path: [Start] (https://x.ca), "
+    )
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-stage tracing, with a stubbed partition step & fake models.
+
+Usage:
+    python -m pytest test_tracing.py
+"""
+
+import asyncio
+import io
+import json
+import tracemalloc
+from typing import List
+
+import pytest
+
+from llama_index.core.base.llms.types import ChatResponse, ChatMessage
+
+from SemanticDocumentParser.llm_scheduler import LLMScheduler
+from SemanticDocumentParser.tracing import Tracer, StageTrace, TraceSink, CallbackTraceSink, JSONLinesTraceSink
+from testing_fakes import (
+    RateLimitError, FakeLLM, FakeMultiModalLLM, make_node_parser, table_messages, StubPartitionParser
+)
+
+
+class UsageReportingLLM(FakeLLM):
+    """Reports OpenAI-style token usage with its replies"""
+
+    async def achat(self, messages, **kwargs) -> ChatResponse:
+        await super().achat(messages, **kwargs)
+
+        return ChatResponse(
+            message=ChatMessage(role="assistant", content=self.reply),
+            raw={'usage': {'prompt_tokens': 120, 'completion_tokens': 30}}
+        )
+
+
+def test_aparse_traces_every_stage():
+    traces: List[StageTrace] = []
+    parser = StubPartitionParser.construct(
+        llm_model=FakeMultiModalLLM(), node_parser=make_node_parser(), trace_sink=CallbackTraceSink(traces.append)
+    )
+
+    elements, stats = asyncio.run(parser.aparse(io.BytesIO(b""), "syllabus.docx"))
+
+    assert [trace['stage'] for trace in traces] == [
+        'Unstructured Partition', 'Metadata Parsing', 'Table Parsing 1/2', 'List Parsing', 'Paragraph Parsing',
+        'Table Parsing 2/2', 'Image Captioning', 'Window Combination', 'Remove Small Nodes'
+    ]
+
+    assert stats['stage_traces'] == traces
+    assert all(trace['document_filename'] == "syllabus.docx" for trace in traces)
+
+    # Each stage consumes what the one before it produced
+    for upstream, trace in zip(traces, traces[1:]):
+        assert trace['elements_in'] == upstream['elements_out']
+
+    assert traces[-1]['elements_out'] == len(elements)
+
+    paragraph_trace: StageTrace = traces[4]
+    assert paragraph_trace['embedding_calls'] > 0 and paragraph_trace['embedding_tokens'] > 0
+    assert paragraph_trace['llm_calls'] == 0
+    assert all(trace['memory_peak_bytes'] is None for trace in traces)
+
+
+def test_llm_calls_count_towards_the_running_stage():
+    tracer = Tracer("syllabus.docx", trace_memory=True)
+    scheduler = LLMScheduler()
+
+    async def run():
+        with tracer.stage('Table Parsing 2/2', 3) as span:
+            await asyncio.gather(*[scheduler.achat(UsageReportingLLM(), table_messages()) for _ in range(3)])
+            span.elements_out = 3
+
+        # Outside of a stage, nothing is counted
+        await scheduler.achat(FakeLLM(), table_messages())
+
+    try:
+        asyncio.run(run())
+    finally:
+        tracemalloc.stop()
+
+    assert len(tracer.traces) == 1
+    trace: StageTrace = tracer.traces[0]
+
+    assert trace['llm_calls'] == 3
+    assert (trace['input_tokens'], trace['output_tokens']) == (360, 90)
+    assert trace['duration_ms'] >= 10 and trace['memory_peak_bytes'] is not None
+
+
+def test_retries_and_failures_count_as_llm_calls():
+    tracer = Tracer("syllabus.docx")
+    scheduler = LLMScheduler(max_retries=2, base_backoff=0.01)
+
+    async def run():
+        with tracer.stage('Table Parsing 2/2'):
+            await scheduler.achat(UsageReportingLLM(rate_limited_requests=2), table_messages())
+
+        with tracer.stage('Image Captioning'):
+            with pytest.raises(RateLimitError):
+                await scheduler.achat(FakeLLM(rate_limited_requests=10), table_messages())
+
+    asyncio.run(run())
+    retried, failed = tracer.traces
+
+    # Only the answered attempt reports tokens
+    assert retried['llm_calls'] == 3
+    assert (retried['input_tokens'], retried['output_tokens']) == (120, 30)
+    assert failed['llm_calls'] == 3
+    assert (failed['input_tokens'], failed['output_tokens']) == (0, 0)
+
+
+def test_json_lines_sink_writes_a_line_per_stage():
+    file = io.StringIO()
+    tracer = Tracer("syllabus.docx", JSONLinesTraceSink(file))
+
+    with tracer.stage('Window Combination', 2) as span:
+        span.elements_out = 2
+
+    with tracer.stage('Remove Small Nodes', 2) as span:
+        span.elements_out = 1
+
+    lines = [json.loads(line) for line in file.getvalue().splitlines()]
+
+    assert [line['stage'] for line in lines] == ['Window Combination', 'Remove Small Nodes']
+    assert lines[1]['elements_in'] == 2 and lines[1]['elements_out'] == 1
+
+
+def test_trace_sinks_must_implement_emit():
+    class IncompleteSink(TraceSink):
+        pass
+
+    with pytest.raises(TypeError):
+        IncompleteSink()
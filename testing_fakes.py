@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Local fakes shared by the test modules: LLMs, an embedding model, a node parser & a stubbed partition step (no network).
+
+Usage:
+    from testing_fakes import FakeLLM, FakeMultiModalLLM, StubPartitionParser, make_node_parser
+"""
+
+import asyncio
+import base64
+import hashlib
+import io
+import random
+from typing import List
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.base.llms.types import ChatMessage, ChatResponse, CompletionResponse, LLMMetadata
+from unstructured.documents.elements import Title, NarrativeText, Table, ElementMetadata, Element
+
+from SemanticDocumentParser.llama_extensions.node_parser import AsyncSemanticSplitterNodeParser
+from SemanticDocumentParser.parser import SemanticDocumentParser
+
+
+class RateLimitError(Exception):
+    """Stand-in for the OpenAI client's 429 error"""
+
+    status_code = 429
+
+
+class FakeLLM:
+    """Answers chat requests after a delay, rejecting the first few with a rate-limit error"""
+
+    metadata = LLMMetadata(model_name="fake-gpt-4o")
+
+    def __init__(self, latency: float = 0.01, rate_limited_requests: int = 0, reply: str = '["Row 1", "Row 2"]'):
+        self.latency: float = latency
+        self.reply: str = reply
+        self.rate_limited_requests: int = rate_limited_requests
+        self.requests: int = 0
+        self.in_flight: int = 0
+        self.max_in_flight: int = 0
+
+    async def achat(self, messages, **kwargs) -> ChatResponse:
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        try:
+            await asyncio.sleep(self.latency)
+
+            if self.requests <= self.rate_limited_requests:
+                raise RateLimitError("Too many requests")
+
+            return ChatResponse(message=ChatMessage(role="assistant", content=self.reply))
+        finally:
+            self.in_flight -= 1
+
+
+class FakeMetadata:
+    model_name = "gpt-4o"
+
+
+class FakeMultiModalLLM:
+    """Captions an image with its own (decoded) bytes, failing on images containing 'FAIL'"""
+
+    metadata = FakeMetadata()
+
+    def __init__(self):
+        self.requests: int = 0
+        self.in_flight: int = 0
+        self.max_in_flight: int = 0
+
+    async def acomplete(self, prompt, image_documents, **kwargs) -> CompletionResponse:
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        try:
+            await asyncio.sleep(0.01)
+            image_bytes: bytes = base64.b64decode(image_documents[0].image)
+
+            if b"FAIL" in image_bytes:
+                raise RuntimeError("Model error")
+
+            return CompletionResponse(text=image_bytes.decode(errors="ignore"))
+        finally:
+            self.in_flight -= 1
+
+
+class HashEmbedding(BaseEmbedding):
+    """Embeds text as a vector derived from its hash, and counts the requests it receives"""
+
+    requests: int = 0
+
+    @classmethod
+    def _embed(cls, text: str) -> List[float]:
+        return [byte / 255 - 0.5 for byte in hashlib.sha256(text.encode()).digest()[:16]]
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embed(query)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._embed(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed(text)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        self.requests += 1
+        return [self._embed(text) for text in texts]
+
+
+def make_node_parser(**kwargs) -> AsyncSemanticSplitterNodeParser:
+    node_parser = AsyncSemanticSplitterNodeParser.from_defaults(
+        embed_model=HashEmbedding(embed_batch_size=64),
+        breakpoint_percentile_threshold=70,
+        sentence_splitter=lambda text: [sentence + ". " for sentence in text.split(". ") if sentence],
+    )
+
+    for key, value in kwargs.items():
+        setattr(node_parser, key, value)
+
+    return node_parser
+
+
+def make_document_elements(sections: int = 10) -> List[Element]:
+    rng = random.Random(1)
+    words = "course grade policy exam week lab office hours reading quiz".split()
+
+    def paragraph() -> str:
+        return ". ".join(" ".join(rng.choice(words) for _ in range(6)) for _ in range(rng.randint(1, 9)))
+
+    elements: List[Element] = [NarrativeText(paragraph())]
+
+    for section in range(sections):
+        elements.append(Title(f"Section {section}", metadata=ElementMetadata(category_depth=2)))
+        elements.extend([NarrativeText(paragraph()), Table("Table"), NarrativeText(paragraph())])
+
+    return elements
+
+
+def table_messages() -> List[ChatMessage]:
+    return [ChatMessage(role="user", content="<table></table>")]
+
+
+class StubPartitionParser(SemanticDocumentParser):
+    """Skips unstructured & returns a fixed element list"""
+
+    async def apartition(self, document: io.BytesIO, **kwargs) -> List[Element]:
+        return [element for element in make_document_elements(sections=12) if element.category != "Table"]
+
+
+__all__ = [
+    "RateLimitError",
+    "FakeLLM",
+    "FakeMultiModalLLM",
+    "HashEmbedding",
+    "make_node_parser",
+    "make_document_elements",
+    "table_messages",
+    "StubPartitionParser"
+]